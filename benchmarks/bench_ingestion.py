@@ -0,0 +1,79 @@
+"""
+数据导入并行加速基准测试
+将数据集目录复制多份，分别按顺序和并行方式执行加载-清洗-保存，
+比较耗时并校验两种方式输出的文件完全一致
+
+运行方式:
+    python benchmarks/bench_ingestion.py [--copies 16] [--workers 4]
+"""
+
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.catalog import get_catalog
+from src.utils.clean_data import ingest_datasets
+
+
+def replicate_catalog(copies):
+    """
+    复制数据集目录记录，模拟包含大量序列的目录
+
+    Args:
+        copies (int): 每个数据集复制的份数
+
+    Returns:
+        list: 数据集记录列表
+    """
+    return [
+        dict(entry, symbol=f"{entry['symbol']}_{i}")
+        for i in range(copies)
+        for entry in get_catalog()
+    ]
+
+
+def run(entries, workers):
+    """
+    执行一次导入并计时
+
+    Returns:
+        tuple: (耗时秒数, 输出目录)
+    """
+    output_path = tempfile.mkdtemp(prefix=f'ingest_w{workers}_')
+    start = time.perf_counter()
+    ingest_datasets(entries, cleaned_path=output_path, max_workers=workers)
+    return time.perf_counter() - start, output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--copies', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    entries = replicate_catalog(args.copies)
+    print(f"Datasets: {len(entries)}, CPU cores: {os.cpu_count()}, workers: {args.workers}")
+
+    serial_time, serial_path = run(entries, 1)
+    parallel_time, parallel_path = run(entries, max(args.workers, 2))
+
+    files = sorted(os.listdir(serial_path))
+    _, mismatch, errors = filecmp.cmpfiles(serial_path, parallel_path, files, shallow=False)
+
+    print(f"Serial:   {serial_time:.3f}s")
+    print(f"Parallel: {parallel_time:.3f}s")
+    print(f"Speedup:  {serial_time / parallel_time:.2f}x")
+    print(f"Identical output: {not mismatch and not errors} ({len(files)} files)")
+
+    shutil.rmtree(serial_path)
+    shutil.rmtree(parallel_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+数值内核基准测试
+在1x/10x/100x的历史长度上比较pandas、NumPy参考实现和numba编译实现（已安装时）的耗时，
+并以pandas的结果为准校验各实现一致（超出容差时以非零状态退出）
+
+运行方式:
+    python benchmarks/bench_kernels.py [--scales 1 10 100] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import kernels
+from src.utils.catalog import get_catalog
+from src.utils.clean_data import load_panel_store
+from src.utils.tiles import OHLC
+
+# 各内核的参数
+WINDOW = 20
+SPAN = 12
+CORR_WINDOW = 60
+CORR_MIN_PERIODS = 30
+
+# 与pandas结果的最大允许误差（相对于数据量级）；pandas的滚动相关按窗口增删在线更新，
+# 实际序列上（1至100倍长度）与两种实现的误差约3e-9
+TOLERANCE = {'rolling_corr': 1e-8}
+DEFAULT_TOLERANCE = 1e-9
+
+
+def best_time(func, repeat):
+    """
+    多次执行取最短耗时
+
+    Returns:
+        tuple: (秒数, 最后一次的返回值)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def max_diff(result, reference):
+    """
+    相对于参考结果量级的最大误差；缺失位置不一致时为无穷大
+    """
+    result = np.asarray(result, dtype='float64')
+    reference = np.asarray(reference, dtype='float64')
+    if result.shape != reference.shape or (np.isnan(result) != np.isnan(reference)).any():
+        return np.inf
+    scale = max(np.nanmax(np.abs(reference)), 1.0)
+    return float(np.nanmax(np.abs(result - reference), initial=0.0)) / scale
+
+
+def load_inputs(scale):
+    """
+    以真实数据按时间方向重复scale次构造输入
+    """
+    store = load_panel_store()
+    main_columns = {'index': 'close', 'margin': 'margin_balance'}
+    series = {entry['symbol']: store.column(entry['symbol'], main_columns[entry['kind']]) for entry in get_catalog()}
+    _, aligned = store.calendar.align(series, 'outer')
+
+    index_symbol = get_catalog('index')[0]['symbol']
+    bars = store.get(index_symbol)
+    weeks = bars['date'].dt.to_period('W').to_numpy()
+    starts = np.flatnonzero(np.r_[True, weeks[1:] != weeks[:-1]])
+
+    close = np.tile(bars['close'].to_numpy(dtype='float64'), scale)
+    panel = np.tile(aligned, (scale, 1))
+    ohlc = np.tile(bars[list(OHLC)].to_numpy(dtype='float64'), (scale, 1))
+    starts = np.concatenate([starts + k * len(bars) for k in range(scale)])
+    return close, panel, ohlc, starts
+
+
+def references(close, panel, ohlc, starts):
+    """
+    各内核对应的pandas计算
+    """
+    centered = panel - np.nanmean(panel, axis=0)
+    i, j = np.triu_indices(panel.shape[1], 1)
+    groups = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(ohlc))))
+    return {
+        'rolling_mean': lambda: pd.Series(close).rolling(WINDOW).mean().to_numpy(),
+        'ewm_mean': lambda: pd.Series(close).ewm(span=SPAN, adjust=False).mean().to_numpy(),
+        'rolling_corr': lambda: np.column_stack([
+            pd.Series(centered[:, a]).rolling(CORR_WINDOW, min_periods=CORR_MIN_PERIODS).corr(pd.Series(centered[:, b]))
+            for a, b in zip(i, j)
+        ]),
+        'segment_reduce': lambda: pd.DataFrame(ohlc, columns=list(OHLC)).groupby(groups).agg(OHLC).to_numpy(),
+    }
+
+
+def kernel_calls(close, panel, ohlc, starts):
+    """
+    各内核的调用
+    """
+    centered = panel - np.nanmean(panel, axis=0)
+    i, j = np.triu_indices(panel.shape[1], 1)
+    return {
+        'rolling_mean': lambda: kernels.rolling_mean(close, WINDOW),
+        'ewm_mean': lambda: kernels.ewm_mean(close, SPAN),
+        'rolling_corr': lambda: kernels.rolling_corr(centered, i, j, CORR_WINDOW, CORR_MIN_PERIODS),
+        'segment_reduce': lambda: kernels.segment_reduce(ohlc, starts, list(OHLC.values())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    backends = kernels.available_backends()
+    if 'numba' in backends:
+        # 首次调用的编译耗时单独报告，不计入下表
+        kernels.set_backend('numba')
+        start = time.perf_counter()
+        for call in kernel_calls(*load_inputs(1)).values():
+            call()
+        print(f"numba compile/load: {(time.perf_counter() - start) * 1000:.0f} ms")
+    else:
+        print("numba not installed, timing the NumPy backend only")
+
+    header = f"{'kernel':<16}{'rows':>9}{'pandas ms':>11}" + ''.join(f"{name + ' ms':>11}" for name in backends)
+    print(header + f"{'speedup':>9}" + ''.join(f"{name + ' diff':>12}" for name in backends))
+    failed = False
+    for scale in args.scales:
+        inputs = load_inputs(scale)
+        calls = kernel_calls(*inputs)
+        for name, reference in references(*inputs).items():
+            pandas_time, expected = best_time(reference, args.repeat)
+            times, diffs = [], []
+            for backend in backends:
+                kernels.set_backend(backend)
+                elapsed, result = best_time(calls[name], args.repeat)
+                times.append(elapsed)
+                diffs.append(max_diff(result, expected))
+            failed |= max(diffs) > TOLERANCE.get(name, DEFAULT_TOLERANCE)
+            # 加速比：pandas与NumPy参考实现中较快者 / 默认实现
+            speedup = min(pandas_time, times[0]) / times[-1]
+            print(f"{name:<16}{len(inputs[0]):>9}{pandas_time * 1000:>11.2f}"
+                  + ''.join(f"{t * 1000:>11.2f}" for t in times) + f"{speedup:>8.1f}x" + ''.join(f"{d:>12.1e}" for d in diffs))
+    kernels.set_backend(None)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
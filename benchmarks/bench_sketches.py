@@ -0,0 +1,77 @@
+"""
+收益率分布草图基准测试
+把上证指数日涨跌幅在每个交易日重复1x/10x/100x（相当于每个日历桶内的数据量增加到相应倍数），
+对若干日期区间比较合并月度、年度草图与对区间内原始涨跌幅排序求分位数的耗时，并报告草图分位数的排名误差
+
+运行方式:
+    python benchmarks/bench_sketches.py [--scales 1 10 100] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.catalog import get_catalog
+from src.utils.clean_data import load_panel_store
+from src.utils.sketches import ReturnDistribution
+
+# 报告的分位点
+QUANTILES = np.array([0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99])
+
+
+def best_time(func, repeat):
+    """
+    多次执行取最短耗时
+
+    Returns:
+        tuple: (秒数, 最后一次的返回值)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    store = load_panel_store()
+    symbol = get_catalog('index')[0]['symbol']
+    base_dates = store.column(symbol, 'date')[1:]
+    returns = store.column(symbol, 'change_pct').astype('float64')[1:]
+
+    print(f"{'rows':>9}{'range':>8}{'build ms':>10}{'sort ms':>10}{'sketch ms':>11}{'speedup':>9}{'rank err':>10}")
+    for scale in args.scales:
+        dates = np.repeat(base_dates, scale)
+        # 同一交易日的各个值在当日涨跌幅附近小幅错开
+        values = np.repeat(returns, scale) + np.tile(np.linspace(-0.05, 0.05, scale), len(returns))
+        build_time, distribution = best_time(lambda: ReturnDistribution(dates, values), 1)
+
+        # 全部历史、后一半和最近一年（区间两端均不在月初）
+        days = len(base_dates)
+        for label, start in (('all', 0), ('half', days // 2 + 7), ('1y', days - 250)):
+            start_date, end_date = base_dates[start], base_dates[-3]
+            window = values[start * scale:(days - 2) * scale]
+            sort_time, exact = best_time(lambda: np.quantile(window, QUANTILES), args.repeat)
+            sketch_time, approx = best_time(
+                lambda: distribution.sketch(start_date, end_date).quantile(QUANTILES), args.repeat
+            )
+            # 排名误差：草图分位数在精确排序中的位置与目标分位点之差
+            ranks = np.searchsorted(np.sort(window), approx) / len(window)
+            rank_error = np.max(np.abs(ranks - QUANTILES))
+            print(f"{len(values):>9}{label:>8}{build_time * 1000:>10.1f}{sort_time * 1000:>10.2f}"
+                  f"{sketch_time * 1000:>11.2f}{sort_time / sketch_time:>8.1f}x{rank_error:>10.4f}")
+
+
+if __name__ == '__main__':
+    main()
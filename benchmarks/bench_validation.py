@@ -0,0 +1,73 @@
+"""
+数据校验耗时基准测试
+把每类原始数据按行复制到1倍、10倍和100倍规模，分别计时清洗和校验，
+输出校验耗时占清洗耗时的比例
+
+100倍的行数超出纳秒时间戳可表示的日期范围，复制的数据保留原日期，
+因此大规模下的报告中会出现大量duplicate_date违规，这不影响计时
+
+运行方式:
+    python benchmarks/bench_validation.py [--scales 1,10,100] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.catalog import get_catalog
+from src.utils.get_data import load_dataset
+from src.utils.clean_data import _clean_and_cast
+from src.utils.validation import validate_dataset, summarize_report
+
+
+def scale_raw(raw, copies):
+    """
+    将原始数据复制copies份
+
+    Returns:
+        pd.DataFrame: 原始格式的数据
+    """
+    return pd.concat([raw] * copies, ignore_index=True)
+
+
+def best_time(func, repeat):
+    """
+    多次执行取最短耗时
+
+    Returns:
+        tuple: (秒数, 最后一次的返回值)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scales', default='1,10,100')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    scales = [int(scale) for scale in args.scales.split(',')]
+
+    print(f"{'dataset':<12}{'scale':>7}{'rows':>11}{'clean s':>10}{'validate s':>12}{'ratio':>8}")
+    for entry in get_catalog():
+        raw = load_dataset(entry)
+        for scale in scales:
+            scaled = scale_raw(raw, scale)
+            clean_time, cleaned = best_time(lambda: _clean_and_cast(scaled, entry), args.repeat)
+            validate_time, report = best_time(lambda: validate_dataset(cleaned, entry['kind']), args.repeat)
+            print(f"{entry['symbol']:<12}{scale:>7}{len(cleaned):>11,}{clean_time:>10.3f}"
+                  f"{validate_time:>12.3f}{validate_time / clean_time:>8.1%}")
+        print(f"  report at {scales[-1]}x: {summarize_report(report)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+"""
+回调负载测试
+模拟多个浏览器会话，按真实的操作序列向本地运行的应用发送/_dash-update-component请求：
+页面切换（display_page及新页面的初始回调）、指数页面的市场/周期/日期区间切换、
+相关性页面的滚动窗口滑块拖动。按回调统计吞吐量、延迟分位数和错误率
+
+请求体根据/_dash-dependencies和页面布局中的组件属性生成，与浏览器发送的内容一致；
+回调输出中作为其他回调输入的属性会像浏览器一样继续触发下游回调
+
+运行方式:
+    python benchmarks/loadtest.py --start-server [--users 8] [--duration 30]
+    python benchmarks/loadtest.py --url http://127.0.0.1:8050 [--scenarios index,correlation]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 各页面路径
+PAGES = ['/', '/index-analysis', '/margin-analysis', '/correlation', '/backtest']
+
+# 操作序列：('navigate', 路径) 或 ('set', {组件id.属性: 值})
+SCENARIOS = {
+    'navigation': [('navigate', path) for path in PAGES],
+    'index': [
+        ('navigate', '/index-analysis'),
+        ('set', {'period-selector.value': 'weekly'}),
+        ('set', {'period-selector.value': 'monthly'}),
+        ('set', {'period-selector.value': 'daily'}),
+        ('set', {'market-selector.value': 'sz_index'}),
+        ('set', {'date-range.start_date': '2017-01-01'}),
+        ('set', {'date-range.start_date': '1991-01-01'}),
+        ('set', {'market-selector.value': 'both'}),
+        ('set', {'market-selector.value': 'sh_index', 'date-range.start_date': '2021-06-01'}),
+    ],
+    'correlation': [('navigate', '/correlation')] + [
+        ('set', {'rolling-window-slider.value': window}) for window in range(20, 251, 10)
+    ],
+}
+
+
+class DashClient:
+    """
+    模拟一个浏览器会话：维护页面上各组件的属性值，并按依赖关系发送回调请求
+    """
+
+    def __init__(self, base_url, dependencies, root_layout, recorder, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.dependencies = [dep for dep in dependencies if not dep.get('clientside_function')]
+        self.recorder = recorder
+        self.timeout = timeout
+        self.root_values = {}
+        _collect_props(root_layout, self.root_values)
+        # 与浏览器中的clientside回调一样，每个会话使用独立的会话标识
+        self.root_values['session-id.data'] = uuid.uuid4().hex
+        self.values = dict(self.root_values)
+
+    def _post(self, payload, query=''):
+        request = urllib.request.Request(
+            f'{self.base_url}/_dash-update-component{query}',
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = response.read()
+            return response.status, json.loads(body) if body else None
+
+    def _poll_job(self, payload, body, interval=0.1):
+        """
+        后台回调先返回任务标识，像浏览器一样轮询直到结果就绪
+        """
+        query = f"?cacheKey={body['cacheKey']}&job={body['job']}"
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            status, result = self._post(payload, query)
+            # 未完成时只返回进度，完成后返回response（或204表示未更新）
+            if status == 204 or (result and 'response' in result):
+                return status, result
+        raise TimeoutError('background job did not finish')
+
+    def fire(self, dep, changed, depth=0):
+        """
+        发送一个回调请求，并把返回值写回页面状态；返回值是其他回调的输入时继续触发
+        """
+        outputs = [_parse_prop(output) for output in dep['output'].strip('.').split('...')]
+        payload = {
+            'output': dep['output'],
+            'outputs': [{'id': i, 'property': p} for i, p in outputs],
+            'inputs': [self._prop_payload(item) for item in dep['inputs']],
+            'state': [self._prop_payload(item) for item in dep['state']],
+            'changedPropIds': changed,
+        }
+        if not dep['output'].startswith('..'):
+            payload['outputs'] = payload['outputs'][0]
+
+        label = _callback_label(dep)
+        start = time.perf_counter()
+        try:
+            status, body = self._post(payload)
+            if body and 'cacheKey' in body:
+                status, body = self._poll_job(payload, body)
+        except urllib.error.HTTPError as e:
+            self.recorder.record(label, time.perf_counter() - start, f'HTTP {e.code}')
+            return
+        except Exception as e:
+            self.recorder.record(label, time.perf_counter() - start, type(e).__name__)
+            return
+        self.recorder.record(label, time.perf_counter() - start, None)
+
+        # 204表示回调未更新任何输出
+        if status == 204 or not body:
+            return
+        updated = []
+        for component_id, props in body.get('response', {}).items():
+            for prop, value in props.items():
+                key = f'{component_id}.{prop}'
+                self.values[key] = value
+                updated.append(key)
+                if prop == 'children' and component_id == 'page-content':
+                    _collect_props(value, self.values)
+
+        if depth < 3:
+            for key in updated:
+                for downstream in self._triggered_by([key], exclude=dep):
+                    self.fire(downstream, [key], depth + 1)
+
+    def _prop_payload(self, item):
+        return {'id': item['id'], 'property': item['property'],
+                'value': self.values.get(f"{item['id']}.{item['property']}")}
+
+    def _triggered_by(self, keys, exclude=None):
+        return [
+            dep for dep in self.dependencies
+            if dep is not exclude
+            and any(f"{item['id']}.{item['property']}" in keys for item in dep['inputs'])
+            and self._outputs_present(dep)
+        ]
+
+    def _outputs_present(self, dep):
+        present = {key.split('.')[0] for key in self.values}
+        return all(component_id in present for component_id, _ in
+                   (_parse_prop(output) for output in dep['output'].strip('.').split('...')))
+
+    def navigate(self, path):
+        """
+        切换页面：display_page返回新页面布局后，像浏览器一样触发该页面的初始回调
+        """
+        self.values = dict(self.root_values)
+        self.values['url.pathname'] = path
+        router = [dep for dep in self.dependencies if dep['output'] == 'page-content.children'][0]
+        self.fire(router, ['url.pathname'], depth=3)
+
+        page_ids = {key.split('.')[0] for key in self.values} - {key.split('.')[0] for key in self.root_values}
+        for dep in self.dependencies:
+            if dep.get('prevent_initial_call') or dep is router:
+                continue
+            if any(item['id'] in page_ids for item in dep['inputs']) and self._outputs_present(dep):
+                self.fire(dep, [f"{item['id']}.{item['property']}" for item in dep['inputs']])
+
+    def set(self, changes):
+        """
+        修改页面上的输入，并触发以这些属性为输入的回调
+        """
+        self.values.update(changes)
+        for dep in self._triggered_by(list(changes)):
+            self.fire(dep, list(changes))
+
+
+def _parse_prop(output):
+    component_id, prop = output.rsplit('.', 1)
+    return component_id.lstrip('.'), prop
+
+
+def _callback_label(dep):
+    """
+    以第一个输出作为回调名称
+    """
+    component_id, prop = _parse_prop(dep['output'].strip('.').split('...')[0])
+    return f"{component_id}.{prop.split('@')[0]}"
+
+
+def _collect_props(node, values):
+    """
+    遍历布局JSON，记录所有带id组件的属性值
+    """
+    if isinstance(node, list):
+        for child in node:
+            _collect_props(child, values)
+    elif isinstance(node, dict):
+        props = node.get('props')
+        if props is None:
+            return
+        component_id = props.get('id')
+        if isinstance(component_id, str):
+            for prop, value in props.items():
+                if prop not in ('id', 'children'):
+                    values[f'{component_id}.{prop}'] = value
+            values.setdefault(f'{component_id}.children', None)
+        _collect_props(props.get('children'), values)
+
+
+class Recorder:
+    """
+    线程安全的请求结果记录
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, label, latency, error):
+        with self._lock:
+            self.latencies[label].append(latency)
+            if error is not None:
+                self.errors[label][error] += 1
+
+
+def _get_json(url, timeout=60):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def run_user(base_url, dependencies, root_layout, scenarios, deadline, recorder, seed):
+    """
+    一个虚拟用户：在截止时间前按随机顺序反复执行操作序列
+    """
+    rng = random.Random(seed)
+    client = DashClient(base_url, dependencies, root_layout, recorder)
+    while time.monotonic() < deadline:
+        for action, argument in SCENARIOS[rng.choice(scenarios)]:
+            if time.monotonic() >= deadline:
+                break
+            getattr(client, action)(argument)
+
+
+def start_server(port):
+    """
+    在子进程中启动应用（关闭调试模式和自动重载）
+    """
+    code = (
+        "import main; "
+        "main.start_background_services(); "
+        f"main.app.run(host='127.0.0.1', port={port}, debug=False, threaded=True)"
+    )
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=PROJECT_ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(600):
+        try:
+            _get_json(f'{base_url}/_dash-dependencies', timeout=1)
+            return process, base_url
+        except Exception:
+            if process.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def report(recorder, elapsed):
+    """
+    打印每个回调的吞吐量、延迟分位数和错误率
+    """
+    total = sum(len(values) for values in recorder.latencies.values())
+    total_errors = sum(sum(errors.values()) for errors in recorder.errors.values())
+    print(f"\n{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s, "
+          f"error rate {total_errors / max(total, 1):.2%}\n")
+
+    header = f"{'callback':<42}{'count':>7}{'req/s':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}"
+    print(header)
+    print('-' * len(header))
+    for label in sorted(recorder.latencies, key=lambda k: -len(recorder.latencies[k])):
+        latencies = np.array(recorder.latencies[label]) * 1000
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        errors = sum(recorder.errors.get(label, {}).values())
+        print(f"{label[:41]:<42}{len(latencies):>7}{len(latencies) / elapsed:>8.1f}"
+              f"{p50:>9.0f}{p90:>9.0f}{p99:>9.0f}{latencies.max():>9.0f}{errors / len(latencies):>8.1%}")
+    for label, errors in recorder.errors.items():
+        print(f"  {label}: " + ', '.join(f'{kind} x{count}' for kind, count in errors.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8050', help='address of a running app')
+    parser.add_argument('--start-server', action='store_true', help='start the app in a subprocess')
+    parser.add_argument('--port', type=int, default=8765, help='port for --start-server')
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='test duration in seconds')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated scenarios to mix ({', '.join(SCENARIOS)})")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    process = None
+    base_url = args.url.rstrip('/')
+    if args.start_server:
+        process, base_url = start_server(args.port)
+
+    try:
+        dependencies = _get_json(f'{base_url}/_dash-dependencies')
+        root_layout = _get_json(f'{base_url}/_dash-layout')
+
+        # 预热一次，避免首次加载数据计入结果
+        run_user(base_url, dependencies, root_layout, scenarios, time.monotonic() + 1, Recorder(), args.seed)
+
+        print(f"Running {args.users} users for {args.duration:.0f}s against {base_url} "
+              f"(scenarios: {', '.join(scenarios)})")
+        recorder = Recorder()
+        deadline = time.monotonic() + args.duration
+        threads = [
+            threading.Thread(target=run_user, args=(base_url, dependencies, root_layout, scenarios,
+                                                    deadline, recorder, args.seed + i))
+            for i in range(args.users)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report(recorder, time.perf_counter() - start)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
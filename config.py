@@ -12,6 +12,63 @@ DEBUG_MODE = True
 RAW_DATA_PATH = "data/raw"
 CLEANED_DATA_PATH = "data/cleaned"
 
+# 清洗后数据以版本化快照目录发布，当前版本之外保留的旧快照数
+SNAPSHOT_KEEP = 3
+
+# 派生数据产物目录（按数据集版本存放后台预计算结果）
+ARTIFACT_PATH = "data/artifacts"
+
+# 是否启动后台预计算，以及数据集版本检查间隔（秒）
+PRECOMPUTE_ENABLED = True
+PRECOMPUTE_POLL_SECONDS = 30
+
+# 是否监测data/raw下原始文件的追加并增量导入，以及检查间隔（秒，同时是页面检查数据更新的间隔）
+LIVE_INGEST_ENABLED = True
+LIVE_POLL_SECONDS = 5
+
+# 耗时回调（相关性、指数图表）是否作为后台回调在独立进程中执行，以及任务结果目录
+# 需要安装diskcache、multiprocess和psutil，未安装时按普通回调执行
+BACKGROUND_CALLBACKS_ENABLED = True
+BACKGROUND_CACHE_PATH = "data/cache/background"
+
+# 融资融券与指数领先/滞后分析的最大滞后（交易日）
+LEAD_LAG_MAX_LAG = 250
+
+# 数字输入框停止输入多久（秒）后才触发回调
+INPUT_DEBOUNCE_SECONDS = 0.5
+
+# 时间序列图的多分辨率瓦片：每个瓦片的时间桶数（2的幂），以及每条曲线最多发送的桶数
+TILE_SIZE = 256
+LOD_MAX_POINTS = 1000
+
+# 收益率分布草图（t-digest）的压缩参数：每个草图约SKETCH_COMPRESSION / 2个质心
+SKETCH_COMPRESSION = 200
+
+# 服务端会话存储：按浏览器会话保存回调的中间结果，浏览器只保存会话标识
+# 安装diskcache时保存在本地磁盘（服务进程与后台任务进程共享），超过容量上限时淘汰最早写入的条目；
+# 否则保存在进程内存中（计入CACHE_MEMORY_BUDGET），最多保存SESSION_STORE_MAX_ENTRIES条
+SESSION_STORE_PATH = "data/cache/sessions"
+SESSION_STORE_SIZE_LIMIT = 256 * 1024 * 1024
+SESSION_STORE_MAX_ENTRIES = 256
+SESSION_STORE_EXPIRE = 3600
+
+# 每个进程内存缓存（面板数据、指标、预计算产物、页面布局等）的总字节数上限，超出时按重算耗时/大小淘汰
+CACHE_MEMORY_BUDGET = 512 * 1024 * 1024
+
+# 数据导入并行度（进程/线程数），None表示使用CPU核数，1表示按顺序执行
+INGEST_WORKERS = None
+
+# 回测参数扫描并行进程数，None表示使用CPU核数，1表示在当前进程执行
+BACKTEST_WORKERS = None
+
+# 数值内核实现（滚动均值、EWM、滚动相关、分段聚合）：'numpy'或'numba'，None表示安装numba时自动使用numba
+KERNEL_BACKEND = None
+
+# 数据查询接口：默认/最大每页行数，流式响应每个分块的行数
+API_PAGE_SIZE = 10000
+API_MAX_PAGE_SIZE = 1000000
+API_CHUNK_ROWS = 8192
+
 # 图表配置
 DEFAULT_PLOT_HEIGHT = 600
 DEFAULT_PLOT_TEMPLATE = "plotly_white"
@@ -21,3 +78,57 @@ COLOR_UP = "red"  # 上涨颜色（中国习惯）
 COLOR_DOWN = "green"  # 下跌颜色
 COLOR_SH = "red"  # 沪市颜色
 COLOR_SZ = "green"  # 深市颜色
+
+# 数据集目录：新增一条数据序列只需在此添加一条记录
+# symbol: 唯一标识（同时决定清洗后文件名）；kind: 数据类型（index/margin）
+# file/encoding: data/raw下的原始文件及编码；market: 所属市场
+DATASET_CATALOG = [
+    {
+        'symbol': 'sh_index',
+        'kind': 'index',
+        'file': 'sh_index.csv',
+        'encoding': 'gb2312',
+        'market': '沪市',
+        'abbr': 'SH',
+        'label': 'Shanghai Composite Index',
+        'short_label': 'Shanghai Comp.',
+        'color': COLOR_SH,
+        'description': 'Historical data of Shanghai Composite Index',
+    },
+    {
+        'symbol': 'sz_index',
+        'kind': 'index',
+        'file': 'sz_index.csv',
+        'encoding': 'gb2312',
+        'market': '深市',
+        'abbr': 'SZ',
+        'label': 'Shenzhen Component Index',
+        'short_label': 'Shenzhen Comp.',
+        'color': COLOR_SZ,
+        'description': 'Historical data of Shenzhen Component Index',
+    },
+    {
+        'symbol': 'sh_margin',
+        'kind': 'margin',
+        'file': 'sh_margin_trade.csv',
+        'encoding': 'utf-8',
+        'market': '沪市',
+        'abbr': 'SH',
+        'label': 'Shanghai Market',
+        'short_label': 'SH Margin',
+        'color': COLOR_SH,
+        'description': 'Margin trading data for Shanghai market',
+    },
+    {
+        'symbol': 'sz_margin',
+        'kind': 'margin',
+        'file': 'sz_margin_trade.csv',
+        'encoding': 'utf-8',
+        'market': '深市',
+        'abbr': 'SZ',
+        'label': 'Shenzhen Market',
+        'short_label': 'SZ Margin',
+        'color': COLOR_SZ,
+        'description': 'Margin trading data for Shenzhen market',
+    },
+]
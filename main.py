@@ -12,16 +12,27 @@ import os
 # 将项目根目录添加到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from dash import Dash, html, dcc, Input, Output
+from dash import Dash, html, dcc, Input, Output, State, no_update
 import dash_bootstrap_components as dbc
 
-from config import APP_TITLE, APP_HOST, APP_PORT, DEBUG_MODE
+from config import (
+    APP_TITLE, APP_HOST, APP_PORT, DEBUG_MODE, PRECOMPUTE_ENABLED, LIVE_INGEST_ENABLED, LIVE_POLL_SECONDS
+)
 from src.components.navbar import create_navbar
 from src.pages.home import create_home_page
 from src.pages.index_analysis import create_index_analysis_page, register_index_callbacks
 from src.pages.margin_analysis import create_margin_analysis_page, register_margin_callbacks
 from src.pages.correlation import create_correlation_page, register_correlation_callbacks
-from src.utils.clean_data import process_and_save_all_data
+from src.pages.backtest import create_backtest_page, register_backtest_callbacks
+from src.utils.clean_data import (
+    process_and_save_all_data, get_dataset_version, load_validation_report, load_panel_store
+)
+from src.utils.layout_cache import layout_cache
+from src.utils.validation import summarize_report
+from src.utils.catalog import get_catalog
+from src.utils.precompute import start_precompute_scheduler
+from src.utils.live import start_raw_file_watcher
+from src.api.query import register_query_api
 
 
 def create_app():
@@ -47,6 +58,17 @@ def create_app():
     app.layout = html.Div([
         dcc.Location(id='url', refresh=False),
         
+        # 浏览器会话标识（标签页关闭前保持不变），服务器按会话跟踪请求代次
+        dcc.Store(id='session-id', storage_type='session'),
+        
+        # 数据集版本：定时检查，版本变化时各页面追加新数据
+        dcc.Store(id='data-version'),
+        dcc.Interval(
+            id='data-version-interval',
+            interval=LIVE_POLL_SECONDS * 1000,
+            disabled=not LIVE_INGEST_ENABLED
+        ),
+        
         # 导航栏
         create_navbar(),
         
@@ -54,6 +76,15 @@ def create_app():
         html.Div(id='page-content')
     ])
     
+    # 页面路径到布局构建函数的映射（未知路径显示首页）
+    pages = {
+        '/': create_home_page,
+        '/index-analysis': create_index_analysis_page,
+        '/margin-analysis': create_margin_analysis_page,
+        '/correlation': create_correlation_page,
+        '/backtest': create_backtest_page,
+    }
+    
     # 注册页面路由回调
     @app.callback(
         Output('page-content', 'children'),
@@ -63,28 +94,73 @@ def create_app():
         """
         根据 URL 路径显示对应页面
         
+        各页面布局（含按默认输入预先生成的图表）在每个数据集版本上只构建一次，之后直接返回缓存
+        
         Args:
             pathname (str): URL 路径
             
         Returns:
-            html.Div: 页面内容
+            dict: 序列化后的页面内容
+        """
+        if pathname not in pages:
+            pathname = '/'
+        return layout_cache.get(pathname, load_panel_store().version, pages[pathname])
+    
+    # 首次打开时在浏览器中生成会话标识
+    app.clientside_callback(
         """
-        if pathname == '/index-analysis':
-            return create_index_analysis_page()
-        elif pathname == '/margin-analysis':
-            return create_margin_analysis_page()
-        elif pathname == '/correlation':
-            return create_correlation_page()
-        else:  # 默认首页
-            return create_home_page()
+        function(timestamp, sessionId) {
+            if (sessionId) {
+                return window.dash_clientside.no_update;
+            }
+            return window.crypto && window.crypto.randomUUID
+                ? window.crypto.randomUUID()
+                : Date.now().toString(36) + Math.random().toString(36).slice(2);
+        }
+        """,
+        Output('session-id', 'data'),
+        Input('session-id', 'modified_timestamp'),
+        State('session-id', 'data')
+    )
+    
+    @app.callback(
+        Output('data-version', 'data'),
+        Input('data-version-interval', 'n_intervals'),
+        State('data-version', 'data')
+    )
+    def check_data_version(n_intervals, current_version):
+        """数据集版本变化时通知页面"""
+        version = get_dataset_version()
+        return version if version != current_version else no_update
     
     # 注册各页面的回调函数
     register_index_callbacks(app)
     register_margin_callbacks(app)
     register_correlation_callbacks(app)
+    register_backtest_callbacks(app)
+    
+    # 注册只读数据查询接口（/api/v1）
+    register_query_api(app.server)
     
     return app
 
+
+def start_background_services():
+    """
+    启动后台线程：预计算调度器和原始数据文件监测
+    
+    只在实际提供服务的进程中调用（main()中，或WSGI服务器的工作进程启动后），
+    导入本模块不会启动任何线程
+    """
+    # 启动后台预计算：数据集版本变化时预先生成派生数据
+    if PRECOMPUTE_ENABLED:
+        start_precompute_scheduler()
+    
+    # 监测原始数据文件，新增数据增量导入
+    if LIVE_INGEST_ENABLED:
+        start_raw_file_watcher()
+
+
 app = create_app()
 server = app.server
 
@@ -103,18 +179,22 @@ def main():
         print("Processing data...")
         process_and_save_all_data()
         print("Data processing complete.")
+        for entry in get_catalog():
+            print(f"  {entry['symbol']}: {summarize_report(load_validation_report(entry))}")
     except Exception as e:
         print(f"Data processing failed: {e}")
         print("\nPlease ensure the following data files exist in the data/raw directory:")
-        print("  - sh_index.csv")
-        print("  - sz_index.csv")
-        print("  - sh_margin_trade.csv")
-        print("  - sz_margin_trade.csv")
+        for entry in get_catalog():
+            print(f"  - {entry['file']}")
         sys.exit(1)
     
     # 创建应用
     print("\nStarting application...")
     
+    # 调试模式的自动重载由父进程监测文件、子进程（WERKZEUG_RUN_MAIN）提供服务，后台线程只在后者中启动
+    if not DEBUG_MODE or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
+    
     # 运行服务器
     print(f"\nApplication started successfully!")
     print(f"\nAccess at: http://{APP_HOST}:{APP_PORT}")
@@ -0,0 +1,3 @@
+"""
+数据查询接口模块
+"""
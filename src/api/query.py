@@ -0,0 +1,285 @@
+"""
+只读数据查询接口
+在Dash应用的Flask服务器上提供REST路由，直接从内存中的面板数据存储返回清洗后的数据，
+供其他内部工具使用，无需再自行解析CSV文件
+
+路由:
+    GET /api/v1/datasets                 数据集列表（列、行数、日期范围、版本）
+    GET /api/v1/datasets/<symbol>        查询单个数据集
+    GET /api/v1/cache                    本进程内存缓存的占用、命中和淘汰统计
+
+查询参数:
+    start, end      日期区间（含两端，YYYY-MM-DD或YYYYMMDD）
+    columns         逗号分隔的列名，date列总是返回
+    period          daily（默认）、weekly或monthly，仅指数数据支持重采样
+    format          ndjson（默认）或arrow（Arrow IPC流，需要安装pyarrow），
+                    也可通过Accept头指定
+    limit, offset   分页，响应头X-Next-Offset给出下一页的偏移量
+    version         期望的数据集版本，与当前版本不一致时返回409
+"""
+
+import io
+from urllib.parse import urlencode
+import numpy as np
+import pandas as pd
+from flask import Blueprint, Response, jsonify, request
+from config import API_PAGE_SIZE, API_MAX_PAGE_SIZE, API_CHUNK_ROWS
+from src.utils.cache_manager import cache_manager
+from src.utils.catalog import get_catalog
+from src.utils.clean_data import load_panel_store
+from src.utils.precompute import get_resampled
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow为可选依赖，未安装时仅提供NDJSON格式
+    pa = None
+
+
+PERIODS = ('daily', 'weekly', 'monthly')
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+api = Blueprint('data_api', __name__, url_prefix='/api/v1')
+
+
+class QueryError(Exception):
+    """
+    查询参数错误，转换为带状态码的JSON错误响应
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+@api.errorhandler(QueryError)
+def _handle_query_error(error):
+    response = jsonify({'error': str(error)})
+    response.status_code = error.status
+    return response
+
+
+def _int_arg(name, default, minimum=0, maximum=None):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise QueryError(f"'{name}' must be an integer")
+    if maximum is None and value < minimum:
+        raise QueryError(f"'{name}' must be >= {minimum}")
+    if maximum is not None and not minimum <= value <= maximum:
+        raise QueryError(f"'{name}' must be between {minimum} and {maximum}")
+    return value
+
+
+def _response_format():
+    """
+    根据format参数或Accept头确定响应格式
+    """
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = 'arrow' if ARROW_MIMETYPE in request.headers.get('Accept', '') else 'ndjson'
+    if fmt not in ('ndjson', 'arrow'):
+        raise QueryError("'format' must be 'ndjson' or 'arrow'")
+    if fmt == 'arrow' and pa is None:
+        raise QueryError("Arrow format requires pyarrow, which is not installed", status=406)
+    return fmt
+
+
+def _select_rows(df, start_date, end_date):
+    """
+    按日期区间截取（数据按日期升序，使用二分查找）
+    """
+    dates = df['date'].to_numpy()
+    start = 0 if start_date is None else int(np.searchsorted(dates, np.datetime64(start_date), side='left'))
+    stop = len(df) if end_date is None else int(np.searchsorted(dates, np.datetime64(end_date), side='right'))
+    return df.iloc[start:max(start, stop)]
+
+
+# 日期参数接受的格式（原始数据文件使用紧凑格式YYYYMMDD）
+DATE_FORMATS = ('%Y-%m-%d', '%Y%m%d')
+
+
+def _parse_date(name, value):
+    """
+    解析日期参数，只接受DATE_FORMATS中的格式
+
+    Returns:
+        np.datetime64: 纳秒精度的日期，参数缺失时为None
+    """
+    if value is None:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return pd.to_datetime(value, format=fmt).to_datetime64()
+        except (ValueError, OverflowError):
+            continue
+    raise QueryError(f"'{name}' must be a date (YYYY-MM-DD or YYYYMMDD)")
+
+
+def query_dataset(store, symbol, start_date=None, end_date=None, columns=None, period='daily'):
+    """
+    查询一个数据集的指定区间、列和周期
+
+    Args:
+        store (PanelStore): 面板数据存储
+        symbol (str): 数据集标识
+        start_date (str): 起始日期（含）
+        end_date (str): 结束日期（含）
+        columns (list): 需要的列（date列总是包含），为None时返回全部
+        period (str): 'daily'、'weekly'或'monthly'
+
+    Returns:
+        pd.DataFrame: 查询结果
+    """
+    if symbol not in store.kinds:
+        raise QueryError(f"Unknown dataset: {symbol}", status=404)
+    if period not in PERIODS:
+        raise QueryError(f"'period' must be one of {', '.join(PERIODS)}")
+    if period != 'daily' and store.kinds[symbol] != 'index':
+        raise QueryError("Only index datasets can be resampled")
+
+    start_date = _parse_date('start', start_date)
+    end_date = _parse_date('end', end_date)
+
+    if period == 'daily':
+        df = store.get(symbol, start_date=start_date, end_date=end_date)
+    else:
+        df = _select_rows(get_resampled(store, symbol, period), start_date, end_date)
+
+    if columns is not None:
+        unknown = [column for column in columns if column not in df.columns]
+        if unknown:
+            raise QueryError(f"Unknown columns: {', '.join(unknown)}")
+        df = df[['date'] + [column for column in columns if column != 'date']]
+    return df
+
+
+def _float32_to_decimal(values):
+    """
+    将float32数组按7位有效数字转换为float64，避免99.98输出为99.9800033569
+    """
+    values = values.astype('float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exponent = np.floor(np.log10(np.abs(values)))
+    scale = 10.0 ** (6 - np.where(np.isfinite(exponent), exponent, 0))
+    return np.round(values * scale) / scale
+
+
+def _ndjson_chunks(df):
+    """
+    按分块生成NDJSON，日期输出为YYYY-MM-DD
+    """
+    float32_columns = [column for column in df.columns if df[column].dtype == 'float32']
+    for start in range(0, len(df), API_CHUNK_ROWS):
+        chunk = df.iloc[start:start + API_CHUNK_ROWS].copy()
+        chunk['date'] = np.datetime_as_string(chunk['date'].to_numpy(), unit='D')
+        for column in float32_columns:
+            chunk[column] = _float32_to_decimal(chunk[column].to_numpy())
+        yield chunk.to_json(orient='records', lines=True, force_ascii=False)
+
+
+def _arrow_chunks(df):
+    """
+    按分块生成Arrow IPC流：先输出schema，每个分块一个record batch
+    """
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for start in range(0, len(df), API_CHUNK_ROWS):
+            chunk = df.iloc[start:start + API_CHUNK_ROWS]
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+@api.route('/datasets')
+def list_datasets():
+    """
+    数据集列表
+    """
+    store = load_panel_store()
+    datasets = []
+    for entry in get_catalog():
+        if entry['symbol'] not in store.kinds:
+            continue
+        start, stop = store.offsets[entry['symbol']]
+        dates = store.panels[entry['kind']]['date'].iloc[[start, stop - 1]] if stop > start else None
+        datasets.append({
+            'symbol': entry['symbol'],
+            'kind': entry['kind'],
+            'label': entry['label'],
+            'market': entry['market'],
+            'columns': list(store.panels[entry['kind']].columns[1:]),
+            'periods': list(PERIODS) if entry['kind'] == 'index' else ['daily'],
+            'rows': stop - start,
+            'start_date': None if dates is None else dates.iloc[0].strftime('%Y-%m-%d'),
+            'end_date': None if dates is None else dates.iloc[-1].strftime('%Y-%m-%d'),
+        })
+    return jsonify({'version': store.version, 'datasets': datasets})
+
+
+@api.route('/datasets/<symbol>')
+def get_dataset_rows(symbol):
+    """
+    查询单个数据集，流式返回NDJSON或Arrow IPC
+    """
+    store = load_panel_store()
+    version = request.args.get('version')
+    if version is not None and version != store.version:
+        raise QueryError(f"Dataset version {version} is no longer available (current: {store.version})", status=409)
+
+    fmt = _response_format()
+    columns = request.args.get('columns')
+    columns = [column.strip() for column in columns.split(',') if column.strip()] if columns else None
+    df = query_dataset(
+        store, symbol,
+        start_date=request.args.get('start'),
+        end_date=request.args.get('end'),
+        columns=columns,
+        period=request.args.get('period', 'daily')
+    )
+
+    # 分页
+    total = len(df)
+    limit = _int_arg('limit', API_PAGE_SIZE, minimum=1, maximum=API_MAX_PAGE_SIZE)
+    offset = _int_arg('offset', 0)
+    page = df.iloc[offset:offset + limit]
+
+    headers = {
+        'X-Dataset-Version': store.version,
+        'X-Total-Count': str(total),
+        'Cache-Control': 'no-cache',
+    }
+    if offset + limit < total:
+        headers['X-Next-Offset'] = str(offset + limit)
+        args = request.args.to_dict()
+        args.update(offset=offset + limit, limit=limit, version=store.version)
+        headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+
+    if fmt == 'arrow':
+        return Response(_arrow_chunks(page), mimetype=ARROW_MIMETYPE, headers=headers)
+    return Response(_ndjson_chunks(page), mimetype=NDJSON_MIMETYPE, headers=headers)
+
+
+@api.route('/cache')
+def cache_stats():
+    """
+    内存缓存统计
+    """
+    return jsonify(cache_manager.stats())
+
+
+def register_query_api(server):
+    """
+    在Flask服务器上注册数据查询接口
+
+    Args:
+        server (flask.Flask): Dash应用的Flask服务器
+    """
+    server.register_blueprint(api)
@@ -0,0 +1,120 @@
+"""
+回测图表组件
+"""
+
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+import pandas as pd
+
+
+def create_equity_curve_chart(dates, strategy_equity, benchmark_equity, drawdown, title="Strategy Backtest"):
+    """
+    创建净值曲线和回撤图
+
+    Args:
+        dates (pd.Series): 交易日
+        strategy_equity (np.ndarray): 策略净值
+        benchmark_equity (np.ndarray): 买入持有净值
+        drawdown (np.ndarray): 策略回撤（负数）
+        title (str): 图表标题
+
+    Returns:
+        plotly.graph_objects.Figure: 净值曲线图
+    """
+    fig = make_subplots(
+        rows=2, cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.05,
+        subplot_titles=('Equity Curve (log scale)', 'Strategy Drawdown'),
+        row_heights=[0.7, 0.3]
+    )
+
+    fig.add_trace(
+        go.Scatter(
+            x=dates,
+            y=strategy_equity,
+            mode='lines',
+            name='Strategy',
+            line=dict(color='red', width=2)
+        ),
+        row=1, col=1
+    )
+
+    fig.add_trace(
+        go.Scatter(
+            x=dates,
+            y=benchmark_equity,
+            mode='lines',
+            name='Buy & Hold',
+            line=dict(color='gray', width=1.5)
+        ),
+        row=1, col=1
+    )
+
+    fig.add_trace(
+        go.Scatter(
+            x=dates,
+            y=drawdown * 100,
+            mode='lines',
+            name='Drawdown',
+            line=dict(color='green', width=1),
+            fill='tozeroy',
+            fillcolor='rgba(0, 150, 0, 0.2)',
+            showlegend=False
+        ),
+        row=2, col=1
+    )
+
+    fig.update_yaxes(title_text="Equity (start=1)", type='log', row=1, col=1)
+    fig.update_yaxes(title_text="Drawdown (%)", row=2, col=1)
+    fig.update_xaxes(title_text="Date", row=2, col=1)
+
+    fig.update_layout(
+        title=title,
+        height=650,
+        hovermode='x unified',
+        template='plotly_white',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+
+    return fig
+
+
+def create_sweep_heatmap(table, metric='sharpe', metric_name='Sharpe Ratio'):
+    """
+    创建均线窗口参数扫描热力图
+
+    Args:
+        table (pd.DataFrame): sweep_ma_crossover()的结果
+        metric (str): 展示的指标列
+        metric_name (str): 指标显示名称
+
+    Returns:
+        plotly.graph_objects.Figure: 参数热力图（横轴慢线，纵轴快线）
+    """
+    heatmap_data = table.pivot(index='fast', columns='slow', values=metric)
+
+    fig = go.Figure(data=go.Heatmap(
+        z=heatmap_data.values,
+        x=heatmap_data.columns,
+        y=heatmap_data.index,
+        colorscale='RdYlGn',
+        colorbar=dict(title=metric_name),
+        hovertemplate='Fast: %{y}<br>Slow: %{x}<br>' + metric_name + ': %{z:.3f}<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title=f'MA Crossover Parameter Sweep - {metric_name} ({len(table)} combinations)',
+        xaxis_title='Slow MA Window',
+        yaxis_title='Fast MA Window',
+        height=550,
+        template='plotly_white'
+    )
+
+    return fig
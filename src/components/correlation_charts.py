@@ -7,9 +7,26 @@ import plotly.express as px
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
+from dash import Patch
+from src.utils.correlation import align_series
+from src.utils.derived import pair_rolling_correlation
 
 
-def create_correlation_scatter(df1, df2, name1='Index 1', name2='Index 2'):
+def _aligned_frame(df1, df2, column, aligned=None):
+    """
+    两个指数某一列按共同交易日对齐后的数据（列名加_1、_2后缀）
+    
+    Args:
+        aligned (tuple): 已对齐的(日期, 形状为(交易日数, 2)的取值)，为None时现场对齐
+    """
+    if aligned is None:
+        dates, _, values = align_series({'a': df1, 'b': df2}, column, how='inner')
+    else:
+        dates, values = aligned
+    return pd.DataFrame({'date': dates, f'{column}_1': values[:, 0], f'{column}_2': values[:, 1]})
+
+
+def create_correlation_scatter(df1, df2, name1='Index 1', name2='Index 2', aligned=None):
     """
     创建两个指数的散点图和相关性分析
     
@@ -18,17 +35,13 @@ def create_correlation_scatter(df1, df2, name1='Index 1', name2='Index 2'):
         df2 (pd.DataFrame): 第二个指数数据
         name1 (str): 第一个指数名称
         name2 (str): 第二个指数名称
+        aligned (tuple): 按共同交易日对齐的(日期, 收盘价数组)，为None时现场对齐
         
     Returns:
         plotly.graph_objects.Figure: 散点图
     """
-    # 合并数据，确保日期对齐
-    merged = pd.merge(
-        df1[['date', 'close']],
-        df2[['date', 'close']],
-        on='date',
-        suffixes=('_1', '_2')
-    )
+    # 按共同交易日对齐
+    merged = _aligned_frame(df1, df2, 'close', aligned)
     
     # 计算相关系数
     correlation = np.corrcoef(merged['close_1'], merged['close_2'])[0, 1]
@@ -83,7 +96,7 @@ def create_correlation_scatter(df1, df2, name1='Index 1', name2='Index 2'):
     return fig
 
 
-def create_rolling_correlation(df1, df2, window=60, name1='Index 1', name2='Index 2'):
+def create_rolling_correlation(df1, df2, window=60, name1='Index 1', name2='Index 2', rolling=None):
     """
     创建滚动相关性图表
     
@@ -93,27 +106,21 @@ def create_rolling_correlation(df1, df2, window=60, name1='Index 1', name2='Inde
         window (int): 滚动窗口大小
         name1 (str): 第一个指数名称
         name2 (str): 第二个指数名称
+        rolling (pd.DataFrame): 预计算的滚动相关系数（date、rolling_corr列），为None时现场计算
         
     Returns:
         plotly.graph_objects.Figure: 滚动相关性图表
     """
-    # 合并数据
-    merged = pd.merge(
-        df1[['date', 'close']],
-        df2[['date', 'close']],
-        on='date',
-        suffixes=('_1', '_2')
-    )
-    
-    # 计算滚动相关系数
-    merged['rolling_corr'] = merged['close_1'].rolling(window=window).corr(merged['close_2'])
+    # 按共同交易日对齐并计算滚动相关系数
+    if rolling is None:
+        rolling = pair_rolling_correlation(df1, df2, window)
     
     fig = go.Figure()
     
     fig.add_trace(
         go.Scatter(
-            x=merged['date'],
-            y=merged['rolling_corr'],
+            x=rolling['date'],
+            y=rolling['rolling_corr'],
             mode='lines',
             name=f'{window}-Day Rolling Correlation',
             line=dict(color='blue', width=2),
@@ -139,7 +146,28 @@ def create_rolling_correlation(df1, df2, window=60, name1='Index 1', name2='Inde
     return fig
 
 
-def create_dual_axis_chart(df1, df2, name1='Index 1', name2='Index 2'):
+def rolling_correlation_patch(rolling, window, name1='Index 1', name2='Index 2'):
+    """
+    生成只改变滚动窗口时更新create_rolling_correlation图表的Patch
+    （交易日、参考线和坐标轴不变，只替换相关系数序列和标题）
+    
+    Args:
+        rolling (pd.DataFrame): 滚动相关系数（date、rolling_corr列）
+        window (int): 滚动窗口大小
+        name1 (str): 第一个指数名称
+        name2 (str): 第二个指数名称
+        
+    Returns:
+        dash.Patch: 图表的局部更新
+    """
+    patch = Patch()
+    patch['data'][0]['y'] = rolling['rolling_corr'].to_numpy()
+    patch['data'][0]['name'] = f'{window}-Day Rolling Correlation'
+    patch['layout']['title']['text'] = f'{window}-Day Rolling Correlation between {name1} and {name2}'
+    return patch
+
+
+def create_dual_axis_chart(df1, df2, name1='Index 1', name2='Index 2', aligned=None):
     """
     创建双Y轴对比图
     
@@ -148,17 +176,13 @@ def create_dual_axis_chart(df1, df2, name1='Index 1', name2='Index 2'):
         df2 (pd.DataFrame): 第二个指数数据
         name1 (str): 第一个指数名称
         name2 (str): 第二个指数名称
+        aligned (tuple): 按共同交易日对齐的(日期, 收盘价数组)，为None时现场对齐
         
     Returns:
         plotly.graph_objects.Figure: 双Y轴图表
     """
     # 确保数据按日期对齐
-    merged = pd.merge(
-        df1[['date', 'close']],
-        df2[['date', 'close']],
-        on='date',
-        suffixes=('_1', '_2')
-    )
+    merged = _aligned_frame(df1, df2, 'close', aligned)
     
     fig = make_subplots(specs=[[{"secondary_y": True}]])
     
@@ -199,7 +223,25 @@ def create_dual_axis_chart(df1, df2, name1='Index 1', name2='Index 2'):
     return fig
 
 
-def create_return_comparison(df1, df2, name1='Index 1', name2='Index 2'):
+def dual_axis_patch(aligned):
+    """
+    生成替换create_dual_axis_chart图表数据的Patch（缩放到不同级别的瓦片时只替换两条曲线的数据）
+    
+    Args:
+        aligned (tuple): 对齐的(日期, 形状为(点数, 2)的收盘价数组)
+        
+    Returns:
+        dash.Patch: 图表的局部更新
+    """
+    dates, values = aligned
+    patch = Patch()
+    for i in range(2):
+        patch['data'][i]['x'] = dates
+        patch['data'][i]['y'] = values[:, i]
+    return patch
+
+
+def create_return_comparison(df1, df2, name1='Index 1', name2='Index 2', aligned=None):
     """
     创建收益率对比图
     
@@ -208,17 +250,13 @@ def create_return_comparison(df1, df2, name1='Index 1', name2='Index 2'):
         df2 (pd.DataFrame): 第二个指数数据
         name1 (str): 第一个指数名称
         name2 (str): 第二个指数名称
+        aligned (tuple): 按共同交易日对齐的(日期, 涨跌幅数组)，为None时现场对齐
         
     Returns:
         plotly.graph_objects.Figure: 收益率对比图
     """
-    # 合并数据
-    merged = pd.merge(
-        df1[['date', 'close', 'change_pct']],
-        df2[['date', 'close', 'change_pct']],
-        on='date',
-        suffixes=('_1', '_2')
-    )
+    # 按共同交易日对齐
+    merged = _aligned_frame(df1, df2, 'change_pct', aligned)
     
     fig = make_subplots(
         rows=2, cols=1,
@@ -263,51 +301,182 @@ def create_return_comparison(df1, df2, name1='Index 1', name2='Index 2'):
     return fig
 
 
-def create_correlation_matrix(data_dict):
+def create_correlation_matrix(corr_matrix, names, title='Index Correlation Matrix'):
     """
     创建相关性矩阵热力图
     
     Args:
-        data_dict (dict): 包含多个指数数据的字典
+        corr_matrix (np.ndarray): 形状为(k, k)的相关系数矩阵
+        names (list): 序列名称列表
+        title (str): 图表标题
         
     Returns:
         plotly.graph_objects.Figure: 相关性矩阵热力图
     """
-    # 准备数据
-    df_list = []
-    names = []
-    
-    for name, df in data_dict.items():
-        df_temp = df[['date', 'close']].copy()
-        df_temp.columns = ['date', name]
-        df_list.append(df_temp)
-        names.append(name)
-    
-    # 合并所有数据
-    merged = df_list[0]
-    for df in df_list[1:]:
-        merged = pd.merge(merged, df, on='date', how='inner')
-    
-    # 计算相关性矩阵
-    corr_matrix = merged[names].corr()
+    # 序列较多时不在格子内显示数值
+    show_text = len(names) <= 20
     
     # 创建热力图
     fig = go.Figure(data=go.Heatmap(
-        z=corr_matrix.values,
-        x=corr_matrix.columns,
-        y=corr_matrix.index,
+        z=corr_matrix,
+        x=names,
+        y=names,
         colorscale='RdBu',
         zmid=0,
-        text=corr_matrix.values,
-        texttemplate='%{text:.3f}',
+        text=corr_matrix if show_text else None,
+        texttemplate='%{text:.3f}' if show_text else None,
         textfont={"size": 12},
         colorbar=dict(title="Correlation")
     ))
     
     fig.update_layout(
-        title='Index Correlation Matrix',
-        height=500,
+        title=title,
+        height=max(500, 20 * len(names)),
         template='plotly_white'
     )
     
     return fig
+
+
+def correlation_matrix_patch(corr_matrix, names, title='Index Correlation Matrix'):
+    """
+    生成序列不变时更新create_correlation_matrix图表的Patch（只替换相关系数和标题）
+    
+    Args:
+        corr_matrix (np.ndarray): 形状为(k, k)的相关系数矩阵
+        names (list): 序列名称列表（与图表中一致）
+        title (str): 图表标题
+        
+    Returns:
+        dash.Patch: 图表的局部更新
+    """
+    patch = Patch()
+    patch['data'][0]['z'] = corr_matrix
+    if len(names) <= 20:
+        patch['data'][0]['text'] = corr_matrix
+    patch['layout']['title']['text'] = title
+    return patch
+
+
+def create_lead_lag_chart(scan, name_x, name_y, measure_name):
+    """
+    创建领先/滞后相关系数图（各滞后下的相关系数及95%显著性区间）
+    
+    Args:
+        scan (pd.DataFrame): 包含lag、corr、count列的数据
+        name_x (str): 领先候选序列名称
+        name_y (str): 指数名称
+        measure_name (str): 融资融券指标名称
+        
+    Returns:
+        plotly.graph_objects.Figure: 领先/滞后相关图
+    """
+    corr = scan['corr'].to_numpy()
+    # 无相关假设下相关系数的近似95%区间
+    band = 1.96 / np.sqrt(np.maximum(scan['count'].to_numpy(), 1))
+    
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=np.concatenate([scan['lag'], scan['lag'][::-1]]),
+            y=np.concatenate([band, -band[::-1]]),
+            fill='toself',
+            fillcolor='rgba(128, 128, 128, 0.2)',
+            line=dict(width=0),
+            name='95% Band',
+            hoverinfo='skip'
+        )
+    )
+    fig.add_trace(
+        go.Bar(
+            x=scan['lag'],
+            y=corr,
+            name='Correlation',
+            marker_color=np.where(np.abs(corr) > band, 'rgba(0, 100, 200, 0.9)', 'rgba(0, 100, 200, 0.35)'),
+            customdata=scan['count'],
+            hovertemplate='<b>Lag:</b> %{x}<br><b>Correlation:</b> %{y:.4f}<br><b>Pairs:</b> %{customdata}<extra></extra>'
+        )
+    )
+    
+    if np.isfinite(corr).any():
+        peak = int(np.nanargmax(np.abs(corr)))
+        fig.add_annotation(
+            x=scan['lag'].iloc[peak], y=corr[peak],
+            text=f"Peak: lag {scan['lag'].iloc[peak]}, {corr[peak]:.3f}",
+            showarrow=True, arrowhead=2
+        )
+    fig.add_vline(x=0, line_dash="dash", line_color="gray", opacity=0.5)
+    
+    fig.update_layout(
+        title=f'{measure_name} vs {name_y} Return<br><sup>Positive lag: {name_x} leads the index by that many trading days</sup>',
+        xaxis_title='Lag (trading days)',
+        yaxis_title='Correlation Coefficient',
+        height=450,
+        template='plotly_white',
+        showlegend=False,
+        bargap=0
+    )
+    
+    return fig
+
+
+def create_lagged_rolling_chart(dates, rolling, lag, window, name_x, name_y):
+    """
+    创建指定滞后下的滚动相关系数图
+    
+    Args:
+        dates (np.ndarray): 交易日
+        rolling (np.ndarray): 滚动相关系数
+        lag (int): 滞后天数
+        window (int): 滚动窗口大小
+        name_x (str): 领先候选序列名称
+        name_y (str): 指数名称
+        
+    Returns:
+        plotly.graph_objects.Figure: 滚动相关系数图
+    """
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=dates,
+            y=rolling,
+            mode='lines',
+            name=f'{window}-Day Rolling Correlation',
+            line=dict(color='purple', width=2),
+            fill='tozeroy',
+            fillcolor='rgba(128, 0, 128, 0.15)'
+        )
+    )
+    fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
+    
+    fig.update_layout(
+        title=f'{window}-Day Rolling Correlation at Lag {lag}: {name_x} vs {name_y}',
+        xaxis_title='Date',
+        yaxis_title='Correlation Coefficient',
+        height=400,
+        template='plotly_white',
+        hovermode='x unified'
+    )
+    
+    return fig
+
+
+def lagged_rolling_patch(rolling, lag, window, name_x, name_y):
+    """
+    生成交易日不变时更新create_lagged_rolling_chart图表的Patch（只替换相关系数序列和标题）
+    
+    Args:
+        rolling (np.ndarray): 滚动相关系数
+        lag (int): 滞后天数
+        window (int): 滚动窗口大小
+        name_x (str): 领先候选序列名称
+        name_y (str): 指数名称
+        
+    Returns:
+        dash.Patch: 图表的局部更新
+    """
+    patch = Patch()
+    patch['data'][0]['y'] = rolling
+    patch['data'][0]['name'] = f'{window}-Day Rolling Correlation'
+    patch['layout']['title']['text'] = f'{window}-Day Rolling Correlation at Lag {lag}: {name_x} vs {name_y}'
+    return patch
@@ -5,11 +5,83 @@
 
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
-from src.utils.clean_data import resample_to_weekly, resample_to_monthly
+from dash import Patch
+from src.utils.indicators import INDICATORS, parse_spec
 
 
-def create_candlestick_chart(df, title="Candlestick Chart", period="Daily"):
+# 叠加线配色（按指标顺序循环使用）
+OVERLAY_COLORS = ['blue', 'orange', 'purple', 'brown', 'teal', 'magenta']
+
+
+def _add_indicator_traces(fig, dates, indicators, specs, panel_rows):
+    """
+    按指标显示位置添加指标曲线
+    
+    Args:
+        fig (go.Figure): K线图对象
+        dates (pd.Series): 日期
+        indicators (pd.DataFrame): 与K线逐行对齐的指标数据
+        specs (list): 指标规格字符串列表
+        panel_rows (dict): 独立子图指标规格到子图行号的映射
+    """
+    overlay_index = 0
+    for spec in specs:
+        name, params = parse_spec(spec)
+        placement = INDICATORS[name]['placement']
+        label = INDICATORS[name]['label'] + ''.join(f'{p}' if i == 0 else f',{p}' for i, p in enumerate(params))
+        
+        if name in ('sma', 'ema', 'vma'):
+            row = 1 if placement == 'price' else 2
+            color = OVERLAY_COLORS[overlay_index % len(OVERLAY_COLORS)]
+            overlay_index += 1
+            fig.add_trace(
+                go.Scatter(x=dates, y=indicators[f'{name}{params[0]}'], mode='lines', name=label,
+                           line=dict(color=color, width=1)),
+                row=row, col=1
+            )
+        elif name == 'boll':
+            prefix = f'boll{params[0]}_{params[1]}'
+            for part, dash in (('upper', 'dot'), ('mid', 'solid'), ('lower', 'dot')):
+                fig.add_trace(
+                    go.Scatter(x=dates, y=indicators[f'{prefix}_{part}'], mode='lines',
+                               name=f'{label} {part}', line=dict(color='gray', width=1, dash=dash)),
+                    row=1, col=1
+                )
+        elif name == 'macd':
+            prefix = f'macd{params[0]}_{params[1]}_{params[2]}'
+            row = panel_rows[spec]
+            hist = indicators[f'{prefix}_hist']
+            fig.add_trace(
+                go.Bar(x=dates, y=hist, name=f'{label} hist', showlegend=False,
+                       marker_color=['red' if v >= 0 else 'green' for v in hist.fillna(0)]),
+                row=row, col=1
+            )
+            fig.add_trace(
+                go.Scatter(x=dates, y=indicators[f'{prefix}_dif'], mode='lines', name='DIF',
+                           line=dict(color='black', width=1)),
+                row=row, col=1
+            )
+            fig.add_trace(
+                go.Scatter(x=dates, y=indicators[f'{prefix}_dea'], mode='lines', name='DEA',
+                           line=dict(color='orange', width=1)),
+                row=row, col=1
+            )
+        else:
+            row = panel_rows[spec]
+            column = name if not params else f'{name}{params[0]}'
+            fig.add_trace(
+                go.Scatter(x=dates, y=indicators[column], mode='lines', name=label,
+                           line=dict(color='purple', width=1)),
+                row=row, col=1
+            )
+            if name == 'rsi':
+                fig.add_hline(y=70, line_dash="dot", line_color="red", opacity=0.4, row=row, col=1)
+                fig.add_hline(y=30, line_dash="dot", line_color="green", opacity=0.4, row=row, col=1)
+
+
+def create_candlestick_chart(df, title="Candlestick Chart", period="Daily", indicators=None, specs=None):
     """
     创建K线图
     
@@ -17,17 +89,34 @@ def create_candlestick_chart(df, title="Candlestick Chart", period="Daily"):
         df (pd.DataFrame): 包含OHLC数据的DataFrame
         title (str): 图表标题
         period (str): 周期（日线/周线/月线）
+        indicators (pd.DataFrame): 与df逐行对齐的技术指标数据，为None时使用df中的ma列
+        specs (list): 要显示的指标规格字符串列表（见src.utils.indicators）
         
     Returns:
         plotly.graph_objects.Figure: K线图对象
     """
-    # 创建子图：K线图 + 成交量
+    specs = specs or []
+    panel_specs = [
+        spec for spec in specs if INDICATORS[parse_spec(spec)[0]]['placement'] == 'panel'
+    ] if indicators is not None else []
+    panel_rows = {spec: 3 + i for i, spec in enumerate(panel_specs)}
+    
+    # 创建子图：K线图 + 成交量 + 各独立指标
+    if panel_specs:
+        panel_height = 0.4 / len(panel_specs)
+        row_heights = [0.45, 0.15] + [panel_height] * len(panel_specs)
+    else:
+        row_heights = [0.7, 0.3]
+    subplot_titles = (f'{title} - {period}', 'Volume') + tuple(
+        INDICATORS[parse_spec(spec)[0]]['label'] for spec in panel_specs
+    )
+    
     fig = make_subplots(
-        rows=2, cols=1,
+        rows=2 + len(panel_specs), cols=1,
         shared_xaxes=True,
         vertical_spacing=0.03,
-        subplot_titles=(f'{title} - {period}', 'Volume'),
-        row_heights=[0.7, 0.3]
+        subplot_titles=subplot_titles,
+        row_heights=row_heights
     )
     
     # 添加K线图
@@ -46,41 +135,19 @@ def create_candlestick_chart(df, title="Candlestick Chart", period="Daily"):
     )
     
     # 如果有移动平均线数据，添加MA线
-    if 'ma5' in df.columns:
-        fig.add_trace(
-            go.Scatter(
-                x=df['date'],
-                y=df['ma5'],
-                mode='lines',
-                name='MA5',
-                line=dict(color='blue', width=1)
-            ),
-            row=1, col=1
-        )
-    
-    if 'ma10' in df.columns:
-        fig.add_trace(
-            go.Scatter(
-                x=df['date'],
-                y=df['ma10'],
-                mode='lines',
-                name='MA10',
-                line=dict(color='orange', width=1)
-            ),
-            row=1, col=1
-        )
-    
-    if 'ma20' in df.columns:
-        fig.add_trace(
-            go.Scatter(
-                x=df['date'],
-                y=df['ma20'],
-                mode='lines',
-                name='MA20',
-                line=dict(color='purple', width=1)
-            ),
-            row=1, col=1
-        )
+    if indicators is None:
+        for column, color in (('ma5', 'blue'), ('ma10', 'orange'), ('ma20', 'purple')):
+            if column in df.columns:
+                fig.add_trace(
+                    go.Scatter(
+                        x=df['date'],
+                        y=df[column],
+                        mode='lines',
+                        name=column.upper(),
+                        line=dict(color=color, width=1)
+                    ),
+                    row=1, col=1
+                )
     
     # 添加成交量柱状图
     colors = ['red' if close >= open else 'green' 
@@ -97,23 +164,140 @@ def create_candlestick_chart(df, title="Candlestick Chart", period="Daily"):
         row=2, col=1
     )
     
+    # 添加技术指标
+    if indicators is not None:
+        _add_indicator_traces(fig, df['date'], indicators, specs, panel_rows)
+    
     # 更新布局
     fig.update_layout(
         title=f'{title} - {period}',
         xaxis_title='Date',
         yaxis_title='Price',
         xaxis_rangeslider_visible=False,
-        height=700,
+        height=700 + 180 * len(panel_specs),
         hovermode='x unified',
         template='plotly_white'
     )
     
-    fig.update_xaxes(title_text="Date", row=2, col=1)
+    fig.update_xaxes(title_text="Date", row=2 + len(panel_specs), col=1)
     fig.update_yaxes(title_text="Volume", row=2, col=1)
     
     return fig
 
 
+def _indicator_trace_columns(spec):
+    """
+    指标对应的曲线列及图形类型，顺序与_add_indicator_traces添加trace的顺序一致
+    
+    Returns:
+        list: (列名, 'bar'或'line')列表
+    """
+    name, params = parse_spec(spec)
+    if name == 'boll':
+        prefix = f'boll{params[0]}_{params[1]}'
+        return [(f'{prefix}_{part}', 'line') for part in ('upper', 'mid', 'lower')]
+    if name == 'macd':
+        prefix = f'macd{params[0]}_{params[1]}_{params[2]}'
+        return [(f'{prefix}_hist', 'bar'), (f'{prefix}_dif', 'line'), (f'{prefix}_dea', 'line')]
+    return [(name if not params else f'{name}{params[0]}', 'line')]
+
+
+def candlestick_extension(df, indicators, specs):
+    """
+    生成将新增K线追加到create_candlestick_chart图表的扩展数据
+    
+    Plotly.extendTraces要求一次调用中的所有trace扩展相同的属性，而K线（OHLC）、
+    柱状图（含逐柱颜色）和折线的属性不同，因此按属性分组返回，由前端依次调用
+    
+    Args:
+        df (pd.DataFrame): 新增的K线数据
+        indicators (pd.DataFrame): 与df逐行对齐的技术指标数据
+        specs (list): 图表中显示的指标规格字符串列表
+        
+    Returns:
+        list: [updateData, traceIndices]分组列表
+    """
+    dates = np.datetime_as_string(df['date'].to_numpy(), unit='D').tolist()
+    
+    def values(series):
+        return series.astype('float64').tolist()
+    
+    def colors(positive):
+        return ['red' if flag else 'green' for flag in positive]
+    
+    groups = [[{
+        'x': [dates],
+        'open': [values(df['open'])],
+        'high': [values(df['high'])],
+        'low': [values(df['low'])],
+        'close': [values(df['close'])],
+    }, [0]]]
+    
+    # 成交量为trace 1，指标trace从2开始
+    bars = {'x': [dates], 'y': [values(df['vol'])], 'marker.color': [colors(df['close'] >= df['open'])]}
+    bar_indices = [1]
+    lines = {'x': [], 'y': []}
+    line_indices = []
+    
+    trace = 2
+    for spec in specs:
+        for column, kind in _indicator_trace_columns(spec):
+            if kind == 'bar':
+                bars['x'].append(dates)
+                bars['y'].append(values(indicators[column]))
+                bars['marker.color'].append(colors(indicators[column].fillna(0) >= 0))
+                bar_indices.append(trace)
+            else:
+                lines['x'].append(dates)
+                lines['y'].append(values(indicators[column]))
+                line_indices.append(trace)
+            trace += 1
+    
+    groups.append([bars, bar_indices])
+    if line_indices:
+        groups.append([lines, line_indices])
+    return groups
+
+
+def candlestick_patch(df, indicators, specs, title, period):
+    """
+    生成替换create_candlestick_chart图表数据的Patch（缩放到不同级别的瓦片时trace结构不变，
+    只替换K线、成交量和指标的数据及标题）
+    
+    Args:
+        df (pd.DataFrame): K线数据
+        indicators (pd.DataFrame): 与df逐行对齐的技术指标数据
+        specs (list): 图表中显示的指标规格字符串列表
+        title (str): 图表标题
+        period (str): 周期
+    
+    Returns:
+        dash.Patch: 图表的局部更新
+    """
+    dates = df['date'].to_numpy()
+    patch = Patch()
+    patch['data'][0]['x'] = dates
+    for column in ('open', 'high', 'low', 'close'):
+        patch['data'][0][column] = df[column].to_numpy()
+    patch['data'][1]['x'] = dates
+    patch['data'][1]['y'] = df['vol'].to_numpy()
+    patch['data'][1]['marker']['color'] = np.where(df['close'] >= df['open'], 'red', 'green')
+    
+    # 指标trace从2开始，顺序与_add_indicator_traces一致
+    trace = 2
+    for spec in specs:
+        for column, kind in _indicator_trace_columns(spec):
+            patch['data'][trace]['x'] = dates
+            patch['data'][trace]['y'] = indicators[column].to_numpy()
+            if kind == 'bar':
+                patch['data'][trace]['marker']['color'] = np.where(indicators[column].fillna(0) >= 0, 'red', 'green')
+            trace += 1
+    
+    patch['layout']['title']['text'] = f'{title} - {period}'
+    patch['layout']['annotations'][0]['text'] = f'{title} - {period}'
+    return patch
+
+
 def create_line_chart(df, title="Trend Chart"):
     """
     创建收盘价趋势线图
@@ -151,43 +335,40 @@ def create_line_chart(df, title="Trend Chart"):
     return fig
 
 
-def create_comparison_chart(df_sh, df_sz, title="SH & SZ Index Comparison"):
+def create_comparison_chart(data_dict, title="Index Comparison", colors=None):
     """
-    创建沪深指数对比图
+    创建多指数对比图
     
     Args:
-        df_sh (pd.DataFrame): 沪市指数数据
-        df_sz (pd.DataFrame): 深市指数数据
+        data_dict (dict): 指数名称到指数数据的映射（含normalized列时直接使用）
         title (str): 图表标题
+        colors (dict): 指数名称到线条颜色的映射，为None时使用默认配色
         
     Returns:
         plotly.graph_objects.Figure: 对比图对象
     """
-    # 标准化处理：以第一天的收盘价为基准
-    sh_normalized = (df_sh['close'] / df_sh['close'].iloc[0]) * 100
-    sz_normalized = (df_sz['close'] / df_sz['close'].iloc[0]) * 100
-    
+    colors = colors or {}
     fig = go.Figure()
     
-    fig.add_trace(
-        go.Scatter(
-            x=df_sh['date'],
-            y=sh_normalized,
-            mode='lines',
-            name='Shanghai Comp.',
-            line=dict(color='red', width=2)
-        )
-    )
-    
-    fig.add_trace(
-        go.Scatter(
-            x=df_sz['date'],
-            y=sz_normalized,
-            mode='lines',
-            name='Shenzhen Comp.',
-            line=dict(color='green', width=2)
+    for name, df in data_dict.items():
+        if len(df) == 0:
+            continue
+        
+        # 标准化处理：以第一天的收盘价为基准
+        if 'normalized' in df.columns:
+            normalized = df['normalized']
+        else:
+            normalized = (df['close'] / df['close'].iloc[0]) * 100
+        
+        fig.add_trace(
+            go.Scatter(
+                x=df['date'],
+                y=normalized,
+                mode='lines',
+                name=name,
+                line=dict(color=colors.get(name), width=2)
+            )
         )
-    )
     
     fig.update_layout(
         title=title,
@@ -206,3 +387,65 @@ def create_comparison_chart(df_sh, df_sz, title="SH & SZ Index Comparison"):
     )
     
     return fig
+
+
+def create_return_distribution_chart(sketches, colors=None, bins=40, level=0.95, period="Daily"):
+    """
+    创建涨跌幅分布直方图（由分位数草图近似），并标出各序列的在险价值
+    
+    Args:
+        sketches (dict): 序列名称到QuantileSketch的映射
+        colors (dict): 序列名称到颜色的映射
+        bins (int): 直方图区间数
+        level (float): 标出的VaR置信水平
+        period (str): 周期名称
+        
+    Returns:
+        plotly.graph_objects.Figure: 分布直方图对象
+    """
+    colors = colors or {}
+    sketches = {name: sketch for name, sketch in sketches.items() if sketch.count}
+    fig = go.Figure()
+    
+    if sketches:
+        # 各序列共用区间边界，两端去掉0.1%的极端值
+        low = min(float(sketch.quantile(0.001)) for sketch in sketches.values())
+        high = max(float(sketch.quantile(0.999)) for sketch in sketches.values())
+        edges = np.linspace(low, high, bins + 1) if high > low else np.array([low - 0.5, high + 0.5])
+        centers = (edges[:-1] + edges[1:]) / 2
+        
+        for name, sketch in sketches.items():
+            fig.add_trace(
+                go.Bar(
+                    x=centers,
+                    y=sketch.histogram(edges) / sketch.count * 100,
+                    width=edges[1] - edges[0],
+                    name=name,
+                    marker_color=colors.get(name),
+                    opacity=0.6,
+                    hovertemplate='%{x:.2f}%: %{y:.2f}% of periods<extra>' + name + '</extra>'
+                )
+            )
+            var, _ = sketch.value_at_risk(level)
+            fig.add_vline(
+                x=-var, line_dash='dash', line_color=colors.get(name, 'gray'),
+                annotation_text=f"VaR {level:.0%} {name}", annotation_position='top left'
+            )
+    
+    fig.update_layout(
+        title=f"{period} Return Distribution",
+        xaxis_title='Change (%)',
+        yaxis_title='Share of Periods (%)',
+        barmode='overlay',
+        height=400,
+        template='plotly_white',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+    
+    return fig
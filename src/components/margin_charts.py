@@ -4,20 +4,24 @@
 
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
+from dash import Patch
+from src.utils.derived import margin_monthly_pivot
 
 
-def create_margin_trend_chart(df_sh, df_sz):
+def create_margin_trend_chart(data_dict, colors=None):
     """
     创建融资融券余额趋势图
     
     Args:
-        df_sh (pd.DataFrame): 沪市融资融券数据
-        df_sz (pd.DataFrame): 深市融资融券数据
+        data_dict (dict): 市场简称（如'SH'）到融资融券数据的映射
+        colors (dict): 市场简称到线条颜色的映射，为None时使用默认配色
         
     Returns:
         plotly.graph_objects.Figure: 融资融券余额趋势图
     """
+    colors = colors or {}
     fig = make_subplots(
         rows=2, cols=1,
         shared_xaxes=True,
@@ -26,51 +30,30 @@ def create_margin_trend_chart(df_sh, df_sz):
         row_heights=[0.5, 0.5]
     )
     
-    # 第一个子图：融资融券总余额
-    fig.add_trace(
-        go.Scatter(
-            x=df_sh['date'],
-            y=df_sh['margin_balance'] / 100000000,  # 转换为亿元
-            mode='lines',
-            name='SH Margin Balance',
-            line=dict(color='red', width=2)
-        ),
-        row=1, col=1
-    )
-    
-    fig.add_trace(
-        go.Scatter(
-            x=df_sz['date'],
-            y=df_sz['margin_balance'] / 100000000,  # 转换为亿元
-            mode='lines',
-            name='SZ Margin Balance',
-            line=dict(color='green', width=2)
-        ),
-        row=1, col=1
-    )
-    
-    # 第二个子图：融资余额对比
-    fig.add_trace(
-        go.Scatter(
-            x=df_sh['date'],
-            y=df_sh['financing_balance'] / 100000000,  # 转换为亿元
-            mode='lines',
-            name='SH Financing Balance',
-            line=dict(color='orange', width=2)
-        ),
-        row=2, col=1
-    )
-    
-    fig.add_trace(
-        go.Scatter(
-            x=df_sz['date'],
-            y=df_sz['financing_balance'] / 100000000,  # 转换为亿元
-            mode='lines',
-            name='SZ Financing Balance',
-            line=dict(color='blue', width=2)
-        ),
-        row=2, col=1
-    )
+    for name, df in data_dict.items():
+        # 第一个子图：融资融券总余额
+        fig.add_trace(
+            go.Scatter(
+                x=df['date'],
+                y=df['margin_balance'] / 100000000,  # 转换为亿元
+                mode='lines',
+                name=f'{name} Margin Balance',
+                line=dict(color=colors.get(name), width=2)
+            ),
+            row=1, col=1
+        )
+        
+        # 第二个子图：融资余额对比
+        fig.add_trace(
+            go.Scatter(
+                x=df['date'],
+                y=df['financing_balance'] / 100000000,  # 转换为亿元
+                mode='lines',
+                name=f'{name} Financing Balance',
+                line=dict(color=colors.get(name), width=2, dash='dot')
+            ),
+            row=2, col=1
+        )
     
     # 更新布局
     fig.update_xaxes(title_text="Date", row=2, col=1)
@@ -139,38 +122,50 @@ def create_margin_components_chart(df, market_name='Shanghai Market'):
     return fig
 
 
-def create_margin_balance_change_chart(df_sh, df_sz):
+def margin_components_patch(df, market_name='Shanghai Market'):
+    """
+    生成切换市场时更新create_margin_components_chart图表的Patch（只替换两条曲线的数据和标题）
+    
+    Args:
+        df (pd.DataFrame): 融资融券数据
+        market_name (str): 市场名称
+        
+    Returns:
+        dash.Patch: 图表的局部更新
+    """
+    dates = _extension_dates(df)
+    patch = Patch()
+    for i, column in enumerate(('financing_purchase', 'financing_redeem')):
+        patch['data'][i]['x'] = dates
+        patch['data'][i]['y'] = df[column].to_numpy() / 100000000
+    patch['layout']['title']['text'] = f'{market_name} Financing Purchase and Repayment Trend'
+    return patch
+
+
+def create_margin_balance_change_chart(data_dict, colors=None):
     """
     创建融资融券余额变化率图表
     
     Args:
-        df_sh (pd.DataFrame): 沪市融资融券数据
-        df_sz (pd.DataFrame): 深市融资融券数据
+        data_dict (dict): 市场简称（如'SH'）到融资融券数据的映射
+        colors (dict): 市场简称到线条颜色的映射，为None时使用默认配色
         
     Returns:
         plotly.graph_objects.Figure: 余额变化率图表
     """
+    colors = colors or {}
     fig = go.Figure()
     
-    fig.add_trace(
-        go.Scatter(
-            x=df_sh['date'],
-            y=df_sh['margin_balance_change'],
-            mode='lines',
-            name='SH Balance Change Rate',
-            line=dict(color='red', width=1.5)
+    for name, df in data_dict.items():
+        fig.add_trace(
+            go.Scatter(
+                x=df['date'],
+                y=df['margin_balance_change'],
+                mode='lines',
+                name=f'{name} Balance Change Rate',
+                line=dict(color=colors.get(name), width=1.5)
+            )
         )
-    )
-    
-    fig.add_trace(
-        go.Scatter(
-            x=df_sz['date'],
-            y=df_sz['margin_balance_change'],
-            mode='lines',
-            name='SZ Balance Change Rate',
-            line=dict(color='green', width=1.5)
-        )
-    )
     
     # 添加0轴参考线
     fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
@@ -187,46 +182,159 @@ def create_margin_balance_change_chart(df_sh, df_sz):
     return fig
 
 
-def create_margin_heatmap(df, market_name='Shanghai Market'):
+# 热力图粒度：(标题用词, 纵轴标题)
+HEATMAP_PERIODS = {
+    'month': ('Monthly', 'Month'),
+    'quarter': ('Quarterly', 'Quarter'),
+    'week': ('Weekly', 'Week'),
+}
+
+# 纵轴周期数不超过该值时在格子中显示数值
+PERIODS_WITH_TEXT = 12
+
+
+def create_margin_heatmap(df, market_name='Shanghai Market', heatmap_data=None, grain='month',
+                          statistic_name='Average', column_name='Margin Balance', unit='100m yuan'):
     """
-    创建融资融券月度热力图
+    创建融资融券热力图（年内周期 × 年份）
     
     Args:
         df (pd.DataFrame): 融资融券数据
         market_name (str): 市场名称
+        heatmap_data (pd.DataFrame): 预计算的透视表，为None时现场计算月度平均余额
+        grain (str): 透视表的年内周期，'month'、'quarter'或'week'
+        statistic_name (str): 统计量名称
+        column_name (str): 度量名称
+        unit (str): 取值单位
         
     Returns:
         plotly.graph_objects.Figure: 热力图
     """
-    # 按月份聚合数据
-    df_monthly = df.copy()
-    df_monthly['year'] = df_monthly['date'].dt.year
-    df_monthly['month'] = df_monthly['date'].dt.month
-    
-    # 计算每月平均余额
-    pivot_data = df_monthly.groupby(['year', 'month'])['margin_balance'].mean().reset_index()
-    pivot_data['margin_balance'] = pivot_data['margin_balance'] / 100000000  # 转为亿元
-    
-    # 创建透视表
-    heatmap_data = pivot_data.pivot(index='month', columns='year', values='margin_balance')
+    # 未提供透视表时按月份聚合数据：计算每月平均余额并创建透视表
+    if heatmap_data is None:
+        heatmap_data = margin_monthly_pivot(df)
+    period_title, period_axis = HEATMAP_PERIODS[grain]
+    # 周粒度的格子太小，不显示数值
+    show_text = len(heatmap_data.index) <= PERIODS_WITH_TEXT
     
     fig = go.Figure(data=go.Heatmap(
         z=heatmap_data.values,
         x=heatmap_data.columns,
         y=heatmap_data.index,
         colorscale='RdYlGn',
-        text=heatmap_data.values,
-        texttemplate='%{text:.0f}',
+        text=heatmap_data.values if show_text else None,
+        texttemplate='%{text:.0f}' if show_text else None,
         textfont={"size": 10},
-        colorbar=dict(title="Balance (100m yuan)")
+        colorbar=dict(title=f"{column_name.split()[-1]} ({unit})")
     ))
     
     fig.update_layout(
-        title=f'{market_name} Monthly Average Margin Balance Heatmap',
+        title=f'{market_name} {period_title} {statistic_name} {column_name} Heatmap',
         xaxis_title='Year',
-        yaxis_title='Month',
+        yaxis_title=period_axis,
         height=500,
         template='plotly_white'
     )
     
     return fig
+
+
+def margin_heatmap_patch(heatmap_data, market_name, grain='month', statistic_name='Average',
+                         column_name='Margin Balance', unit='100m yuan'):
+    """
+    生成年内周期不变时更新create_margin_heatmap图表的Patch（替换透视表取值、年份和标题）
+    
+    Args:
+        heatmap_data (pd.DataFrame): 透视表
+        其余参数同create_margin_heatmap
+        
+    Returns:
+        dash.Patch: 图表的局部更新
+    """
+    period_title, _ = HEATMAP_PERIODS[grain]
+    patch = Patch()
+    patch['data'][0]['z'] = heatmap_data.values
+    patch['data'][0]['x'] = heatmap_data.columns.to_numpy()
+    patch['data'][0]['y'] = heatmap_data.index.to_numpy()
+    if len(heatmap_data.index) <= PERIODS_WITH_TEXT:
+        patch['data'][0]['text'] = heatmap_data.values
+    patch['data'][0]['colorbar']['title']['text'] = f"{column_name.split()[-1]} ({unit})"
+    patch['layout']['title']['text'] = f'{market_name} {period_title} {statistic_name} {column_name} Heatmap'
+    return patch
+
+
+def _extension_dates(df):
+    return np.datetime_as_string(df['date'].to_numpy(), unit='D').tolist()
+
+
+def margin_trend_extension(data_dict):
+    """
+    生成将新增数据追加到create_margin_trend_chart图表的extendData
+
+    Args:
+        data_dict (dict): 市场简称到新增融资融券数据的映射（顺序与创建图表时一致）
+
+    Returns:
+        list: [updateData, traceIndices]
+    """
+    update = {'x': [], 'y': []}
+    indices = []
+    for i, df in enumerate(data_dict.values()):
+        # 每个市场依次为余额和融资余额两条曲线
+        for j, column in enumerate(('margin_balance', 'financing_balance')):
+            update['x'].append(_extension_dates(df))
+            update['y'].append((df[column] / 100000000).tolist())
+            indices.append(2 * i + j)
+    return [update, indices]
+
+
+def margin_trend_patch(data_dict):
+    """
+    生成替换create_margin_trend_chart图表数据的Patch（缩放到不同级别的瓦片时只替换各曲线的数据）
+
+    Args:
+        data_dict (dict): 市场简称到融资融券数据的映射（顺序与创建图表时一致）
+
+    Returns:
+        dash.Patch: 图表的局部更新
+    """
+    patch = Patch()
+    for i, df in enumerate(data_dict.values()):
+        dates = df['date'].to_numpy()
+        for j, column in enumerate(('margin_balance', 'financing_balance')):
+            patch['data'][2 * i + j]['x'] = dates
+            patch['data'][2 * i + j]['y'] = df[column].to_numpy() / 100000000
+    return patch
+
+
+def margin_balance_change_extension(data_dict):
+    """
+    生成将新增数据追加到create_margin_balance_change_chart图表的extendData
+
+    Args:
+        data_dict (dict): 市场简称到新增融资融券数据的映射（顺序与创建图表时一致）
+
+    Returns:
+        list: [updateData, traceIndices]
+    """
+    return [{
+        'x': [_extension_dates(df) for df in data_dict.values()],
+        'y': [df['margin_balance_change'].astype('float64').tolist() for df in data_dict.values()],
+    }, list(range(len(data_dict)))]
+
+
+def margin_components_extension(df):
+    """
+    生成将新增数据追加到create_margin_components_chart图表的extendData
+
+    Args:
+        df (pd.DataFrame): 新增的融资融券数据
+
+    Returns:
+        list: [updateData, traceIndices]
+    """
+    dates = _extension_dates(df)
+    return [{
+        'x': [dates, dates],
+        'y': [(df['financing_purchase'] / 100000000).tolist(), (df['financing_redeem'] / 100000000).tolist()],
+    }, [0, 1]]
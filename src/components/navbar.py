@@ -30,6 +30,7 @@ def create_navbar():
                     dbc.NavItem(dbc.NavLink("Index Analysis", href="/index-analysis", active="exact")),
                     dbc.NavItem(dbc.NavLink("Margin Trading", href="/margin-analysis", active="exact")),
                     dbc.NavItem(dbc.NavLink("Correlation Analysis", href="/correlation", active="exact")),
+                    dbc.NavItem(dbc.NavLink("Backtest", href="/backtest", active="exact")),
                 ], className="ms-auto", navbar=True),
                 id="navbar-collapse",
                 navbar=True,
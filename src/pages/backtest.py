@@ -0,0 +1,301 @@
+"""
+择时策略回测页面
+"""
+
+from dash import html, dcc, Input, Output
+import dash_bootstrap_components as dbc
+import numpy as np
+import pandas as pd
+from src.utils.clean_data import load_panel_store
+from src.utils.catalog import get_dataset, get_market_dataset, get_symbols, get_dropdown_options
+from src.utils.backtest import (
+    asset_returns,
+    ma_crossover_positions,
+    margin_trigger_positions,
+    evaluate_positions,
+    summarize,
+    DEFAULT_COST_BPS
+)
+from src.utils.background import background_callback
+from src.utils.layout_cache import prepopulate
+from src.utils.precompute import get_ma_sweep
+from src.components.backtest_charts import create_equity_curve_chart, create_sweep_heatmap
+
+
+# 参数扫描指标
+SWEEP_METRICS = {
+    'sharpe': 'Sharpe Ratio',
+    'annual_return': 'Annual Return',
+    'max_drawdown': 'Max Drawdown',
+    'annual_turnover': 'Annual Turnover',
+}
+
+# 回测回调的输出
+BACKTEST_OUTPUTS = [
+    ('backtest-equity-chart', 'figure'),
+    ('backtest-statistics', 'children'),
+]
+
+# 参数扫描回调的输出
+BACKTEST_SWEEP_OUTPUTS = [
+    ('backtest-sweep-chart', 'figure'),
+]
+
+
+def create_backtest_page():
+    """
+    创建回测页面布局
+
+    Returns:
+        html.Div: 页面布局
+    """
+    layout = dbc.Container([
+        html.H2("Timing Strategy Backtest", className="text-center mb-4"),
+        html.Hr(),
+
+        dbc.Row([
+            # 控制面板
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H5("Strategy Parameters"),
+
+                        html.Label("Select Index:"),
+                        dcc.Dropdown(
+                            id='backtest-index-selector',
+                            options=get_dropdown_options('index'),
+                            value=get_symbols('index')[0],
+                            clearable=False,
+                            className='mb-3'
+                        ),
+
+                        html.Label("Strategy:"),
+                        dcc.RadioItems(
+                            id='backtest-strategy',
+                            options=[
+                                {'label': ' MA Crossover', 'value': 'ma'},
+                                {'label': ' Margin Balance Change Trigger', 'value': 'margin'}
+                            ],
+                            value='ma',
+                            labelStyle={'display': 'block'},
+                            className='mb-3'
+                        ),
+
+                        html.Label("Fast / Slow MA Window:"),
+                        dbc.Row([
+                            dbc.Col(dcc.Input(id='backtest-fast', type='number', value=5, min=1, step=1,
+                                              className='form-control')),
+                            dbc.Col(dcc.Input(id='backtest-slow', type='number', value=20, min=2, step=1,
+                                              className='form-control')),
+                        ], className='mb-3'),
+
+                        html.Label("Margin Change Threshold (%):"),
+                        dcc.Input(id='backtest-threshold', type='number', value=0, step=0.1,
+                                  className='form-control mb-3'),
+
+                        html.Label("Transaction Cost (bps per side):"),
+                        dcc.Input(id='backtest-cost', type='number', value=DEFAULT_COST_BPS, min=0, step=1,
+                                  className='form-control mb-3'),
+                    ])
+                ])
+            ], width=12, lg=3),
+
+            # 净值曲线
+            dbc.Col([
+                dcc.Loading(
+                    id="loading-backtest-equity",
+                    type="default",
+                    children=[
+                        dcc.Graph(id='backtest-equity-chart'),
+                    ]
+                )
+            ], width=12, lg=9),
+        ], className="mb-4"),
+
+        # 统计信息
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H5("Backtest Statistics"),
+                        html.Div(id='backtest-statistics')
+                    ])
+                ])
+            ], width=12)
+        ], className="mb-4"),
+
+        # 参数扫描
+        dbc.Row([
+            dbc.Col([
+                html.H4("MA Window Parameter Sweep", className="text-center mb-3"),
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("Window Grid:"),
+                        dcc.Dropdown(
+                            id='backtest-sweep-grid',
+                            options=[
+                                {'label': 'Coarse (5-250, step 5)', 'value': 'coarse'},
+                                {'label': 'Fine (2-143, step 1, ~10,000 pairs)', 'value': 'fine'}
+                            ],
+                            value='coarse',
+                            clearable=False
+                        ),
+                    ], width=12, md=6),
+                    dbc.Col([
+                        html.Label("Metric:"),
+                        dcc.Dropdown(
+                            id='backtest-sweep-metric',
+                            options=[{'label': name, 'value': key} for key, name in SWEEP_METRICS.items()],
+                            value='sharpe',
+                            clearable=False
+                        ),
+                    ], width=12, md=6),
+                ], className="mb-3"),
+                dcc.Loading(
+                    id="loading-backtest-sweep",
+                    type="default",
+                    children=[
+                        dcc.Graph(id='backtest-sweep-chart'),
+                    ]
+                )
+            ], width=12)
+        ])
+
+    ], fluid=True, className="py-4")
+
+    # 按默认输入预先生成图表
+    symbol = layout['backtest-index-selector'].value
+    cost_bps = layout['backtest-cost'].value
+    prepopulate(layout, BACKTEST_OUTPUTS, _backtest(
+        symbol,
+        layout['backtest-strategy'].value,
+        layout['backtest-fast'].value,
+        layout['backtest-slow'].value,
+        layout['backtest-threshold'].value,
+        cost_bps
+    ))
+    prepopulate(layout, BACKTEST_SWEEP_OUTPUTS, _backtest_sweep(
+        symbol, layout['backtest-sweep-grid'].value, layout['backtest-sweep-metric'].value, cost_bps
+    ))
+
+    return layout
+
+
+def _find_margin_symbol(index_symbol):
+    """
+    查找与指数同一市场的融资融券数据集
+    """
+    return get_market_dataset('margin', get_dataset(index_symbol)['market'])
+
+
+def _backtest(symbol, strategy, fast, slow, threshold, cost_bps):
+    """
+    计算回测结果（页面布局预先生成和回调共用）
+
+    Returns:
+        tuple: 与BACKTEST_OUTPUTS对应的输出值
+    """
+    store = load_panel_store()
+    df = store.get(symbol, columns=['date', 'close'])
+    close = df['close'].to_numpy(dtype='float64')
+    returns = asset_returns(close)
+    cost_bps = cost_bps or 0
+
+    # 生成持仓
+    if strategy == 'margin':
+        margin_symbol = _find_margin_symbol(symbol)
+        if margin_symbol is None:
+            return {}, html.P("No margin trading data for this market.")
+        margin_df = store.get(margin_symbol, columns=['date', 'margin_balance_change'])
+        rows = store.calendar.map_rows(symbol, margin_symbol)
+        positions = margin_trigger_positions(df['date'], margin_df, threshold or 0, rows=rows)
+
+        # 从两融数据开始日期起评估
+        start = store.calendar.row_range(symbol, start_date=margin_df['date'].iloc[0])[0]
+        strategy_name = f"Margin Change > {threshold or 0}%"
+    else:
+        fast, slow = int(fast or 5), int(slow or 20)
+        positions = ma_crossover_positions(close, fast, slow)
+        start = 0
+        strategy_name = f"MA{fast} / MA{slow} Crossover"
+
+    result = evaluate_positions(returns[start:], positions[start:], cost_bps)
+    benchmark = evaluate_positions(returns[start:], np.ones(len(close) - start))
+    stats = summarize(result)
+    benchmark_stats = summarize(benchmark)
+
+    entry = get_dataset(symbol)
+    fig = create_equity_curve_chart(
+        df['date'].iloc[start:], result['equity'], benchmark['equity'], result['drawdown'],
+        f"{entry['label']} - {strategy_name}"
+    )
+
+    def row(label, key, fmt):
+        return html.Tr([
+            html.Td(label),
+            html.Td(fmt.format(stats[key])),
+            html.Td(fmt.format(benchmark_stats[key]))
+        ])
+
+    stats_table = dbc.Table([
+        html.Thead(html.Tr([html.Th("Metric"), html.Th("Strategy"), html.Th("Buy & Hold")])),
+        html.Tbody([
+            row("Total Return", 'total_return', "{:.2%}"),
+            row("Annual Return", 'annual_return', "{:.2%}"),
+            row("Annual Volatility", 'annual_volatility', "{:.2%}"),
+            row("Sharpe Ratio", 'sharpe', "{:.3f}"),
+            row("Max Drawdown", 'max_drawdown', "{:.2%}"),
+            row("Annual Turnover", 'annual_turnover', "{:.2f}"),
+        ])
+    ], bordered=False, striped=True, size='sm')
+
+    return fig, stats_table
+
+
+def _backtest_sweep(symbol, grid, metric, cost_bps):
+    """
+    生成参数扫描热力图（页面布局预先生成和回调共用）
+
+    Returns:
+        tuple: 与BACKTEST_SWEEP_OUTPUTS对应的输出值
+    """
+    # 扫描结果按(版本, 标识, 网格, 成本)写入产物存储，服务进程与后台任务进程共享；
+    # 默认网格和成本的结果由后台预计算生成
+    table = get_ma_sweep(load_panel_store(), symbol, grid, cost_bps or 0, persist=True)
+    return (create_sweep_heatmap(table, metric, SWEEP_METRICS[metric]),)
+
+
+def register_backtest_callbacks(app):
+    """
+    注册回测页面的回调函数
+
+    Args:
+        app: Dash应用实例
+    """
+    @app.callback(
+        [Output(*target) for target in BACKTEST_OUTPUTS],
+        [Input('backtest-index-selector', 'value'),
+         Input('backtest-strategy', 'value'),
+         Input('backtest-fast', 'value'),
+         Input('backtest-slow', 'value'),
+         Input('backtest-threshold', 'value'),
+         Input('backtest-cost', 'value')],
+        prevent_initial_call=True
+    )
+    def update_backtest(symbol, strategy, fast, slow, threshold, cost_bps):
+        """更新回测结果"""
+        return _backtest(symbol, strategy, fast, slow, threshold, cost_bps)
+
+    @background_callback(
+        app,
+        [Output(*target) for target in BACKTEST_SWEEP_OUTPUTS],
+        [Input('backtest-index-selector', 'value'),
+         Input('backtest-sweep-grid', 'value'),
+         Input('backtest-sweep-metric', 'value'),
+         Input('backtest-cost', 'value')],
+        cancel=[Input('url', 'pathname')],
+        prevent_initial_call=True
+    )
+    def update_backtest_sweep(set_progress, symbol, grid, metric, cost_bps):
+        """更新参数扫描热力图（细网格约需数秒，后台执行）"""
+        return _backtest_sweep(symbol, grid, metric, cost_bps)
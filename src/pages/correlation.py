@@ -2,19 +2,66 @@
 相关性分析页面
 """
 
-from dash import html, dcc, callback, Input, Output
+from dash import html, dcc, callback, Input, Output, State, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+import numpy as np
 import pandas as pd
-from src.utils.clean_data import load_cleaned_data
+from config import INPUT_DEBOUNCE_SECONDS
+from src.utils.clean_data import load_panel_store
+from src.utils.precompute import get_rolling_correlation, get_lead_lag, get_margin_index_aligned, get_series_tiles
+from src.utils.tiles import parse_x_range, covers
+from src.utils.derived import MARGIN_MEASURES
+from src.utils.catalog import get_catalog, get_dataset, get_market_dataset, get_symbols, get_dropdown_options
+from src.utils.correlation import corr_matrix, correlation_matrix, rolling_lagged_corr
+from src.utils.background import background_callback
+from src.utils.generation import request_generations
+from src.utils.layout_cache import prepopulate
 from src.components.correlation_charts import (
     create_correlation_scatter,
     create_rolling_correlation,
     create_dual_axis_chart,
     create_return_comparison,
-    create_correlation_matrix
+    create_correlation_matrix,
+    create_lead_lag_chart,
+    create_lagged_rolling_chart,
+    rolling_correlation_patch,
+    correlation_matrix_patch,
+    lagged_rolling_patch,
+    dual_axis_patch
 )
 
 
+# 领先/滞后分析的样本范围：全部历史或最近N个共同交易日
+LEAD_LAG_WINDOW_OPTIONS = [
+    {'label': 'Full History', 'value': 'full'},
+    {'label': 'Latest 1000 Days', 'value': 1000},
+    {'label': 'Latest 500 Days', 'value': 500},
+    {'label': 'Latest 250 Days', 'value': 250},
+]
+
+
+# 相关性图表回调的输出
+CORRELATION_CHART_OUTPUTS = [
+    ('correlation-matrix-chart', 'figure'),
+    ('correlation-scatter-chart', 'figure'),
+    ('dual-axis-chart', 'figure'),
+    ('rolling-correlation-chart', 'figure'),
+    ('return-comparison-chart', 'figure'),
+    ('correlation-statistics', 'children'),
+    ('correlation-chart-state', 'data'),
+    ('dual-axis-view', 'data'),
+]
+
+# 领先/滞后分析回调的输出
+LEAD_LAG_OUTPUTS = [
+    ('lead-lag-chart', 'figure'),
+    ('lead-lag-rolling-chart', 'figure'),
+    ('lead-lag-summary', 'children'),
+    ('lead-lag-state', 'data'),
+]
+
+
 def create_correlation_page():
     """
     创建相关性分析页面布局
@@ -31,15 +78,82 @@ def create_correlation_page():
             dbc.Col([
                 dbc.Alert([
                     html.H5("Analysis Description", className="alert-heading"),
-                    html.P("This page analyzes the correlation between the Shanghai Composite Index and the Shenzhen Component Index, including price correlation, return correlation, and dynamic correlation over time."),
+                    html.P("This page analyzes the correlation between two selected indices, including price correlation, return correlation, and dynamic correlation over time. The correlation matrix covers every index in the dataset catalog."),
                 ], color="info")
             ], width=12)
         ], className="mb-4"),
         
+        # 指数对选择
+        dbc.Row([
+            dbc.Col([
+                html.Label("First Index:"),
+                dcc.Dropdown(
+                    id='correlation-series-a',
+                    options=get_dropdown_options('index'),
+                    value=get_symbols('index')[0],
+                    clearable=False
+                ),
+            ], width=12, md=6),
+            dbc.Col([
+                html.Label("Second Index:"),
+                dcc.Dropdown(
+                    id='correlation-series-b',
+                    options=get_dropdown_options('index'),
+                    value=get_symbols('index')[1],
+                    clearable=False
+                ),
+            ], width=12, md=6),
+        ], className="mb-4"),
+        
+        # 后台计算进度
+        dbc.Progress(id='correlation-progress', value=0, striped=True, animated=True,
+                     style={'height': '6px', 'visibility': 'hidden'}, className="mb-3"),
+        
         # 相关性矩阵
         dbc.Row([
             dbc.Col([
                 html.H4("Index Correlation Matrix", className="text-center mb-3"),
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("Basis:"),
+                        dcc.RadioItems(
+                            id='correlation-matrix-basis',
+                            options=[
+                                {'label': ' Daily Return', 'value': 'change_pct'},
+                                {'label': ' Close Price', 'value': 'close'}
+                            ],
+                            value='change_pct',
+                            inline=True,
+                            inputStyle={'margin-left': '10px'}
+                        ),
+                    ], width=12, md=4),
+                    dbc.Col([
+                        html.Label("Method:"),
+                        dcc.Dropdown(
+                            id='correlation-matrix-method',
+                            options=[
+                                {'label': 'Full History', 'value': 'full'},
+                                {'label': 'Latest Rolling Window', 'value': 'rolling'},
+                                {'label': 'Exponentially Weighted', 'value': 'ewm'}
+                            ],
+                            value='full',
+                            clearable=False
+                        ),
+                    ], width=12, md=4),
+                    dbc.Col([
+                        html.Label("Lead/Lag (trading days, row leads column):"),
+                        dcc.Input(
+                            id='correlation-matrix-lag',
+                            type='number',
+                            value=0,
+                            min=-60,
+                            max=60,
+                            step=1,
+                            debounce=INPUT_DEBOUNCE_SECONDS,
+                            className='form-control'
+                        ),
+                    ], width=12, md=4),
+                ], className="mb-3"),
                 dcc.Loading(
                     id="loading-corr-matrix",
                     type="default",
@@ -88,6 +202,8 @@ def create_correlation_page():
                             step=10,
                             value=60,
                             marks={20: '20 days', 60: '60 days', 120: '120 days', 250: '250 days'},
+                            # 拖动过程中不触发回调，松开后才计算
+                            updatemode='mouseup',
                             tooltip={"placement": "bottom", "always_visible": True}
                         ),
                     ])
@@ -133,13 +249,313 @@ def create_correlation_page():
                     ])
                 ])
             ], width=12)
-        ])
+        ], className="mb-4"),
+        
+        # 融资融券与指数的领先/滞后分析
+        html.Hr(),
+        html.H4("Margin vs Index Lead/Lag", className="text-center mb-3"),
+        dbc.Row([
+            dbc.Col([
+                html.Label("Margin Data:"),
+                dcc.Dropdown(
+                    id='lead-lag-margin',
+                    options=get_dropdown_options('margin'),
+                    value=get_symbols('margin')[0],
+                    clearable=False
+                ),
+            ], width=12, md=3),
+            dbc.Col([
+                html.Label("Margin Measure:"),
+                dcc.Dropdown(
+                    id='lead-lag-measure',
+                    options=[{'label': label, 'value': measure} for measure, label in MARGIN_MEASURES.items()],
+                    value='margin_balance_change',
+                    clearable=False
+                ),
+            ], width=12, md=3),
+            dbc.Col([
+                html.Label("Index:"),
+                dcc.Dropdown(
+                    id='lead-lag-index',
+                    options=get_dropdown_options('index'),
+                    value=get_market_dataset('index', get_dataset(get_symbols('margin')[0])['market']),
+                    clearable=False
+                ),
+            ], width=12, md=3),
+            dbc.Col([
+                html.Label("Sample:"),
+                dcc.Dropdown(
+                    id='lead-lag-window',
+                    options=LEAD_LAG_WINDOW_OPTIONS,
+                    value='full',
+                    clearable=False
+                ),
+            ], width=12, md=3),
+        ], className="mb-3"),
+        dbc.Row([
+            dbc.Col([
+                dcc.Loading(
+                    id="loading-lead-lag",
+                    type="default",
+                    children=[
+                        dcc.Graph(id='lead-lag-chart'),
+                        html.P(id='lead-lag-summary', className="text-center text-muted"),
+                        dcc.Graph(id='lead-lag-rolling-chart'),
+                    ]
+                )
+            ], width=12)
+        ]),
+        
+        # 各图表当前显示内容对应的参数，只有部分参数变化时据此只发送变化的数据
+        dcc.Store(id='correlation-chart-state'),
+        dcc.Store(id='lead-lag-state'),
+        # 双轴图当前显示的瓦片，缩放时据此判断是否需要取新的瓦片
+        dcc.Store(id='dual-axis-view')
         
     ], fluid=True, className="py-4")
     
+    # 按默认输入预先生成图表
+    window_size = layout['rolling-window-slider'].value
+    prepopulate(layout, CORRELATION_CHART_OUTPUTS, _correlation_charts(
+        request_generations.begin(None, 'correlation-charts'),
+        window_size,
+        layout['correlation-series-a'].value,
+        layout['correlation-series-b'].value,
+        layout['correlation-matrix-basis'].value,
+        layout['correlation-matrix-method'].value,
+        layout['correlation-matrix-lag'].value,
+        None
+    ))
+    prepopulate(layout, LEAD_LAG_OUTPUTS, _lead_lag(
+        layout['lead-lag-margin'].value,
+        layout['lead-lag-measure'].value,
+        layout['lead-lag-index'].value,
+        layout['lead-lag-window'].value,
+        window_size,
+        None
+    ))
+    
     return layout
 
 
+def _dual_axis_keys(tiles, start_date=None, end_date=None):
+    """
+    双轴图两个指数在可见范围内的瓦片位置（取两者所需级别中较粗的一级，使时间桶一致）
+    """
+    keys = [series_tiles.locate(start_date, end_date) for series_tiles in tiles]
+    level = max((key[0] for key in keys if key), default=0)
+    return level, [series_tiles.locate(start_date, end_date, level=level) for series_tiles in tiles]
+
+
+def _dual_axis_data(store, symbol_a, symbol_b, start_date=None, end_date=None, whole_tiles=False):
+    """
+    双轴图两个指数按可见范围从瓦片中取收盘价（各桶末值），只保留两者都有数据的时间桶
+    
+    Returns:
+        tuple: ((日期, 形状为(桶数, 2)的收盘价数组), 双轴图视图状态)
+    """
+    tiles = [get_series_tiles(store, symbol) for symbol in (symbol_a, symbol_b)]
+    level, keys = _dual_axis_keys(tiles, start_date, end_date)
+    frames = [
+        series_tiles.query(start_date, end_date, how={'close': 'last'},
+                           domain=(None, None) if whole_tiles else None, level=level)[1]
+        for series_tiles in tiles
+    ]
+    merged = frames[0].merge(frames[1], on='bucket', suffixes=('_a', '_b'))
+    aligned = (merged['date_a'].to_numpy(), merged[['close_a', 'close_b']].to_numpy())
+    view = {
+        'version': store.version,
+        'pair': [symbol_a, symbol_b],
+        'keys': [list(key) if key else None for key in keys],
+    }
+    return aligned, view
+
+
+def _correlation_charts(step, window_size, symbol_a, symbol_b, basis, method, lag, chart_state):
+    """
+    生成相关性图表（页面布局预先生成和回调共用）
+    
+    与当前显示内容相比，未受影响的图表不更新；结构不变的图表只发送变化的数据（Patch）
+    
+    Args:
+        step (callable): 阶段检查函数（见request_generations.begin）
+    
+    Returns:
+        tuple: 与CORRELATION_CHART_OUTPUTS对应的输出值
+    """
+    # 加载数据
+    step((10, 'Loading data'))
+    store = load_panel_store()
+    
+    # 数据版本变化后所有图表都需重新生成
+    view = {
+        'version': store.version,
+        'pair': [symbol_a, symbol_b],
+        'matrix': [basis, method, int(lag or 0), window_size if method != 'full' else None],
+        'window': window_size,
+    }
+    if chart_state is not None and chart_state.get('version') != view['version']:
+        chart_state = None
+    same_pair = chart_state is not None and chart_state['pair'] == view['pair']
+    df_a = store.get(symbol_a)
+    df_b = store.get(symbol_b)
+    name_a = get_dataset(symbol_a)['short_label']
+    name_b = get_dataset(symbol_b)['short_label']
+    
+    # 创建相关性矩阵（覆盖目录中的所有指数，缺失日期按成对完整处理）
+    step((25, 'Correlation matrix'))
+    if chart_state is not None and chart_state['matrix'] == view['matrix']:
+        matrix_fig = no_update
+    else:
+        entries = get_catalog('index')
+        names = [entry['short_label'] for entry in entries]
+        _, values = store.align([entry['symbol'] for entry in entries], basis)
+        matrix = correlation_matrix(values, method=method, window=window_size, lag=int(lag or 0))
+        basis_name = 'Daily Return' if basis == 'change_pct' else 'Close Price'
+        method_name = {
+            'full': 'Full History',
+            'rolling': f'Latest {window_size}-Day Window',
+            'ewm': f'EWM Span {window_size}'
+        }[method]
+        title = f'Index Correlation Matrix ({basis_name}, {method_name}'
+        title += f', Lag {int(lag)})' if lag else ')'
+        matrix_fig = (correlation_matrix_patch if chart_state is not None else create_correlation_matrix)(
+            matrix, names, title
+        )
+    
+    # 创建滚动相关性图（同一对指数只改变窗口时只发送新的相关系数序列）
+    step((50, 'Rolling correlation'))
+    if same_pair and chart_state['window'] == window_size:
+        rolling_corr_fig = no_update
+    else:
+        rolling = get_rolling_correlation(store, symbol_a, symbol_b, window_size)
+        if same_pair:
+            rolling_corr_fig = rolling_correlation_patch(rolling, window_size, name_a, name_b)
+        else:
+            rolling_corr_fig = create_rolling_correlation(df_a, df_b, window_size, name_a, name_b, rolling=rolling)
+    
+    # 其余图表和统计信息只取决于所选的一对指数
+    if same_pair:
+        step()
+        return matrix_fig, no_update, no_update, rolling_corr_fig, no_update, no_update, view, no_update
+    
+    # 按交易日历对齐两个指数的收盘价和涨跌幅（只保留共同交易日）
+    step((70, 'Price charts'))
+    prices = store.align([symbol_a, symbol_b], 'close', how='inner')
+    returns = store.align([symbol_a, symbol_b], 'change_pct', how='inner')
+    
+    # 创建散点图
+    scatter_fig = create_correlation_scatter(df_a, df_b, name_a, name_b, aligned=prices)
+    
+    # 创建双轴图（全历史按瓦片降低分辨率，缩放时保持用户的缩放范围）
+    dual_axis_data, dual_axis_view = _dual_axis_data(store, symbol_a, symbol_b)
+    dual_axis_fig = create_dual_axis_chart(df_a, df_b, name_a, name_b, aligned=dual_axis_data)
+    dual_axis_fig.update_layout(uirevision=f'{symbol_a}/{symbol_b}')
+    
+    # 创建收益率对比图（只显示最近250个共同交易日以提高可读性）
+    return_comp_fig = create_return_comparison(
+        df_a, df_b, name_a, name_b, aligned=(returns[0][-250:], returns[1][-250:])
+    )
+    
+    # 计算统计信息（按共同交易日对齐）
+    step((90, 'Statistics'))
+    dates = prices[0]
+    
+    # 计算皮尔逊相关系数及收益率相关系数
+    price_corr = corr_matrix(prices[1])[0, 1]
+    return_corr = corr_matrix(returns[1])[0, 1]
+    date_min = pd.Timestamp(dates.min()).strftime('%Y-%m-%d')
+    date_max = pd.Timestamp(dates.max()).strftime('%Y-%m-%d')
+    
+    # 两侧选择同一指数时相关系数恒为1，提示选择不同的指数
+    if symbol_a == symbol_b:
+        stats = dbc.Alert(
+            f"Both selections are {name_a}; choose two different indices to compare "
+            f"({len(dates)} data points, {date_min} to {date_max}).",
+            color='warning'
+        )
+        step()
+        return matrix_fig, scatter_fig, dual_axis_fig, rolling_corr_fig, return_comp_fig, stats, view, dual_axis_view
+    
+    stats = html.Div([
+        dbc.Row([
+            dbc.Col([
+                html.P(f"Data Points: {len(dates)}"),
+                html.P(f"Date Range: {date_min} to {date_max}"),
+            ], width=6),
+            dbc.Col([
+                html.P(f"Price Correlation Coefficient: {price_corr:.4f}"),
+                html.P(f"Return Correlation Coefficient: {return_corr:.4f}"),
+                html.P([
+                    "Correlation Interpretation: ",
+                    html.Span(
+                        "Strong Positive Correlation" if price_corr > 0.7 else "Positive Correlation" if price_corr > 0.3 else "Weak Correlation",
+                        style={'color': 'green' if price_corr > 0.5 else 'orange'}
+                    )
+                ]),
+            ], width=6),
+        ])
+    ])
+    
+    step()
+    return matrix_fig, scatter_fig, dual_axis_fig, rolling_corr_fig, return_comp_fig, stats, view, dual_axis_view
+
+
+def _lead_lag(margin_symbol, measure, index_symbol, sample, rolling_window, lead_lag_state):
+    """
+    生成融资融券与指数收益率的领先/滞后分析（按数据集版本缓存的FFT互相关，页面布局预先生成和回调共用）
+    
+    只改变滚动窗口时，互相关图和摘要不变，滚动相关图只发送新的相关系数序列
+    
+    Returns:
+        tuple: 与LEAD_LAG_OUTPUTS对应的输出值
+    """
+    store = load_panel_store()
+    key = [store.version, margin_symbol, measure, index_symbol, sample]
+    window = None if sample == 'full' else int(sample)
+    scan = get_lead_lag(store, margin_symbol, index_symbol, measure, window)
+    
+    margin_name = get_dataset(margin_symbol)['short_label']
+    index_name = get_dataset(index_symbol)['short_label']
+    
+    # 相关最强的滞后下的滚动相关系数
+    corr = scan['corr'].to_numpy()
+    peak = int(np.nanargmax(np.abs(corr))) if np.isfinite(corr).any() else None
+    if lead_lag_state is not None and lead_lag_state['key'] == key and peak is not None:
+        if lead_lag_state['window'] == rolling_window:
+            raise PreventUpdate
+        lag = int(scan['lag'].iloc[peak])
+        _, values = get_margin_index_aligned(store, margin_symbol, index_symbol, measure)
+        rolling = rolling_lagged_corr(values[:, 0], values[:, 1], lag, rolling_window)
+        return (
+            no_update,
+            lagged_rolling_patch(rolling, lag, rolling_window, margin_name, index_name),
+            no_update,
+            {'key': key, 'window': rolling_window}
+        )
+    
+    measure_name = f"{margin_name} {MARGIN_MEASURES[measure]}"
+    lead_lag_fig = create_lead_lag_chart(scan, margin_name, index_name, measure_name)
+    if peak is None:
+        return lead_lag_fig, {}, "Not enough overlapping data.", None
+    lag = int(scan['lag'].iloc[peak])
+    dates, values = get_margin_index_aligned(store, margin_symbol, index_symbol, measure)
+    rolling = rolling_lagged_corr(values[:, 0], values[:, 1], lag, rolling_window)
+    rolling_fig = create_lagged_rolling_chart(dates, rolling, lag, rolling_window, margin_name, index_name)
+    
+    direction = (
+        f"{margin_name} leads {index_name} by {lag} trading days" if lag > 0 else
+        f"{index_name} leads {margin_name} by {-lag} trading days" if lag < 0 else
+        "strongest at the same day"
+    )
+    zero = scan.loc[scan['lag'] == 0, 'corr']
+    summary = (
+        f"Strongest correlation {corr[peak]:.4f} ({direction}, {int(scan['count'].iloc[peak])} pairs); "
+        f"same-day correlation {zero.iloc[0]:.4f}."
+    )
+    return lead_lag_fig, rolling_fig, summary, {'key': key, 'window': rolling_window}
+
+
 def register_correlation_callbacks(app):
     """
     注册相关性分析页面的回调函数
@@ -147,86 +563,75 @@ def register_correlation_callbacks(app):
     Args:
         app: Dash应用实例
     """
+    @background_callback(
+        app,
+        [Output(*target) for target in CORRELATION_CHART_OUTPUTS],
+        [Input('rolling-window-slider', 'value'),
+         Input('correlation-series-a', 'value'),
+         Input('correlation-series-b', 'value'),
+         Input('correlation-matrix-basis', 'value'),
+         Input('correlation-matrix-method', 'value'),
+         Input('correlation-matrix-lag', 'value')],
+        [State('correlation-chart-state', 'data'),
+         State('session-id', 'data')],
+        progress=[Output('correlation-progress', 'value'),
+                  Output('correlation-progress', 'label')],
+        progress_default=(0, ''),
+        running=[(Output('correlation-progress', 'style'), {'height': '6px'}, {'height': '6px', 'visibility': 'hidden'})],
+        cancel=[Input('url', 'pathname')],
+        prevent_initial_call=True
+    )
+    def update_correlation_charts(set_progress, window_size, symbol_a, symbol_b, basis, method, lag,
+                                  chart_state, session_id):
+        """更新相关性图表（后台执行，同一会话有更新的请求时放弃本次计算）"""
+        step = request_generations.begin(session_id, 'correlation-charts', set_progress)
+        return _correlation_charts(step, window_size, symbol_a, symbol_b, basis, method, lag, chart_state)
+    
     @app.callback(
-        [Output('correlation-matrix-chart', 'figure'),
-         Output('correlation-scatter-chart', 'figure'),
-         Output('dual-axis-chart', 'figure'),
-         Output('rolling-correlation-chart', 'figure'),
-         Output('return-comparison-chart', 'figure'),
-         Output('correlation-statistics', 'children')],
-        [Input('rolling-window-slider', 'value')]
+        [Output('dual-axis-chart', 'figure', allow_duplicate=True),
+         Output('dual-axis-view', 'data', allow_duplicate=True)],
+        Input('dual-axis-chart', 'relayoutData'),
+        State('dual-axis-view', 'data'),
+        prevent_initial_call=True
     )
-    def update_correlation_charts(window_size):
-        """更新相关性图表"""
-        # 加载数据
-        data = load_cleaned_data()
-        sh_index = data['sh_index']
-        sz_index = data['sz_index']
-        
-        # 创建相关性矩阵
-        data_dict = {
-            'Shanghai Comp.': sh_index,
-            'Shenzhen Comp.': sz_index
-        }
-        matrix_fig = create_correlation_matrix(data_dict)
-        
-        # 创建散点图
-        scatter_fig = create_correlation_scatter(sh_index, sz_index, 'Shanghai Comp.', 'Shenzhen Comp.')
-        
-        # 创建双轴图
-        dual_axis_fig = create_dual_axis_chart(sh_index, sz_index, 'Shanghai Comp.', 'Shenzhen Comp.')
-        
-        # 创建滚动相关性图
-        rolling_corr_fig = create_rolling_correlation(
-            sh_index, sz_index, window_size, 'Shanghai Comp.', 'Shenzhen Comp.'
-        )
+    def zoom_dual_axis_chart(relayout_data, dual_axis_view):
+        """缩放或平移双轴图时取覆盖可见范围、对应级别的瓦片，只替换曲线数据"""
+        visible = parse_x_range(relayout_data)
+        if not dual_axis_view or visible is None:
+            raise PreventUpdate
         
-        # 创建收益率对比图（只显示最近1年的数据以提高可读性）
-        recent_sh = sh_index.tail(250)
-        recent_sz = sz_index.tail(250)
-        return_comp_fig = create_return_comparison(recent_sh, recent_sz, 'Shanghai Comp.', 'Shenzhen Comp.')
+        store = load_panel_store()
+        symbol_a, symbol_b = dual_axis_view['pair']
+        tiles = [get_series_tiles(store, symbol) for symbol in (symbol_a, symbol_b)]
+        _, keys = _dual_axis_keys(tiles, *visible)
+        # 已显示的瓦片覆盖可见范围时不需要更新
+        if dual_axis_view['version'] == store.version and all(
+            covers(shown, key) for shown, key in zip(dual_axis_view['keys'], keys)
+        ):
+            raise PreventUpdate
         
-        # 计算统计信息
-        # 合并数据以计算相关系数
-        merged = pd.merge(
-            sh_index[['date', 'close']],
-            sz_index[['date', 'close']],
-            on='date',
-            suffixes=('_sh', '_sz')
-        )
-        
-        # 计算皮尔逊相关系数
-        import numpy as np
-        price_corr = np.corrcoef(merged['close_sh'], merged['close_sz'])[0, 1]
-        
-        # 计算收益率相关系数
-        merged_returns = pd.merge(
-            sh_index[['date', 'change_pct']],
-            sz_index[['date', 'change_pct']],
-            on='date',
-            suffixes=('_sh', '_sz')
-        )
-        merged_returns = merged_returns.dropna()
-        return_corr = np.corrcoef(merged_returns['change_pct_sh'], merged_returns['change_pct_sz'])[0, 1]
-        
-        stats = html.Div([
-            dbc.Row([
-                dbc.Col([
-                    html.P(f"Data Points: {len(merged)}"),
-                    html.P(f"Date Range: {merged['date'].min().strftime('%Y-%m-%d')} to {merged['date'].max().strftime('%Y-%m-%d')}"),
-                ], width=6),
-                dbc.Col([
-                    html.P(f"Price Correlation Coefficient: {price_corr:.4f}"),
-                    html.P(f"Return Correlation Coefficient: {return_corr:.4f}"),
-                    html.P([
-                        "Correlation Interpretation: ",
-                        html.Span(
-                            "Strong Positive Correlation" if price_corr > 0.7 else "Positive Correlation" if price_corr > 0.3 else "Weak Correlation",
-                            style={'color': 'green' if price_corr > 0.5 else 'orange'}
-                        )
-                    ]),
-                ], width=6),
-            ])
-        ])
-        
-        return matrix_fig, scatter_fig, dual_axis_fig, rolling_corr_fig, return_comp_fig, stats
+        aligned, dual_axis_view = _dual_axis_data(store, symbol_a, symbol_b, *visible, whole_tiles=True)
+        return dual_axis_patch(aligned), dual_axis_view
+    
+    @app.callback(
+        Output('lead-lag-index', 'value'),
+        Input('lead-lag-margin', 'value'),
+        prevent_initial_call=True
+    )
+    def select_lead_lag_index(margin_symbol):
+        """切换融资融券数据时默认选择同一市场的指数"""
+        return get_market_dataset('index', get_dataset(margin_symbol)['market']) or get_symbols('index')[0]
+    
+    @app.callback(
+        [Output(*target) for target in LEAD_LAG_OUTPUTS],
+        [Input('lead-lag-margin', 'value'),
+         Input('lead-lag-measure', 'value'),
+         Input('lead-lag-index', 'value'),
+         Input('lead-lag-window', 'value'),
+         Input('rolling-window-slider', 'value')],
+        State('lead-lag-state', 'data'),
+        prevent_initial_call=True
+    )
+    def update_lead_lag(margin_symbol, measure, index_symbol, sample, rolling_window, lead_lag_state):
+        """更新融资融券与指数收益率的领先/滞后分析"""
+        return _lead_lag(margin_symbol, measure, index_symbol, sample, rolling_window, lead_lag_state)
@@ -4,6 +4,7 @@
 
 from dash import html, dcc
 import dash_bootstrap_components as dbc
+from src.utils.catalog import get_catalog
 
 
 def create_home_page():
@@ -116,10 +117,8 @@ def create_home_page():
                     dbc.CardBody([
                         html.H3("Data Description", className="card-title"),
                         html.Ul([
-                            html.Li("sh_index.csv - Historical data of Shanghai Composite Index"),
-                            html.Li("sz_index.csv - Historical data of Shenzhen Component Index"),
-                            html.Li("sh_margin_trade.csv - Margin trading data for Shanghai market"),
-                            html.Li("sz_margin_trade.csv - Margin trading data for Shenzhen market"),
+                            html.Li(f"{entry['file']} - {entry['description']}")
+                            for entry in get_catalog()
                         ]),
                         html.P([
                             "Data Source: ",
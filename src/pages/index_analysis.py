@@ -2,17 +2,79 @@
 指数分析页面
 """
 
-from dash import html, dcc, callback, Input, Output
+from dash import html, dcc, callback, Input, Output, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+from flask import request, abort
+import numpy as np
 import pandas as pd
-from src.utils.clean_data import load_cleaned_data, resample_to_weekly, resample_to_monthly
+from src.utils.clean_data import load_panel_store
+from src.utils.derived import rebase_normalized
+from src.utils.precompute import get_resampled, get_normalized, get_series_tiles, get_return_distribution
+from src.utils.tiles import OHLC, parse_x_range, covers
+from src.utils.indicators import get_indicators
+from src.utils.catalog import get_dataset, get_symbols, get_dropdown_options
+from src.utils.export import EXPORT_FORMATS, get_export_format_options, export_response, export_url
+from src.utils.background import background_callback
+from src.utils.generation import request_generations
+from src.utils.session_store import session_store
+from src.utils.layout_cache import prepopulate
 from src.components.index_charts import (
     create_candlestick_chart, 
     create_line_chart, 
-    create_comparison_chart
+    create_comparison_chart,
+    candlestick_extension,
+    candlestick_patch,
+    create_return_distribution_chart
 )
 
 
+# 技术指标选项（规格字符串见src.utils.indicators）
+INDICATOR_OPTIONS = [
+    {'label': 'MA5', 'value': 'sma5'},
+    {'label': 'MA10', 'value': 'sma10'},
+    {'label': 'MA20', 'value': 'sma20'},
+    {'label': 'MA60', 'value': 'sma60'},
+    {'label': 'EMA12', 'value': 'ema12'},
+    {'label': 'EMA26', 'value': 'ema26'},
+    {'label': 'Bollinger Bands (20, 2)', 'value': 'boll20_2'},
+    {'label': 'Volume MA5', 'value': 'vma5'},
+    {'label': 'MACD (12, 26, 9)', 'value': 'macd12_26_9'},
+    {'label': 'RSI (14)', 'value': 'rsi14'},
+    {'label': 'ATR (14)', 'value': 'atr14'},
+    {'label': 'OBV', 'value': 'obv'},
+]
+DEFAULT_INDICATORS = ['sma5', 'sma10', 'sma20']
+
+PERIODS = ('daily', 'weekly', 'monthly')
+
+# 导出路由（下载按钮直接链接到该路由，由浏览器下载流式响应）
+INDEX_EXPORT_PATH = '/export/index'
+
+
+# 指数图表回调的输出
+INDEX_CHART_OUTPUTS = [
+    ('index-main-chart', 'figure'),
+    ('index-comparison-chart', 'figure'),
+    ('index-statistics', 'children'),
+    ('date-range', 'start_date'),
+    ('date-range', 'end_date'),
+    ('date-range', 'min_date_allowed'),
+    ('date-range', 'max_date_allowed'),
+    ('index-chart-state', 'data'),
+    ('index-main-view', 'data'),
+]
+
+# 涨跌幅分布回调的输出
+INDEX_DISTRIBUTION_OUTPUTS = [
+    ('index-distribution-chart', 'figure'),
+    ('index-distribution-table', 'children'),
+]
+
+# 分布表中的分位点
+DISTRIBUTION_PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+
+
 def create_index_analysis_page():
     """
     创建指数分析页面布局
@@ -35,12 +97,10 @@ def create_index_analysis_page():
                         html.Label("Select Market:"),
                         dcc.Dropdown(
                             id='market-selector',
-                            options=[
-                                {'label': 'Shanghai Composite Index', 'value': 'sh'},
-                                {'label': 'Shenzhen Component Index', 'value': 'sz'},
-                                {'label': 'SH & SZ Comparison', 'value': 'both'}
+                            options=get_dropdown_options('index') + [
+                                {'label': 'Index Comparison', 'value': 'both'}
                             ],
-                            value='sh',
+                            value=get_symbols('index')[0],
                             className='mb-3'
                         ),
                         
@@ -62,28 +122,68 @@ def create_index_analysis_page():
                         dcc.DatePickerRange(
                             id='date-range',
                             display_format='YYYY-MM-DD',
+                            # 选完起止两个日期后才触发回调
+                            updatemode='bothdates',
+                            className='mb-3'
+                        ),
+                        
+                        # 技术指标选择
+                        html.Label("Technical Indicators:"),
+                        dcc.Checklist(
+                            id='indicator-selector',
+                            options=INDICATOR_OPTIONS,
+                            value=DEFAULT_INDICATORS,
+                            inputStyle={'margin-right': '6px'},
+                            labelStyle={'display': 'block'},
                             className='mb-3'
                         ),
+                        
+                        # 数据导出
+                        html.Label("Export Displayed Data:"),
+                        dbc.InputGroup([
+                            dbc.Select(
+                                id='index-export-format',
+                                options=get_export_format_options(),
+                                value='csv'
+                            ),
+                            dbc.Button("Download", id='index-export-button', color='secondary',
+                                       external_link=True),
+                        ], size='sm'),
                     ])
                 ])
             ], width=12, lg=3),
             
             # 图表显示区域
             dbc.Col([
+                # 后台计算进度
+                dbc.Progress(id='index-progress', value=0, striped=True, animated=True,
+                             style={'height': '6px', 'visibility': 'hidden'}, className="mb-2"),
                 dcc.Loading(
                     id="loading-index",
                     type="default",
                     children=[
                         dcc.Graph(id='index-main-chart'),
                     ]
-                )
+                ),
+                # 主图当前显示的序列及末尾日期，数据更新时据此追加新K线
+                dcc.Store(id='index-chart-state'),
+                dcc.Store(id='index-live-extension'),
+                # 日K线图当前显示的瓦片，缩放时据此判断是否需要取新的瓦片
+                dcc.Store(id='index-main-view'),
             ], width=12, lg=9),
         ], className="mb-4"),
         
         # 对比图表
         dbc.Row([
             dbc.Col([
-                html.H4("SH & SZ Index Comparison", className="text-center mb-3"),
+                html.H4("Index Comparison", className="text-center mb-3"),
+                dcc.Dropdown(
+                    id='comparison-selector',
+                    options=get_dropdown_options('index'),
+                    value=get_symbols('index')[:2],
+                    multi=True,
+                    className='mb-3'
+                ),
                 dcc.Loading(
                     id="loading-comparison",
                     type="default",
@@ -94,6 +194,19 @@ def create_index_analysis_page():
             ], width=12)
         ], className="mb-4"),
         
+        # 涨跌幅分布
+        dbc.Row([
+            dbc.Col([
+                html.H4("Return Distribution", className="text-center mb-3"),
+            ], width=12),
+            dbc.Col([
+                dcc.Graph(id='index-distribution-chart'),
+            ], width=12, lg=8),
+            dbc.Col([
+                html.Div(id='index-distribution-table'),
+            ], width=12, lg=4),
+        ], className="mb-4"),
+        
         # 统计信息
         dbc.Row([
             dbc.Col([
@@ -108,9 +221,334 @@ def create_index_analysis_page():
         
     ], fluid=True, className="py-4")
     
+    # 按默认输入预先生成图表（日期范围由回调按最新数据确定）
+    prepopulate(layout, INDEX_CHART_OUTPUTS, _index_charts(
+        request_generations.begin(None, 'index-charts'),
+        layout['market-selector'].value,
+        layout['period-selector'].value,
+        None,
+        None,
+        layout['comparison-selector'].value,
+        layout['indicator-selector'].value,
+        None,
+        None
+    ))
+    prepopulate(layout, INDEX_DISTRIBUTION_OUTPUTS, _index_distribution(
+        layout['market-selector'].value,
+        layout['period-selector'].value,
+        None,
+        None,
+        layout['comparison-selector'].value
+    ))
+    layout['index-export-button'].href = _export_href(
+        layout['market-selector'].value,
+        layout['period-selector'].value,
+        layout['date-range'].start_date,
+        layout['date-range'].end_date,
+        layout['comparison-selector'].value,
+        layout['indicator-selector'].value,
+        layout['index-export-format'].value,
+        None
+    )
+    
     return layout
 
 
+def _select_index_data(store, market, period, start_date, end_date, comparison_symbols):
+    """
+    确定页面显示的序列及日期范围（图表回调与导出回调共用）
+    
+    Returns:
+        tuple: (序列列表, 各序列该周期的全历史K线, 日期范围掩码, 起始日期, 结束日期, 最早日期, 最晚日期)
+    """
+    comparison_symbols = comparison_symbols or []
+    if market == 'both':
+        symbols = list(dict.fromkeys(comparison_symbols or get_symbols('index')[:1]))
+    else:
+        symbols = list(dict.fromkeys([market] + comparison_symbols))
+    
+    # 根据周期重采样（优先使用后台预计算结果）
+    series = {symbol: get_resampled(store, symbol, period) for symbol in symbols}
+    
+    # 设置日期范围
+    min_date = min(df['date'].min() for df in series.values())
+    max_date = max(df['date'].max() for df in series.values())
+    
+    if start_date is None:
+        start_date = max_date - pd.Timedelta(days=365)
+    if end_date is None:
+        end_date = max_date
+    
+    # 过滤日期范围
+    masks = {
+        symbol: (df['date'] >= start_date) & (df['date'] <= end_date)
+        for symbol, df in series.items()
+    }
+    return symbols, series, masks, start_date, end_date, min_date, max_date
+
+
+def _view_tables(store, market, period, symbols, series, masks, indicator_specs):
+    """
+    当前显示的数据表（单个指数时包含所选技术指标），用于导出
+    
+    Returns:
+        dict: 序列标识到[K线, 指标]数据表列表的映射
+    """
+    if market != 'both':
+        symbols = [market]
+    
+    tables = {}
+    for symbol in symbols:
+        # 数据按日期有序，区间为连续行，用切片代替布尔索引避免复制
+        rows = np.flatnonzero(masks[symbol].to_numpy())
+        rows = slice(rows[0], rows[-1] + 1) if len(rows) else slice(0, 0)
+        parts = [series[symbol].iloc[rows]]
+        if market != 'both' and indicator_specs:
+            parts.append(get_indicators(store, symbol, period, series[symbol], indicator_specs).iloc[rows])
+        tables[symbol] = parts
+    return tables
+
+
+def _view_tag(store, market, period, start_date, end_date, comparison_symbols, indicator_specs):
+    """
+    会话存储中当前显示数据的标签：输入参数或数据版本变化后，旧的数据表不再有效
+    """
+    return (
+        store.version, market, period,
+        pd.Timestamp(start_date).strftime('%Y-%m-%d'), pd.Timestamp(end_date).strftime('%Y-%m-%d'),
+        tuple(comparison_symbols or []), tuple(indicator_specs or [])
+    )
+
+
+def _export_href(market, period, start_date, end_date, comparison_symbols, indicator_specs, fmt, session_id):
+    """
+    下载按钮指向的导出地址（参数与图表回调的输入一致）
+    """
+    return export_url(
+        INDEX_EXPORT_PATH,
+        market=market, period=period,
+        start=None if start_date is None else pd.Timestamp(start_date).strftime('%Y-%m-%d'),
+        end=None if end_date is None else pd.Timestamp(end_date).strftime('%Y-%m-%d'),
+        comparison=comparison_symbols or [], indicator=indicator_specs or [],
+        format=fmt, session=session_id
+    )
+
+
+def _export_args(args):
+    """
+    解析并校验导出地址的查询参数，参数无效时返回400
+    
+    Returns:
+        tuple: (市场, 周期, 起始日期, 结束日期, 对比序列, 技术指标, 格式, 会话ID)
+    """
+    symbols = get_symbols('index')
+    market = args.get('market', symbols[0])
+    period = args.get('period', 'daily')
+    comparison_symbols = args.getlist('comparison')
+    indicator_specs = args.getlist('indicator')
+    fmt = args.get('format', 'csv')
+    if market != 'both' and market not in symbols:
+        abort(400, f"Unknown market: {market}")
+    if period not in PERIODS:
+        abort(400, f"'period' must be one of {', '.join(PERIODS)}")
+    if any(symbol not in symbols for symbol in comparison_symbols):
+        abort(400, "Unknown comparison symbol")
+    if any(spec not in {option['value'] for option in INDICATOR_OPTIONS} for spec in indicator_specs):
+        abort(400, "Unknown indicator")
+    if fmt not in EXPORT_FORMATS:
+        abort(400, f"'format' must be one of {', '.join(EXPORT_FORMATS)}")
+    
+    dates = []
+    for name in ('start', 'end'):
+        value = args.get(name)
+        try:
+            dates.append(None if value is None else pd.to_datetime(value, format='%Y-%m-%d'))
+        except (ValueError, OverflowError):
+            abort(400, f"'{name}' must be a date (YYYY-MM-DD)")
+    return (market, period, dates[0], dates[1], comparison_symbols, indicator_specs, fmt,
+            args.get('session'))
+
+
+def _daily_bars(store, market, start_date, end_date, indicators, domain=None):
+    """
+    按可见范围从瓦片中取日K线（桶数不超过LOD_MAX_POINTS，范围较短时即逐日K线），
+    指标取各桶最后一行的值
+    
+    Returns:
+        tuple: (瓦片位置, K线, 指标, 周期名称)
+    """
+    key, bars = get_series_tiles(store, market).query(start_date, end_date, how=OHLC, domain=domain)
+    level = key[0] if key else 0
+    period_name = 'Daily' if level == 0 else f'Daily, {2 ** level}-Day Bars'
+    return key, bars, indicators.iloc[bars['row'].to_numpy()], period_name
+
+
+def _index_charts(step, market, period, start_date, end_date, comparison_symbols, indicator_specs,
+                  chart_state, session_id):
+    """
+    生成指数图表（页面布局预先生成和回调共用）
+    
+    Args:
+        step (callable): 阶段检查函数（见request_generations.begin）
+        session_id (str): 浏览器会话标识，当前显示的数据表按会话保存供导出使用
+    
+    Returns:
+        tuple: 与INDEX_CHART_OUTPUTS对应的输出值
+    """
+    # 日期范围截止到最新数据时，数据更新后继续显示到最新
+    if chart_state and end_date is not None and pd.Timestamp(end_date) >= pd.Timestamp(chart_state['max_date']):
+        end_date = None
+    
+    step((10, 'Loading data'))
+    store = load_panel_store()
+    symbols, series, masks, start_date, end_date, min_date, max_date = _select_index_data(
+        store, market, period, start_date, end_date, comparison_symbols
+    )
+    comparison_symbols = comparison_symbols or []
+    filtered = {symbol: df[masks[symbol]] for symbol, df in series.items()}
+    
+    # 创建主图表
+    step((40, 'Main chart'))
+    period_name = {'daily': 'Daily', 'weekly': 'Weekly', 'monthly': 'Monthly'}[period]
+    main_view = None
+    
+    if market == 'both':
+        entry = get_dataset(symbols[0])
+        main_fig = create_line_chart(filtered[symbols[0]], f"{entry['label']} - {period_name}")
+        selected_data = filtered[symbols[0]]
+        market_name = " & ".join(get_dataset(symbol)['abbr'] for symbol in symbols) + " Indices"
+    else:
+        entry = get_dataset(market)
+        # 指标基于全历史K线计算并缓存，再按日期范围截取
+        indicator_specs = indicator_specs or []
+        indicators = get_indicators(store, market, period, series[market], indicator_specs)
+        if period == 'daily':
+            # 日线长区间按瓦片降低分辨率，缩放时再取对应级别的瓦片
+            key, bars, bar_indicators, period_name = _daily_bars(store, market, start_date, end_date, indicators)
+            main_view = {
+                'version': store.version,
+                'market': market,
+                'specs': indicator_specs,
+                'domain': [
+                    pd.Timestamp(start_date).strftime('%Y-%m-%d'),
+                    # 显示到最新数据时不设上限，追加的新K线也在范围内
+                    None if pd.Timestamp(end_date) >= max_date else pd.Timestamp(end_date).strftime('%Y-%m-%d')
+                ],
+                'key': list(key) if key else None,
+            }
+        else:
+            bars, bar_indicators = filtered[market], indicators[masks[market].to_numpy()]
+        main_fig = create_candlestick_chart(
+            bars, entry['label'], period_name, indicators=bar_indicators, specs=indicator_specs
+        )
+        # 同一视图内缩放后替换数据时保持用户的缩放范围
+        main_fig.update_layout(uirevision=f'{market}/{period}/{start_date}/{end_date}')
+        selected_data = filtered[market]
+        market_name = entry['label']
+    
+    # 创建对比图表
+    step((75, 'Comparison chart'))
+    comparison_entries = [get_dataset(symbol) for symbol in comparison_symbols]
+    comparison_fig = create_comparison_chart(
+        {
+            entry['short_label']: rebase_normalized(
+                get_normalized(store, entry['symbol'], period), start_date, end_date
+            )
+            for entry in comparison_entries
+        },
+        colors={entry['short_label']: entry['color'] for entry in comparison_entries}
+    )
+    
+    # 计算统计信息
+    if len(selected_data) > 0:
+        stats = html.Div([
+            dbc.Row([
+                dbc.Col([
+                    html.P(f"Market: {market_name}"),
+                    html.P(f"Data Points: {len(selected_data)}"),
+                ], width=6),
+                dbc.Col([
+                    html.P(f"Latest Close: {selected_data['close'].iloc[-1]:.2f}"),
+                    html.P(f"Period Change: {((selected_data['close'].iloc[-1] / selected_data['close'].iloc[0] - 1) * 100):.2f}%"),
+                ], width=6),
+            ])
+        ])
+    else:
+        stats = html.P("No data available")
+    
+    # 当前显示的数据表保存在服务端，导出时直接取用
+    session_store.put(
+        session_id, 'index-view',
+        _view_tables(store, market, period, symbols, series, masks, indicator_specs),
+        tag=_view_tag(store, market, period, start_date, end_date, comparison_symbols, indicator_specs)
+    )
+    
+    chart_state = {
+        'market': market,
+        'period': period,
+        'specs': indicator_specs or [],
+        'max_date': max_date.strftime('%Y-%m-%d'),
+        'last_date': selected_data['date'].max().strftime('%Y-%m-%d') if len(selected_data) else None,
+    }
+    
+    step()
+    return main_fig, comparison_fig, stats, start_date, end_date, min_date, max_date, chart_state, main_view
+
+
+def _index_distribution(market, period, start_date, end_date, comparison_symbols):
+    """
+    由按月、按年预计算的分位数草图合并出日期范围内的涨跌幅分布（页面布局预先生成和回调共用）
+    
+    Returns:
+        tuple: 与INDEX_DISTRIBUTION_OUTPUTS对应的输出值
+    """
+    store = load_panel_store()
+    if market == 'both':
+        symbols = list(dict.fromkeys(comparison_symbols or get_symbols('index')[:1]))
+    else:
+        symbols = [market]
+    distributions = {symbol: get_return_distribution(store, symbol, period) for symbol in symbols}
+    
+    # 未选择日期范围时与图表回调相同，显示最近一年
+    if start_date is None:
+        start_date = max(dist.dates[-1] for dist in distributions.values() if len(dist.dates)) - pd.Timedelta(days=365)
+    entries = {symbol: get_dataset(symbol) for symbol in symbols}
+    sketches = {
+        entries[symbol]['short_label']: dist.sketch(start_date, end_date)
+        for symbol, dist in distributions.items()
+    }
+    
+    period_name = {'daily': 'Daily', 'weekly': 'Weekly', 'monthly': 'Monthly'}[period]
+    fig = create_return_distribution_chart(
+        sketches, colors={entry['short_label']: entry['color'] for entry in entries.values()}, period=period_name
+    )
+    
+    def row(label, values, fmt="{:.2f}%"):
+        return html.Tr([html.Td(label)] + [html.Td(fmt.format(value)) for value in values])
+    
+    names = list(sketches)
+    risks = {level: [sketches[name].value_at_risk(level) for name in names] for level in (0.95, 0.99)}
+    table = dbc.Table([
+        html.Thead(html.Tr([html.Th("Metric")] + [html.Th(name) for name in names])),
+        html.Tbody([
+            row("Periods", [sketches[name].count for name in names], "{:.0f}"),
+            row("Mean", [sketches[name].mean() for name in names]),
+            row("Std. Dev.", [sketches[name].std() for name in names]),
+            *[
+                row(f"P{p}", [float(sketches[name].quantile(p / 100)) for name in names])
+                for p in DISTRIBUTION_PERCENTILES
+            ],
+            *[
+                row(f"{label} {level:.0%}", [risk[k] for risk in risks[level]])
+                for level in risks
+                for k, label in enumerate(("VaR", "ES"))
+            ],
+        ])
+    ], bordered=False, striped=True, size='sm')
+    
+    return fig, table
+
+
 def register_index_callbacks(app):
     """
     注册指数分析页面的回调函数
@@ -118,81 +556,163 @@ def register_index_callbacks(app):
     Args:
         app: Dash应用实例
     """
+    @background_callback(
+        app,
+        [Output(*target) for target in INDEX_CHART_OUTPUTS],
+        [Input('market-selector', 'value'),
+         Input('period-selector', 'value'),
+         Input('date-range', 'start_date'),
+         Input('date-range', 'end_date'),
+         Input('comparison-selector', 'value'),
+         Input('indicator-selector', 'value')],
+        [State('index-chart-state', 'data'),
+         State('session-id', 'data')],
+        progress=[Output('index-progress', 'value'),
+                  Output('index-progress', 'label')],
+        progress_default=(0, ''),
+        running=[(Output('index-progress', 'style'), {'height': '6px'}, {'height': '6px', 'visibility': 'hidden'})],
+        cancel=[Input('url', 'pathname')],
+        prevent_initial_call=True
+    )
+    def update_index_charts(set_progress, market, period, start_date, end_date, comparison_symbols, indicator_specs,
+                            chart_state, session_id):
+        """更新指数图表（后台执行，同一会话有更新的请求时放弃本次计算）"""
+        step = request_generations.begin(session_id, 'index-charts', set_progress)
+        return _index_charts(step, market, period, start_date, end_date, comparison_symbols, indicator_specs,
+                             chart_state, session_id)
+    
     @app.callback(
-        [Output('index-main-chart', 'figure'),
-         Output('index-comparison-chart', 'figure'),
-         Output('index-statistics', 'children'),
-         Output('date-range', 'start_date'),
-         Output('date-range', 'end_date'),
-         Output('date-range', 'min_date_allowed'),
-         Output('date-range', 'max_date_allowed')],
+        [Output(*target) for target in INDEX_DISTRIBUTION_OUTPUTS],
         [Input('market-selector', 'value'),
          Input('period-selector', 'value'),
          Input('date-range', 'start_date'),
-         Input('date-range', 'end_date')]
+         Input('date-range', 'end_date'),
+         Input('comparison-selector', 'value')],
+        prevent_initial_call=True
     )
-    def update_index_charts(market, period, start_date, end_date):
-        """更新指数图表"""
-        # 加载数据
-        data = load_cleaned_data()
-        sh_data = data['sh_index']
-        sz_data = data['sz_index']
-        
-        # 根据周期重采样
-        if period == 'weekly':
-            sh_data = resample_to_weekly(sh_data)
-            sz_data = resample_to_weekly(sz_data)
-        elif period == 'monthly':
-            sh_data = resample_to_monthly(sh_data)
-            sz_data = resample_to_monthly(sz_data)
-        
-        # 设置日期范围
-        min_date = min(sh_data['date'].min(), sz_data['date'].min())
-        max_date = max(sh_data['date'].max(), sz_data['date'].max())
+    def update_index_distribution(market, period, start_date, end_date, comparison_symbols):
+        """更新涨跌幅分布（合并日期范围内的月度、年度草图，不对原始涨跌幅排序）"""
+        return _index_distribution(market, period, start_date, end_date, comparison_symbols)
+    
+    @app.callback(
+        [Output('index-live-extension', 'data'),
+         Output('index-chart-state', 'data', allow_duplicate=True),
+         Output('date-range', 'max_date_allowed', allow_duplicate=True)],
+        Input('data-version', 'data'),
+        [State('index-chart-state', 'data'),
+         State('index-main-view', 'data')],
+        prevent_initial_call=True
+    )
+    def extend_index_chart(version, chart_state, main_view):
+        """数据更新时把新增日K线追加到主图，而不重新生成整个图表"""
+        # 只有显示到最新日期的单指数日线图可以直接追加（周线、月线的最后一根K线会变化），
+        # 且图表显示的是逐日K线（多日合并的K线后不能直接接逐日K线）
+        if (not chart_state or chart_state['market'] == 'both' or chart_state['period'] != 'daily'
+                or chart_state['last_date'] is None or chart_state['last_date'] < chart_state['max_date']
+                or (main_view and main_view['key'] and main_view['key'][0] > 0)):
+            raise PreventUpdate
         
-        if start_date is None:
-            start_date = max_date - pd.Timedelta(days=365)
-        if end_date is None:
-            end_date = max_date
+        store = load_panel_store()
+        market = chart_state['market']
+        last_date = pd.Timestamp(chart_state['last_date'])
+        new_bars = store.get(market, start_date=last_date + pd.Timedelta(days=1))
+        if new_bars.empty:
+            raise PreventUpdate
         
-        # 过滤日期范围
-        sh_filtered = sh_data[(sh_data['date'] >= start_date) & (sh_data['date'] <= end_date)]
-        sz_filtered = sz_data[(sz_data['date'] >= start_date) & (sz_data['date'] <= end_date)]
+        # 指标基于更新后的全历史计算（已缓存），取末尾与新增K线对齐的部分
+        specs = chart_state['specs']
+        indicators = get_indicators(store, market, 'daily', store.get(market), specs).iloc[-len(new_bars):]
         
-        # 创建主图表
-        period_name = {'daily': 'Daily', 'weekly': 'Weekly', 'monthly': 'Monthly'}[period]
+        latest = new_bars['date'].iloc[-1].strftime('%Y-%m-%d')
+        chart_state = dict(chart_state, last_date=latest, max_date=latest)
+        return candlestick_extension(new_bars, indicators, specs), chart_state, latest
+    
+    @app.callback(
+        [Output('index-main-chart', 'figure', allow_duplicate=True),
+         Output('index-main-view', 'data', allow_duplicate=True)],
+        Input('index-main-chart', 'relayoutData'),
+        State('index-main-view', 'data'),
+        prevent_initial_call=True
+    )
+    def zoom_index_chart(relayout_data, main_view):
+        """缩放或平移日K线图时取覆盖可见范围、对应级别的瓦片，只替换图表数据"""
+        visible = parse_x_range(relayout_data)
+        if not main_view or visible is None:
+            raise PreventUpdate
         
-        if market == 'sh':
-            main_fig = create_candlestick_chart(sh_filtered, "Shanghai Composite Index", period_name)
-            selected_data = sh_filtered
-            market_name = "Shanghai Composite Index"
-        elif market == 'sz':
-            main_fig = create_candlestick_chart(sz_filtered, "Shenzhen Component Index", period_name)
-            selected_data = sz_filtered
-            market_name = "Shenzhen Component Index"
-        else:  # both
-            main_fig = create_line_chart(sh_filtered, f"Shanghai Composite Index - {period_name}")
-            selected_data = sh_filtered
-            market_name = "SH & SZ Indices"
+        store = load_panel_store()
+        domain = main_view['domain']
+        # 恢复自动范围时显示整个日期范围
+        start_date, end_date = (visible[0] or domain[0]), (visible[1] or domain[1])
+        start_date = max(pd.Timestamp(start_date), pd.Timestamp(domain[0]))
+        if domain[1] is not None:
+            end_date = min(pd.Timestamp(end_date), pd.Timestamp(domain[1]))
         
-        # 创建对比图表
-        comparison_fig = create_comparison_chart(sh_filtered, sz_filtered)
+        tiles = get_series_tiles(store, main_view['market'])
+        key = tiles.locate(start_date, end_date)
+        # 已显示的瓦片覆盖可见范围时不需要更新
+        if key is None or (main_view['version'] == store.version and covers(main_view['key'], key)):
+            raise PreventUpdate
         
-        # 计算统计信息
-        if len(selected_data) > 0:
-            stats = html.Div([
-                dbc.Row([
-                    dbc.Col([
-                        html.P(f"Market: {market_name}"),
-                        html.P(f"Data Points: {len(selected_data)}"),
-                    ], width=6),
-                    dbc.Col([
-                        html.P(f"Latest Close: {selected_data['close'].iloc[-1]:.2f}"),
-                        html.P(f"Period Change: {((selected_data['close'].iloc[-1] / selected_data['close'].iloc[0] - 1) * 100):.2f}%"),
-                    ], width=6),
-                ])
-            ])
-        else:
-            stats = html.P("No data available")
+        specs = main_view['specs']
+        indicators = get_indicators(store, main_view['market'], 'daily', store.get(main_view['market']), specs)
+        key, bars, bar_indicators, period_name = _daily_bars(
+            store, main_view['market'], start_date, end_date, indicators, domain=domain
+        )
+        patch = candlestick_patch(bars, bar_indicators, specs, get_dataset(main_view['market'])['label'], period_name)
+        return patch, dict(main_view, version=store.version, key=list(key))
+    
+    # 按分组依次扩展主图的trace（K线、柱状图和折线的扩展属性不同，需分别调用）
+    app.clientside_callback(
+        """
+        function(groups) {
+            var graph = document.getElementById('index-main-chart');
+            var gd = graph && graph.querySelector('.js-plotly-plot');
+            if (!groups || !gd) {
+                return;
+            }
+            groups.forEach(function(group) {
+                Plotly.extendTraces(gd, group[0], group[1]);
+            });
+        }
+        """,
+        Input('index-live-extension', 'data'),
+        prevent_initial_call=True
+    )
+    
+    @app.callback(
+        Output('index-export-button', 'href'),
+        [Input('market-selector', 'value'),
+         Input('period-selector', 'value'),
+         Input('date-range', 'start_date'),
+         Input('date-range', 'end_date'),
+         Input('comparison-selector', 'value'),
+         Input('indicator-selector', 'value'),
+         Input('index-export-format', 'value'),
+         Input('session-id', 'data')],
+        prevent_initial_call=True
+    )
+    def update_index_export_href(market, period, start_date, end_date, comparison_symbols, indicator_specs,
+                                 fmt, session_id):
+        """输入变化时更新下载按钮指向的导出地址"""
+        return _export_href(market, period, start_date, end_date, comparison_symbols, indicator_specs,
+                            fmt, session_id)
+    
+    @app.server.route(INDEX_EXPORT_PATH)
+    def export_index_data():
+        """流式导出当前显示的K线数据（优先使用图表回调保存在会话存储中的数据表）"""
+        (market, period, start_date, end_date, comparison_symbols, indicator_specs, fmt,
+         session_id) = _export_args(request.args)
+        store = load_panel_store()
+        symbols, series, masks, start_date, end_date, _, _ = _select_index_data(
+            store, market, period, start_date, end_date, comparison_symbols
+        )
+        tables = session_store.get(
+            session_id, 'index-view',
+            tag=_view_tag(store, market, period, start_date, end_date, comparison_symbols, indicator_specs)
+        )
+        if tables is None:
+            tables = _view_tables(store, market, period, symbols, series, masks, indicator_specs)
         
-        return main_fig, comparison_fig, stats, start_date, end_date, min_date, max_date
+        name = f"{'_'.join(tables)}_{period}_{pd.Timestamp(start_date):%Y%m%d}_{pd.Timestamp(end_date):%Y%m%d}"
+        return export_response(tables, fmt, name)
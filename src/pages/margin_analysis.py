@@ -2,18 +2,79 @@
 融资融券分析页面
 """
 
-from dash import html, dcc, callback, Input, Output
+from dash import html, dcc, callback, Input, Output, State, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+from flask import request, abort
 import pandas as pd
-from src.utils.clean_data import load_cleaned_data
+from src.utils.clean_data import load_panel_store
+from src.utils.precompute import get_margin_pivot, get_series_tiles
+from src.utils.tiles import parse_x_range, covers
+from src.utils.catalog import get_catalog, get_dataset, get_symbols, get_dropdown_options
+from src.utils.export import EXPORT_FORMATS, get_export_format_options, export_response, export_url
+from src.utils.layout_cache import prepopulate
 from src.components.margin_charts import (
     create_margin_trend_chart,
     create_margin_components_chart,
     create_margin_balance_change_chart,
-    create_margin_heatmap
+    create_margin_heatmap,
+    margin_components_patch,
+    margin_heatmap_patch,
+    margin_trend_extension,
+    margin_trend_patch,
+    margin_balance_change_extension,
+    margin_components_extension
 )
 
 
+# 导出路由（下载按钮直接链接到该路由，由浏览器下载流式响应）
+MARGIN_EXPORT_PATH = '/export/margin'
+
+# 热力图可选的度量列：(显示名称, 单位)
+HEATMAP_COLUMNS = {
+    'margin_balance': ('Margin Balance', '100m yuan'),
+    'financing_balance': ('Financing Balance', '100m yuan'),
+    'financing_purchase': ('Financing Purchase', '100m yuan'),
+    'financing_redeem': ('Financing Redeem', '100m yuan'),
+    'securities_lending_balance': ('Securities Lending Balance', '100m yuan'),
+    'securities_lending_sell': ('Securities Lending Sell', '100m yuan'),
+    'securities_lending_shares': ('Securities Lending Shares', '100m shares'),
+}
+
+# 热力图可选的统计量
+HEATMAP_STATISTICS = {
+    'mean': 'Average',
+    'last': 'Period-End',
+    'max': 'Maximum',
+    'min': 'Minimum',
+    'sum': 'Total',
+}
+
+# 热力图可选的年内周期
+HEATMAP_GRAINS = {
+    'month': 'Month',
+    'quarter': 'Quarter',
+    'week': 'Week',
+}
+
+
+# 融资融券图表回调的输出
+MARGIN_CHART_OUTPUTS = [
+    ('margin-trend-chart', 'figure'),
+    ('margin-change-chart', 'figure'),
+    ('margin-components-chart', 'figure'),
+    ('margin-statistics', 'children'),
+    ('margin-chart-state', 'data'),
+    ('margin-trend-view', 'data'),
+]
+
+# 热力图回调的输出
+MARGIN_HEATMAP_OUTPUTS = [
+    ('margin-heatmap-chart', 'figure'),
+    ('margin-heatmap-state', 'data'),
+]
+
+
 def create_margin_analysis_page():
     """
     创建融资融券分析页面布局
@@ -28,7 +89,7 @@ def create_margin_analysis_page():
         # 沪深两市融资融券余额趋势
         dbc.Row([
             dbc.Col([
-                html.H4("Margin Trading Balance Trend in SH & SZ Markets", className="text-center mb-3"),
+                html.H4("Margin Trading Balance Trend by Market", className="text-center mb-3"),
                 dcc.Loading(
                     id="loading-margin-trend",
                     type="default",
@@ -61,13 +122,30 @@ def create_margin_analysis_page():
                         html.Label("Select Market for Detailed Information:"),
                         dcc.Dropdown(
                             id='margin-market-selector',
-                            options=[
-                                {'label': 'Shanghai Market', 'value': 'sh'},
-                                {'label': 'Shenzhen Market', 'value': 'sz'}
-                            ],
-                            value='sh',
+                            options=get_dropdown_options('margin'),
+                            value=get_symbols('margin')[0],
                             className='mb-3'
                         ),
+                        
+                        # 数据导出
+                        html.Label("Export Margin Data:"),
+                        dbc.InputGroup([
+                            dbc.Select(
+                                id='margin-export-scope',
+                                options=[
+                                    {'label': 'Selected Market', 'value': 'selected'},
+                                    {'label': 'All Markets', 'value': 'all'}
+                                ],
+                                value='selected'
+                            ),
+                            dbc.Select(
+                                id='margin-export-format',
+                                options=get_export_format_options(),
+                                value='csv'
+                            ),
+                            dbc.Button("Download", id='margin-export-button', color='secondary',
+                                       external_link=True),
+                        ], size='sm'),
                     ])
                 ])
             ], width=12)
@@ -85,8 +163,25 @@ def create_margin_analysis_page():
                 )
             ], width=12, lg=6),
             
-            # 月度热力图
+            # 年内周期热力图
             dbc.Col([
+                dbc.InputGroup([
+                    dbc.Select(
+                        id='margin-heatmap-column',
+                        options=[{'label': label, 'value': column} for column, (label, _) in HEATMAP_COLUMNS.items()],
+                        value='margin_balance'
+                    ),
+                    dbc.Select(
+                        id='margin-heatmap-statistic',
+                        options=[{'label': label, 'value': statistic} for statistic, label in HEATMAP_STATISTICS.items()],
+                        value='mean'
+                    ),
+                    dbc.Select(
+                        id='margin-heatmap-grain',
+                        options=[{'label': label, 'value': grain} for grain, label in HEATMAP_GRAINS.items()],
+                        value='month'
+                    ),
+                ], size='sm', className="mb-2"),
                 dcc.Loading(
                     id="loading-margin-heatmap",
                     type="default",
@@ -107,13 +202,141 @@ def create_margin_analysis_page():
                     ])
                 ])
             ], width=12)
-        ])
+        ]),
+        
+        # 各图表已显示到的日期，数据更新时据此追加新数据
+        dcc.Store(id='margin-chart-state'),
+        
+        # 趋势图当前显示的瓦片，缩放时据此判断是否需要取新的瓦片
+        dcc.Store(id='margin-trend-view'),
+        
+        # 热力图当前的年内周期，周期不变时只发送变化的数据
+        dcc.Store(id='margin-heatmap-state')
         
     ], fluid=True, className="py-4")
     
+    # 按默认输入预先生成图表
+    market = layout['margin-market-selector'].value
+    prepopulate(layout, MARGIN_CHART_OUTPUTS, _margin_charts(market, None))
+    prepopulate(layout, MARGIN_HEATMAP_OUTPUTS, _margin_heatmap(
+        market,
+        layout['margin-heatmap-column'].value,
+        layout['margin-heatmap-statistic'].value,
+        layout['margin-heatmap-grain'].value,
+        None
+    ))
+    layout['margin-export-button'].href = export_url(
+        MARGIN_EXPORT_PATH,
+        market=market, scope=layout['margin-export-scope'].value, format=layout['margin-export-format'].value
+    )
+    
     return layout
 
 
+def _margin_trend_data(store, start_date=None, end_date=None, whole_tiles=False):
+    """
+    趋势图各市场按可见范围从瓦片中取余额（桶数不超过LOD_MAX_POINTS，取各桶末值）
+    
+    Returns:
+        tuple: (市场简称到数据的映射, 趋势图视图状态)
+    """
+    how = {'margin_balance': 'last', 'financing_balance': 'last'}
+    data = {}
+    keys = {}
+    for entry in get_catalog('margin'):
+        key, data[entry['abbr']] = get_series_tiles(store, entry['symbol']).query(
+            start_date, end_date, how=how, domain=(None, None) if whole_tiles else None
+        )
+        keys[entry['symbol']] = list(key) if key else None
+    return data, {'version': store.version, 'keys': keys}
+
+
+def _margin_charts(selected_market, chart_state):
+    """
+    生成融资融券图表（页面布局预先生成和回调共用）
+    
+    趋势图和余额变化率图包含所有市场，已显示时切换市场不重新发送；组成部分图只发送所选市场的数据
+    
+    Returns:
+        tuple: 与MARGIN_CHART_OUTPUTS对应的输出值
+    """
+    # 只从面板存储中取融资融券序列（不复制其他数据集）
+    store = load_panel_store()
+    entries = get_catalog('margin')
+    colors = {entry['abbr']: entry['color'] for entry in entries}
+    
+    # 根据选择的市场创建详细图表
+    selected_data = store.get(selected_market)
+    market_name = get_dataset(selected_market)['label']
+    
+    if chart_state is None:
+        # 创建趋势图（各市场对比，全历史按瓦片降低分辨率，缩放时保持用户的缩放范围）
+        trend_data, trend_view = _margin_trend_data(store)
+        trend_fig = create_margin_trend_chart(trend_data, colors)
+        trend_fig.update_layout(uirevision='margin-trend')
+        
+        # 创建余额变化率图
+        margin_data = {entry['abbr']: store.get(entry['symbol']) for entry in entries}
+        change_fig = create_margin_balance_change_chart(margin_data, colors)
+        
+        # 创建组成部分图表
+        components_fig = create_margin_components_chart(selected_data, market_name)
+    else:
+        # 图表已显示（新增数据已通过extendData追加），只替换组成部分图的数据
+        trend_fig = change_fig = trend_view = no_update
+        components_fig = margin_components_patch(selected_data, market_name)
+    
+    # 计算统计信息
+    latest = selected_data.iloc[-1]
+    earliest = selected_data.iloc[0]
+    
+    stats = html.Div([
+        dbc.Row([
+            dbc.Col([
+                html.P(f"Market: {market_name}"),
+                html.P(f"Data Points: {len(selected_data)}"),
+                html.P(f"Date Range: {selected_data['date'].min().strftime('%Y-%m-%d')} to {selected_data['date'].max().strftime('%Y-%m-%d')}"),
+            ], width=6),
+            dbc.Col([
+                html.P(f"Latest Margin Balance: {latest['margin_balance']/100000000:.2f} billion yuan"),
+                html.P(f"Latest Financing Balance: {latest['financing_balance']/100000000:.2f} billion yuan"),
+                html.P(f"Period Growth: {((latest['margin_balance'] / earliest['margin_balance'] - 1) * 100):.2f}%"),
+            ], width=6),
+        ])
+    ])
+    
+    # 各序列按日期有序，末尾日期直接取日期列的最后一个值
+    chart_state = {
+        'selected': selected_market,
+        'last_dates': {
+            entry['symbol']: pd.Timestamp(store.column(entry['symbol'], 'date')[-1]).strftime('%Y-%m-%d')
+            for entry in entries
+        },
+    }
+    
+    return trend_fig, change_fig, components_fig, stats, chart_state, trend_view
+
+
+def _margin_heatmap(selected_market, column, statistic, grain, heatmap_state):
+    """
+    生成热力图：对预聚合立方体切片（页面布局预先生成和回调共用）
+    
+    年内周期不变时图表结构相同，只发送透视表取值和标题
+    
+    Returns:
+        tuple: 与MARGIN_HEATMAP_OUTPUTS对应的输出值
+    """
+    column_name, unit = HEATMAP_COLUMNS[column]
+    heatmap_data = get_margin_pivot(load_panel_store(), selected_market, column, statistic, grain)
+    market_name = get_dataset(selected_market)['label']
+    labels = dict(grain=grain, statistic_name=HEATMAP_STATISTICS[statistic], column_name=column_name, unit=unit)
+    if heatmap_state is not None and heatmap_state['grain'] == grain:
+        figure = margin_heatmap_patch(heatmap_data, market_name, **labels)
+    else:
+        figure = create_margin_heatmap(None, market_name, heatmap_data, **labels)
+    return figure, {'grain': grain}
+
+
 def register_margin_callbacks(app):
     """
     注册融资融券分析页面的回调函数
@@ -122,57 +345,122 @@ def register_margin_callbacks(app):
         app: Dash应用实例
     """
     @app.callback(
-        [Output('margin-trend-chart', 'figure'),
-         Output('margin-change-chart', 'figure'),
-         Output('margin-components-chart', 'figure'),
-         Output('margin-heatmap-chart', 'figure'),
-         Output('margin-statistics', 'children')],
-        [Input('margin-market-selector', 'value')]
+        [Output(*target) for target in MARGIN_CHART_OUTPUTS],
+        [Input('margin-market-selector', 'value')],
+        State('margin-chart-state', 'data'),
+        prevent_initial_call=True
     )
-    def update_margin_charts(selected_market):
-        """更新融资融券图表"""
-        # 加载数据
-        data = load_cleaned_data()
-        sh_margin = data['sh_margin']
-        sz_margin = data['sz_margin']
+    def update_margin_charts(selected_market, chart_state):
+        """更新融资融券图表（默认市场的图表已在页面布局中生成）"""
+        return _margin_charts(selected_market, chart_state)
+    
+    @app.callback(
+        [Output(*target) for target in MARGIN_HEATMAP_OUTPUTS],
+        [Input('margin-market-selector', 'value'),
+         Input('margin-heatmap-column', 'value'),
+         Input('margin-heatmap-statistic', 'value'),
+         Input('margin-heatmap-grain', 'value'),
+         Input('data-version', 'data')],
+        State('margin-heatmap-state', 'data'),
+        prevent_initial_call=True
+    )
+    def update_margin_heatmap(selected_market, column, statistic, grain, version, heatmap_state):
+        """更新热力图，数据更新后立方体随版本重建"""
+        return _margin_heatmap(selected_market, column, statistic, grain, heatmap_state)
+    
+    @app.callback(
+        [Output('margin-trend-chart', 'figure', allow_duplicate=True),
+         Output('margin-trend-view', 'data', allow_duplicate=True)],
+        Input('margin-trend-chart', 'relayoutData'),
+        State('margin-trend-view', 'data'),
+        prevent_initial_call=True
+    )
+    def zoom_margin_trend(relayout_data, trend_view):
+        """缩放或平移趋势图时取覆盖可见范围、对应级别的瓦片，只替换曲线数据"""
+        visible = parse_x_range(relayout_data)
+        if not trend_view or visible is None:
+            raise PreventUpdate
         
-        # 创建趋势图（沪深对比）
-        trend_fig = create_margin_trend_chart(sh_margin, sz_margin)
+        store = load_panel_store()
+        # 已显示的瓦片覆盖可见范围时不需要更新
+        if trend_view['version'] == store.version and all(
+            covers(trend_view['keys'].get(entry['symbol']), get_series_tiles(store, entry['symbol']).locate(*visible))
+            for entry in get_catalog('margin')
+        ):
+            raise PreventUpdate
         
-        # 创建余额变化率图
-        change_fig = create_margin_balance_change_chart(sh_margin, sz_margin)
+        trend_data, trend_view = _margin_trend_data(store, *visible, whole_tiles=True)
+        return margin_trend_patch(trend_data), trend_view
+    
+    @app.callback(
+        [Output('margin-trend-chart', 'extendData'),
+         Output('margin-change-chart', 'extendData'),
+         Output('margin-components-chart', 'extendData'),
+         Output('margin-chart-state', 'data', allow_duplicate=True)],
+        Input('data-version', 'data'),
+        State('margin-chart-state', 'data'),
+        prevent_initial_call=True
+    )
+    def extend_margin_charts(version, chart_state):
+        """数据更新时把新增数据追加到全历史图表，而不重新生成图表"""
+        if not chart_state:
+            raise PreventUpdate
         
-        # 根据选择的市场创建详细图表
-        if selected_market == 'sh':
-            selected_data = sh_margin
-            market_name = 'Shanghai Market'
-        else:
-            selected_data = sz_margin
-            market_name = 'Shenzhen Market'
+        store = load_panel_store()
+        new_rows = {
+            entry['abbr']: store.get(
+                entry['symbol'],
+                start_date=pd.Timestamp(chart_state['last_dates'][entry['symbol']]) + pd.Timedelta(days=1)
+            )
+            for entry in get_catalog('margin')
+        }
+        if all(df.empty for df in new_rows.values()):
+            raise PreventUpdate
         
-        # 创建组成部分图表
-        components_fig = create_margin_components_chart(selected_data, market_name)
+        last_dates = dict(chart_state['last_dates'])
+        for entry in get_catalog('margin'):
+            df = new_rows[entry['abbr']]
+            if not df.empty:
+                last_dates[entry['symbol']] = df['date'].iloc[-1].strftime('%Y-%m-%d')
         
-        # 创建热力图
-        heatmap_fig = create_margin_heatmap(selected_data, market_name)
-        
-        # 计算统计信息
-        latest = selected_data.iloc[-1]
-        earliest = selected_data.iloc[0]
-        
-        stats = html.Div([
-            dbc.Row([
-                dbc.Col([
-                    html.P(f"Market: {market_name}"),
-                    html.P(f"Data Points: {len(selected_data)}"),
-                    html.P(f"Date Range: {selected_data['date'].min().strftime('%Y-%m-%d')} to {selected_data['date'].max().strftime('%Y-%m-%d')}"),
-                ], width=6),
-                dbc.Col([
-                    html.P(f"Latest Margin Balance: {latest['margin_balance']/100000000:.2f} billion yuan"),
-                    html.P(f"Latest Financing Balance: {latest['financing_balance']/100000000:.2f} billion yuan"),
-                    html.P(f"Period Growth: {((latest['margin_balance'] / earliest['margin_balance'] - 1) * 100):.2f}%"),
-                ], width=6),
-            ])
-        ])
+        # 趋势图按瓦片显示时新增的逐日数据接在最后一个桶之后，缩放时再统一按瓦片取数
+        selected_rows = new_rows[get_dataset(chart_state['selected'])['abbr']]
+        return (
+            margin_trend_extension(new_rows),
+            margin_balance_change_extension(new_rows),
+            margin_components_extension(selected_rows),
+            dict(chart_state, last_dates=last_dates)
+        )
+    
+    @app.callback(
+        Output('margin-export-button', 'href'),
+        [Input('margin-market-selector', 'value'),
+         Input('margin-export-scope', 'value'),
+         Input('margin-export-format', 'value')],
+        prevent_initial_call=True
+    )
+    def update_margin_export_href(selected_market, scope, fmt):
+        """选择变化时更新下载按钮指向的导出地址"""
+        return export_url(MARGIN_EXPORT_PATH, market=selected_market, scope=scope, format=fmt)
+    
+    @app.server.route(MARGIN_EXPORT_PATH)
+    def export_margin_data():
+        """流式导出融资融券数据表（直接读取面板存储中的切片）"""
+        symbols = get_symbols('margin')
+        selected_market = request.args.get('market', symbols[0])
+        scope = request.args.get('scope', 'selected')
+        fmt = request.args.get('format', 'csv')
+        if selected_market not in symbols:
+            abort(400, f"Unknown market: {selected_market}")
+        if scope not in ('selected', 'all'):
+            abort(400, "'scope' must be 'selected' or 'all'")
+        if fmt not in EXPORT_FORMATS:
+            abort(400, f"'format' must be one of {', '.join(EXPORT_FORMATS)}")
+        
+        store = load_panel_store()
+        if scope != 'all':
+            symbols = [selected_market]
+        tables = {symbol: [store.get(symbol)] for symbol in symbols}
         
-        return trend_fig, change_fig, components_fig, heatmap_fig, stats
+        name = 'margin_all' if scope == 'all' else selected_market
+        return export_response(tables, fmt, name)
@@ -0,0 +1,109 @@
+"""
+派生数据产物存储模块
+按数据集版本号把预计算结果序列化到本地目录：
+    <ARTIFACT_PATH>/<version>/<key>.pkl
+写入先落到临时文件再原子替换，读者不会读到写了一半的文件
+"""
+
+import os
+import pickle
+import shutil
+import threading
+import time
+from config import ARTIFACT_PATH
+from .cache_manager import cache_manager
+
+
+def get_artifact_root():
+    """
+    获取产物存储根目录的绝对路径
+
+    Returns:
+        str: 产物存储根目录
+    """
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(current_dir))
+    return os.path.join(project_root, ARTIFACT_PATH)
+
+
+class ArtifactStore:
+    """
+    本地产物存储，键为'/'分隔的字符串，如'resample/sh_index/weekly'
+
+    最近读取或写入的产物同时保存在统一缓存管理器中，避免重复反序列化；
+    内存条目的重算耗时记为读写磁盘文件的耗时，被淘汰后从磁盘重新读取
+    """
+
+    def __init__(self, root=None):
+        """
+        Args:
+            root (str): 存储根目录，为None时使用配置ARTIFACT_PATH
+        """
+        self.root = root or get_artifact_root()
+        self._memory = cache_manager.cache('artifacts')
+
+    def _path(self, version, key):
+        return os.path.join(self.root, version, *key.split('/')) + '.pkl'
+
+    def has(self, version, key):
+        """
+        判断某版本的产物是否已就绪
+        """
+        return (version, key) in self._memory or os.path.exists(self._path(version, key))
+
+    def get(self, version, key):
+        """
+        读取产物，未就绪时返回None
+
+        Args:
+            version (str): 数据集版本号
+            key (str): 产物键
+
+        Returns:
+            object: 产物内容或None
+        """
+        cached = self._memory.get((version, key))
+        if cached is not None:
+            return cached
+
+        path = self._path(version, key)
+        if not os.path.exists(path):
+            return None
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+        self._memory.put((version, key), value, cost=time.perf_counter() - start)
+        return value
+
+    def put(self, version, key, value):
+        """
+        写入产物（临时文件 + 原子替换）
+
+        Args:
+            version (str): 数据集版本号
+            key (str): 产物键
+            value (object): 可pickle的产物内容
+        """
+        path = self._path(version, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        start = time.perf_counter()
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        # 以写入耗时近似被淘汰后重新读取的耗时
+        self._memory.put((version, key), value, cost=time.perf_counter() - start)
+
+    def prune(self, keep_version):
+        """
+        删除其他版本的产物（磁盘和内存）
+
+        Args:
+            keep_version (str): 保留的数据集版本号
+        """
+        self._memory.retain(lambda k: k[0] == keep_version)
+        if not os.path.isdir(self.root):
+            return
+        for name in os.listdir(self.root):
+            if name != keep_version:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
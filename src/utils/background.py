@@ -0,0 +1,88 @@
+"""
+后台回调模块
+耗时的回调在独立进程中执行，不占用服务器的请求线程：任务结果保存在本地diskcache中，
+浏览器轮询任务状态并显示进度。同一回调的新请求到达时，前端会随请求带上仍在运行的旧任务，
+服务器终止旧任务，因此连续拖动滑块时只有最后一个值会被完整计算
+
+未安装diskcache/multiprocess/psutil或配置关闭时，回调按普通回调执行
+"""
+
+import functools
+import os
+from config import BACKGROUND_CALLBACKS_ENABLED, BACKGROUND_CACHE_PATH
+
+
+_manager = None
+_manager_created = False
+
+
+def get_background_manager():
+    """
+    获取进程内共享的后台回调管理器
+
+    Returns:
+        DiskcacheManager: 管理器，不可用时为None
+    """
+    global _manager, _manager_created
+    if not _manager_created:
+        _manager_created = True
+        if BACKGROUND_CALLBACKS_ENABLED:
+            try:
+                import diskcache
+                from dash import DiskcacheManager
+                current_dir = os.path.dirname(os.path.abspath(__file__))
+                project_root = os.path.dirname(os.path.dirname(current_dir))
+                cache = diskcache.Cache(os.path.join(project_root, BACKGROUND_CACHE_PATH))
+                # 任务结果被读取后即无用，一小时后过期
+                _manager = DiskcacheManager(cache, expire=3600)
+            except ImportError:
+                _manager = None
+    return _manager
+
+
+def _no_progress(value):
+    """
+    普通回调模式下的进度回调（不做任何事）
+    """
+
+
+def background_callback(app, *dependencies, progress=None, progress_default=None,
+                        running=None, cancel=None, **kwargs):
+    """
+    注册回调：后台回调可用时在独立进程中执行，并支持进度和取消；否则注册为普通回调
+
+    被装饰的函数第一个参数总是set_progress，普通回调模式下它不做任何事
+
+    Args:
+        app: Dash应用实例
+        *dependencies: Output/Input/State
+        progress (list): 进度输出，set_progress的参数按顺序写入这些属性
+        progress_default (tuple): 回调未运行时进度输出的值
+        running (list): 运行期间临时设置的属性，(Output, 运行时值, 结束后值)
+        cancel (list): 变化时取消正在运行任务的Input
+        **kwargs: 其他传给app.callback的参数
+
+    Returns:
+        callable: 装饰器
+    """
+    def decorator(func):
+        manager = get_background_manager()
+        if manager is None or progress is None:
+            @functools.wraps(func)
+            def wrapper(*args):
+                return func(_no_progress, *args)
+        if manager is None:
+            app.callback(*dependencies, **kwargs)(wrapper)
+        else:
+            app.callback(
+                *dependencies,
+                background=True,
+                manager=manager,
+                progress=progress,
+                progress_default=progress_default,
+                running=running,
+                cancel=cancel,
+                **kwargs
+            )(func if progress is not None else wrapper)
+        return func
+    return decorator
@@ -0,0 +1,274 @@
+"""
+向量化回测模块
+基于清洗后的指数日线和融资融券数据评估简单择时规则。
+持仓、收益、回撤和换手率全部以数组运算得到；参数网格（如所有均线窗口组合）
+以二维数组批量评估，并可分块在进程内共享的常驻进程池中并行计算
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+from config import BACKTEST_WORKERS
+from . import kernels
+
+
+# 年化使用的交易日数
+TRADING_DAYS_PER_YEAR = 250
+
+# 参数扫描时每个分块包含的参数组合数
+SWEEP_CHUNK_SIZE = 512
+
+# 参数扫描的窗口网格
+SWEEP_GRIDS = {
+    'coarse': list(range(5, 251, 5)),
+    'fine': list(range(2, 144)),
+}
+
+# 默认单边交易成本（基点）
+DEFAULT_COST_BPS = 5
+
+# 常驻进程池：首次并行扫描时创建，之后各次扫描复用，不在每次请求中启动和回收子进程
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def _reset_pool():
+    # fork出的子进程（后台回调）不能使用父进程的进程池，需要时重新创建
+    global _pool, _pool_workers, _pool_lock
+    _pool = _pool_workers = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_pool)
+
+
+def _get_pool(max_workers):
+    """
+    获取进程内共享的进程池，进程数变化或进程池已损坏时重新创建
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers or getattr(_pool, '_broken', False):
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=max_workers)
+            _pool_workers = max_workers
+        return _pool
+
+
+def asset_returns(close):
+    """
+    计算逐日收益率（首日为0）
+
+    Args:
+        close (np.ndarray): 收盘价序列
+
+    Returns:
+        np.ndarray: 收益率序列
+    """
+    close = np.asarray(close, dtype='float64')
+    returns = np.zeros_like(close)
+    returns[1:] = close[1:] / close[:-1] - 1
+    return returns
+
+
+def moving_averages(close, windows):
+    """
+    计算多个窗口的简单移动平均
+
+    Args:
+        close (np.ndarray): 收盘价序列，长度T
+        windows (list): 窗口列表，长度W
+
+    Returns:
+        np.ndarray: 形状为(T, W)的均线矩阵，窗口不足处为NaN
+    """
+    close = np.asarray(close, dtype='float64')
+    result = np.full((len(close), len(windows)), np.nan)
+    for j, window in enumerate(windows):
+        result[:, j] = kernels.rolling_mean(close, window)
+    return result
+
+
+def ma_crossover_positions(close, fast, slow):
+    """
+    均线交叉规则：快线在慢线之上时持有，否则空仓
+
+    Args:
+        close (np.ndarray): 收盘价序列
+        fast (int): 快线窗口
+        slow (int): 慢线窗口
+
+    Returns:
+        np.ndarray: 0/1持仓序列（t日收盘后的持仓）
+    """
+    ma = moving_averages(close, [fast, slow])
+    return (ma[:, 0] > ma[:, 1]).astype('float64')
+
+
+def margin_trigger_positions(index_dates, margin_df, threshold=0.0, column='margin_balance_change', rows=None):
+    """
+    融资融券余额变化触发规则：当日两融余额变化率超过阈值时持有，否则空仓
+
+    Args:
+        index_dates (pd.Series): 指数交易日
+        margin_df (pd.DataFrame): 融资融券数据
+        threshold (float): 变化率阈值（%）
+        column (str): 触发所用的列
+        rows (np.ndarray): 指数每个交易日在margin_df中的行号（无数据为-1，见TradingCalendar.map_rows），
+            为None时按日期查找
+
+    Returns:
+        np.ndarray: 与index_dates对齐的0/1持仓序列，无两融数据的日期为空仓
+    """
+    values = margin_df[column].to_numpy(dtype='float64')
+    if rows is None:
+        dates = index_dates.to_numpy(dtype='datetime64[ns]')
+        margin_dates = margin_df['date'].to_numpy(dtype='datetime64[ns]')
+        rows = np.searchsorted(margin_dates, dates)
+        found = rows < len(margin_dates)
+        found[found] = margin_dates[rows[found]] == dates[found]
+        rows = np.where(found, rows, -1)
+
+    positions = np.zeros(len(rows))
+    found = rows >= 0
+    positions[found] = (values[rows[found]] > threshold).astype('float64')
+    return positions
+
+
+def evaluate_positions(returns, positions, cost_bps=0.0):
+    """
+    向量化评估一组或多组持仓
+
+    t日收盘后的持仓获得t+1日的收益；每次调仓按换手量扣除交易成本
+
+    Args:
+        returns (np.ndarray): 长度为T的资产收益率
+        positions (np.ndarray): 形状为(T,)或(T, P)的持仓
+        cost_bps (float): 单边交易成本（基点）
+
+    Returns:
+        dict: strategy_returns、equity、drawdown、turnover数组（与positions形状一致）
+    """
+    returns = np.asarray(returns, dtype='float64')
+    positions = np.asarray(positions, dtype='float64')
+    if positions.ndim == 2:
+        returns = returns[:, None]
+
+    held = np.zeros_like(positions)
+    held[1:] = positions[:-1]
+    turnover = np.abs(np.diff(held, axis=0, prepend=0.0))
+
+    strategy_returns = held * returns - turnover * cost_bps / 10000
+    equity = np.cumprod(1 + strategy_returns, axis=0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+
+    return {
+        'strategy_returns': strategy_returns,
+        'equity': equity,
+        'drawdown': drawdown,
+        'turnover': turnover,
+    }
+
+
+def summarize(result):
+    """
+    汇总回测指标
+
+    Args:
+        result (dict): evaluate_positions()的返回值
+
+    Returns:
+        dict: 总收益、年化收益、年化波动、夏普比率、最大回撤、年化换手率
+            （单组持仓为标量，多组为长度P的数组）
+    """
+    strategy_returns = result['strategy_returns']
+    n = len(strategy_returns)
+    total_return = result['equity'][-1] - 1
+    annual_return = (1 + total_return) ** (TRADING_DAYS_PER_YEAR / n) - 1
+    annual_vol = strategy_returns.std(axis=0) * np.sqrt(TRADING_DAYS_PER_YEAR)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = strategy_returns.mean(axis=0) / strategy_returns.std(axis=0) * np.sqrt(TRADING_DAYS_PER_YEAR)
+    return {
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'annual_volatility': annual_vol,
+        'sharpe': np.nan_to_num(sharpe),
+        'max_drawdown': result['drawdown'].min(axis=0),
+        'annual_turnover': result['turnover'].sum(axis=0) * TRADING_DAYS_PER_YEAR / n,
+    }
+
+
+def ma_window_pairs(windows):
+    """
+    生成所有快线窗口小于慢线窗口的组合
+
+    Args:
+        windows (list): 候选窗口列表
+
+    Returns:
+        np.ndarray: 形状为(P, 2)的(快线, 慢线)组合
+    """
+    windows = np.asarray(sorted(set(windows)))
+    fast, slow = np.triu_indices(len(windows), 1)
+    return np.column_stack([windows[fast], windows[slow]])
+
+
+def _sweep_chunk(close, windows, pairs, cost_bps):
+    """
+    评估一个参数分块（在子进程中执行，需为模块级函数）
+    """
+    ma = moving_averages(close, windows)
+    column = {window: j for j, window in enumerate(windows)}
+    fast = np.array([column[w] for w in pairs[:, 0]])
+    slow = np.array([column[w] for w in pairs[:, 1]])
+
+    positions = (ma[:, fast] > ma[:, slow]).astype('float64')
+    return summarize(evaluate_positions(asset_returns(close), positions, cost_bps))
+
+
+def sweep_ma_crossover(close, windows, cost_bps=0.0, max_workers=None):
+    """
+    批量评估所有均线窗口组合
+
+    所有组合的持仓以(T, P)矩阵表示，按SWEEP_CHUNK_SIZE分块以控制内存，
+    分块在常驻进程池中并行评估
+
+    Args:
+        close (np.ndarray): 收盘价序列
+        windows (list): 候选窗口列表
+        cost_bps (float): 单边交易成本（基点）
+        max_workers (int): 并行进程数，为None时使用配置BACKTEST_WORKERS，为1时在当前进程执行
+
+    Returns:
+        pd.DataFrame: 每个组合一行，包含fast、slow及各项回测指标
+    """
+    close = np.asarray(close, dtype='float64')
+    windows = sorted(set(int(w) for w in windows))
+    pairs = ma_window_pairs(windows)
+    chunks = [pairs[i:i + SWEEP_CHUNK_SIZE] for i in range(0, len(pairs), SWEEP_CHUNK_SIZE)]
+    max_workers = max_workers or BACKTEST_WORKERS or os.cpu_count() or 1
+
+    if max_workers <= 1 or len(chunks) <= 1:
+        results = [_sweep_chunk(close, windows, chunk, cost_bps) for chunk in chunks]
+    else:
+        # 每个分块只需要用到的窗口，减少子进程的计算量
+        pool = _get_pool(max_workers)
+        futures = [
+            pool.submit(_sweep_chunk, close, sorted(set(chunk.ravel().tolist())), chunk, cost_bps)
+            for chunk in chunks
+        ]
+        try:
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            # 子进程异常退出：下次调用重建进程池，本次在当前进程完成
+            results = [_sweep_chunk(close, windows, chunk, cost_bps) for chunk in chunks]
+
+    table = pd.DataFrame(pairs, columns=['fast', 'slow'])
+    for metric in results[0] if results else []:
+        table[metric] = np.concatenate([result[metric] for result in results])
+    return table
@@ -0,0 +1,308 @@
+"""
+进程内统一缓存管理模块
+各层的内存缓存（面板数据、技术指标、预计算产物、立方体汇总、参数扫描结果、页面布局JSON等）
+都是CacheManager中的命名缓存，共用一个按字节计量的内存预算CACHE_MEMORY_BUDGET。
+
+每个条目记录估算的字节数和重新得到它的耗时（计算或从磁盘读取）。超出预算时按GreedyDual-Size淘汰：
+条目的优先级为 L + 耗时 / 字节数，其中L为上一次淘汰条目的优先级（随淘汰逐渐抬高，
+长期未访问的条目因此老化），命中时按当前L刷新；每次淘汰优先级最低的条目，
+即每释放一字节损失的重算时间最少、且最久未访问的条目。
+各缓存的占用、命中、未命中和淘汰统计见CacheManager.stats()
+"""
+
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+from config import CACHE_MEMORY_BUDGET
+
+
+def estimate_size(value):
+    """
+    估算对象占用的内存字节数（递归计入容器元素和对象属性，同一对象只计一次）
+
+    Args:
+        value: 任意对象
+
+    Returns:
+        int: 字节数
+    """
+    seen = set()
+    stack = [value]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            # 视图的数据属于其基数组
+            total += obj.nbytes if obj.base is None else sys.getsizeof(obj)
+            if obj.base is not None:
+                stack.append(obj.base)
+            if obj.dtype == object:
+                stack.extend(obj.ravel())
+        elif isinstance(obj, pd.DataFrame):
+            total += int(obj.memory_usage(index=True, deep=True).sum())
+        elif isinstance(obj, (pd.Series, pd.Index)):
+            total += int(obj.memory_usage(deep=True))
+        elif isinstance(obj, dict):
+            total += sys.getsizeof(obj)
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            total += sys.getsizeof(obj)
+            stack.extend(obj)
+        else:
+            total += sys.getsizeof(obj)
+            if hasattr(obj, '__dict__') and not isinstance(obj, type):
+                stack.append(vars(obj))
+    return total
+
+
+# get_or_compute中区分“不存在”与缓存的None
+_MISSING = object()
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'cost', 'priority', 'seq')
+
+    def __init__(self, value, size, cost):
+        self.value = value
+        self.size = size
+        self.cost = cost
+        self.priority = 0.0
+        self.seq = 0
+
+
+class Cache:
+    """
+    CacheManager中的一个命名缓存，由CacheManager.cache()创建
+
+    键为任意可哈希对象；写入的值不应再被修改（条目大小在写入时计量）
+    """
+
+    def __init__(self, manager, name, max_entries=None):
+        self.manager = manager
+        self.name = name
+        self.max_entries = max_entries
+        self.entries = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.rejected = 0
+
+    def get(self, key, default=None):
+        """
+        读取条目并刷新其优先级，不存在时返回default
+        """
+        return self.manager._get(self, key, default)
+
+    def put(self, key, value, cost=0.0, size=None):
+        """
+        写入条目，需要时先淘汰其他条目；大于整个预算的值不缓存
+
+        Args:
+            key: 键
+            value: 值
+            cost (float): 重新得到该值的耗时（秒）
+            size (int): 字节数，为None时由estimate_size估算
+        """
+        size = estimate_size(value) if size is None else int(size)
+        self.manager._put(self, key, value, max(float(cost), 0.0), max(size, 1))
+
+    def get_or_compute(self, key, compute, size=None):
+        """
+        读取条目，不存在时调用compute()计算并按实际耗时写入
+
+        Args:
+            key: 键
+            compute (callable): 无参数的计算函数
+            size (int): 字节数，为None时估算
+
+        Returns:
+            object: 缓存或新计算的值
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            start = time.perf_counter()
+            value = compute()
+            self.put(key, value, time.perf_counter() - start, size)
+        return value
+
+    def pop(self, key, default=None):
+        """
+        删除条目并返回其值
+        """
+        return self.manager._remove(self, key, default)
+
+    def retain(self, predicate):
+        """
+        只保留键满足predicate的条目（如只保留当前数据集版本的结果）
+        """
+        with self.manager._lock:
+            for key in [key for key in self.entries if not predicate(key)]:
+                self.manager._drop(self, key)
+
+    def clear(self):
+        """
+        删除全部条目
+        """
+        self.retain(lambda key: False)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'evicted_bytes': self.evicted_bytes,
+            'rejected': self.rejected,
+        }
+
+
+class CacheManager:
+    """
+    进程内的缓存管理器：所有命名缓存共用一个内存预算
+    """
+
+    def __init__(self, budget=CACHE_MEMORY_BUDGET):
+        """
+        Args:
+            budget (int): 全部缓存的总字节数上限
+        """
+        self.budget = int(budget)
+        self.size = 0
+        self._caches = {}
+        self._heap = []
+        self._clock = 0.0
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        # 后台回调在fork出的子进程中执行，fork时其他线程可能正持有锁，子进程中重建
+        os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.RLock()
+
+    def cache(self, name, max_entries=None):
+        """
+        获取（不存在时创建）命名缓存
+
+        Args:
+            name (str): 缓存名称，同名返回同一个缓存
+            max_entries (int): 该缓存的条目数上限（在内存预算之外另加的限制），为None时不限
+
+        Returns:
+            Cache: 命名缓存
+        """
+        with self._lock:
+            if name not in self._caches:
+                self._caches[name] = Cache(self, name, max_entries)
+            return self._caches[name]
+
+    def set_budget(self, budget):
+        """
+        修改内存预算，超出部分立即淘汰
+        """
+        with self._lock:
+            self.budget = int(budget)
+            self._evict_until(lambda: self.size <= self.budget)
+
+    def stats(self):
+        """
+        各缓存的占用与淘汰统计
+
+        Returns:
+            dict: budget、bytes（总占用）和caches（缓存名称到统计的映射）
+        """
+        with self._lock:
+            return {
+                'budget': self.budget,
+                'bytes': self.size,
+                'caches': {name: cache.stats() for name, cache in sorted(self._caches.items())},
+            }
+
+    def _touch(self, cache, key, entry):
+        entry.priority = self._clock + entry.cost / entry.size
+        entry.seq = next(self._seq)
+        heapq.heappush(self._heap, (entry.priority, entry.seq, cache.name, key))
+        # 命中会留下过期的堆项，过多时重建堆
+        if len(self._heap) > 4 * sum(len(c.entries) for c in self._caches.values()) + 64:
+            self._heap = [(e.priority, e.seq, c.name, k)
+                          for c in self._caches.values() for k, e in c.entries.items()]
+            heapq.heapify(self._heap)
+
+    def _get(self, cache, key, default):
+        with self._lock:
+            entry = cache.entries.get(key)
+            if entry is None:
+                cache.misses += 1
+                return default
+            cache.hits += 1
+            self._touch(cache, key, entry)
+            return entry.value
+
+    def _put(self, cache, key, value, cost, size):
+        with self._lock:
+            if key in cache.entries:
+                self._drop(cache, key)
+            if size > self.budget:
+                cache.rejected += 1
+                return
+            self._evict_until(lambda: self.size + size <= self.budget)
+            if cache.max_entries is not None:
+                while len(cache.entries) >= cache.max_entries:
+                    self._evict_from(cache)
+            entry = _Entry(value, size, cost)
+            cache.entries[key] = entry
+            cache.size += size
+            self.size += size
+            self._touch(cache, key, entry)
+
+    def _remove(self, cache, key, default):
+        with self._lock:
+            if key not in cache.entries:
+                return default
+            return self._drop(cache, key).value
+
+    def _drop(self, cache, key):
+        entry = cache.entries.pop(key)
+        cache.size -= entry.size
+        self.size -= entry.size
+        return entry
+
+    def _evict(self, cache, key):
+        entry = self._drop(cache, key)
+        # 被淘汰条目的优先级成为新的基准，其余条目相对老化
+        self._clock = max(self._clock, entry.priority)
+        cache.evictions += 1
+        cache.evicted_bytes += entry.size
+
+    def _evict_until(self, done):
+        while not done() and self._heap:
+            priority, seq, name, key = heapq.heappop(self._heap)
+            cache = self._caches[name]
+            entry = cache.entries.get(key)
+            if entry is not None and entry.seq == seq:
+                self._evict(cache, key)
+
+    def _evict_from(self, cache):
+        key = min(cache.entries, key=lambda k: (cache.entries[k].priority, cache.entries[k].seq))
+        self._evict(cache, key)
+
+
+# 进程内唯一的缓存管理器
+cache_manager = CacheManager()
@@ -0,0 +1,91 @@
+"""
+数据集目录模块
+读取config.DATASET_CATALOG中登记的数据序列，
+新增序列只需修改配置，无需改动加载、清洗和页面代码
+"""
+
+from config import DATASET_CATALOG
+
+
+def get_catalog(kind=None):
+    """
+    获取数据集目录
+    
+    Args:
+        kind (str): 数据类型（index/margin），为None时返回全部
+        
+    Returns:
+        list: 数据集记录列表（按配置顺序）
+    """
+    if kind is None:
+        return list(DATASET_CATALOG)
+    return [entry for entry in DATASET_CATALOG if entry['kind'] == kind]
+
+
+def get_dataset(symbol):
+    """
+    按标识获取数据集记录
+    
+    Args:
+        symbol (str): 数据集标识，如'sh_index'
+        
+    Returns:
+        dict: 数据集记录
+    """
+    for entry in DATASET_CATALOG:
+        if entry['symbol'] == symbol:
+            return entry
+    raise KeyError(f"Unknown dataset: {symbol}")
+
+
+def get_symbols(kind=None):
+    """
+    获取数据集标识列表
+    
+    Args:
+        kind (str): 数据类型，为None时返回全部
+        
+    Returns:
+        list: 数据集标识列表
+    """
+    return [entry['symbol'] for entry in get_catalog(kind)]
+
+
+def get_market_dataset(kind, market):
+    """
+    查找某一市场的某类数据集（如与沪市融资融券对应的上证指数）
+    
+    Args:
+        kind (str): 数据类型
+        market (str): 市场名称
+        
+    Returns:
+        str: 数据集标识，不存在时为None
+    """
+    for entry in get_catalog(kind):
+        if entry['market'] == market:
+            return entry['symbol']
+    return None
+
+
+def get_markets():
+    """
+    获取目录中出现的市场名称（按首次出现顺序）
+    
+    Returns:
+        list: 市场名称列表
+    """
+    return list(dict.fromkeys(entry['market'] for entry in DATASET_CATALOG))
+
+
+def get_dropdown_options(kind):
+    """
+    生成某类数据集的下拉框选项
+    
+    Args:
+        kind (str): 数据类型
+        
+    Returns:
+        list: dcc.Dropdown的options
+    """
+    return [{'label': entry['label'], 'value': entry['symbol']} for entry in get_catalog(kind)]
@@ -6,7 +6,25 @@
 import pandas as pd
 import numpy as np
 import os
-from .get_data import load_all_data
+import time
+import json
+import shutil
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from config import INGEST_WORKERS
+from . import kernels
+from .cache_manager import cache_manager
+from .catalog import get_catalog, get_dataset
+from .get_data import load_dataset
+from .schema import SCHEMAS, MA_WINDOWS, apply_schema, to_disk_frame, from_disk_frame
+from .snapshots import SnapshotStore
+from .store import PanelStore
+from .validation import validate_dataset, merge_reports
+
+try:
+    import psutil
+except ImportError:  # psutil为可选依赖，未安装时在POSIX上用信号0检测进程
+    psutil = None
 
 
 def clean_index_data(df, market_name='沪市'):
@@ -39,10 +57,11 @@ def clean_index_data(df, market_name='沪市'):
     df_clean['change_pct'] = df_clean['close'].pct_change() * 100
     
     # 计算移动平均线
-    df_clean['ma5'] = df_clean['close'].rolling(window=5).mean()
-    df_clean['ma10'] = df_clean['close'].rolling(window=10).mean()
-    df_clean['ma20'] = df_clean['close'].rolling(window=20).mean()
-    df_clean['ma60'] = df_clean['close'].rolling(window=60).mean()
+    close = df_clean['close'].to_numpy(dtype='float64')
+    df_clean['ma5'] = kernels.rolling_mean(close, 5)
+    df_clean['ma10'] = kernels.rolling_mean(close, 10)
+    df_clean['ma20'] = kernels.rolling_mean(close, 20)
+    df_clean['ma60'] = kernels.rolling_mean(close, 60)
     
     return df_clean
 
@@ -140,54 +159,308 @@ def clean_margin_data(df, market_name='沪市'):
     # 填充缺失值
     df_clean = df_clean.fillna(0)
     
-    # 计算融资融券余额的变化率
+    # 计算融资融券余额的变化率（前一日余额为0时变化率无意义，记为缺失，由数据校验报告记录）
     df_clean['margin_balance_change'] = df_clean['margin_balance'].pct_change() * 100
+    df_clean['margin_balance_change'] = df_clean['margin_balance_change'].replace([np.inf, -np.inf], np.nan)
     
     return df_clean
 
 
-def process_and_save_all_data():
+# 各数据类型对应的清洗函数
+CLEANERS = {
+    'index': clean_index_data,
+    'margin': clean_margin_data,
+}
+
+
+def clean_dataset(df, entry):
     """
-    处理所有数据并保存到cleaned目录
+    按数据集目录记录选择清洗函数
     
+    Args:
+        df (pd.DataFrame): 原始数据
+        entry (dict): 数据集记录（含kind和market）
+        
     Returns:
-        dict: 包含所有清洗后数据的字典
+        pd.DataFrame: 清洗后的数据
     """
-    # 加载所有原始数据
-    raw_data = load_all_data()
-    
-    # 清洗指数数据
-    sh_index_clean = clean_index_data(raw_data['sh_index'], '沪市')
-    sz_index_clean = clean_index_data(raw_data['sz_index'], '深市')
-    
-    # 清洗融资融券数据
-    sh_margin_clean = clean_margin_data(raw_data['sh_margin'], '沪市')
-    sz_margin_clean = clean_margin_data(raw_data['sz_margin'], '深市')
+    return CLEANERS[entry['kind']](df, entry['market'])
+
+
+def get_cleaned_data_path():
+    """
+    获取清洗后数据目录路径
     
-    # 获取cleaned数据目录路径
+    Returns:
+        str: cleaned数据目录的绝对路径
+    """
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(os.path.dirname(current_dir))
-    cleaned_path = os.path.join(project_root, 'data', 'cleaned')
+    return os.path.join(project_root, 'data', 'cleaned')
+
+
+def get_snapshot_store():
+    """
+    获取cleaned目录的快照集合
+    
+    Returns:
+        SnapshotStore: 快照集合
+    """
+    return SnapshotStore(get_cleaned_data_path())
+
+
+def get_cleaned_file(entry, cleaned_path=None):
+    """
+    获取数据集清洗后文件路径
+    
+    Args:
+        entry (dict): 数据集记录
+        cleaned_path (str): 清洗后数据目录，为None时使用当前发布的快照目录
+        
+    Returns:
+        str: 清洗后CSV文件的绝对路径
+    """
+    cleaned_path = cleaned_path or get_snapshot_store().path() or get_cleaned_data_path()
+    return os.path.join(cleaned_path, f"{entry['symbol']}_clean.csv")
+
+
+def get_validation_file(entry, cleaned_path=None):
+    """
+    获取数据集校验报告文件路径
+    
+    Args:
+        entry (dict): 数据集记录
+        cleaned_path (str): 清洗后数据目录，为None时使用当前发布的快照目录
+        
+    Returns:
+        str: 校验报告JSON文件的绝对路径
+    """
+    cleaned_path = cleaned_path or get_snapshot_store().path() or get_cleaned_data_path()
+    return os.path.join(cleaned_path, f"{entry['symbol']}_validation.json")
+
+
+def _dataset_files(entries):
+    """
+    数据集在快照目录中的文件名
+    """
+    return [
+        os.path.basename(get_file(entry, os.curdir))
+        for entry in entries for get_file in (get_cleaned_file, get_validation_file)
+    ]
+
+
+def load_validation_report(entry, cleaned_path=None):
+    """
+    读取数据集的校验报告
+    
+    Args:
+        entry (dict): 数据集记录
+        cleaned_path (str): 清洗后数据目录，为None时使用当前发布的快照目录
+        
+    Returns:
+        dict: 校验报告（见src.utils.validation），文件不存在时为None
+    """
+    path = get_validation_file(entry, cleaned_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_validation_report(report, entry, cleaned_path=None):
+    with open(get_validation_file(entry, cleaned_path), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+
+def _clean_and_cast(df, entry):
+    """
+    清洗单个数据集并转换为紧凑类型（在子进程中执行，需为模块级函数）
+    
+    Args:
+        df (pd.DataFrame): 原始数据
+        entry (dict): 数据集记录
+        
+    Returns:
+        pd.DataFrame: 清洗后的数据
+    """
+    return apply_schema(clean_dataset(df, entry), SCHEMAS[entry['kind']])
+
+
+def _clean_cast_and_validate(df, entry):
+    """
+    清洗单个数据集、转换为紧凑类型并校验（在子进程中执行，需为模块级函数）
+    
+    Returns:
+        tuple: (清洗后的数据, 校验报告)
+    """
+    df_clean = _clean_and_cast(df, entry)
+    return df_clean, validate_dataset(df_clean, entry['kind'])
+
+
+def _save_cleaned(df_clean, report, entry, cleaned_path):
+    """
+    保存单个清洗后的数据集（磁盘格式不含可重算的ma列，市场以代码存储）及其校验报告
+    
+    Args:
+        df_clean (pd.DataFrame): 清洗后的数据
+        report (dict): 校验报告
+        entry (dict): 数据集记录
+        cleaned_path (str): 清洗后数据目录
+    """
+    to_disk_frame(df_clean).to_csv(get_cleaned_file(entry, cleaned_path), index=False, encoding='utf-8')
+    _save_validation_report(report, entry, cleaned_path)
+
+
+def ingest_datasets(entries, cleaned_path=None, max_workers=None):
+    """
+    加载、清洗并保存一组数据集
+    
+    各数据集相互独立：文件读写在线程池中进行，清洗在进程池中进行，
+    每个数据集读完即提交清洗、洗完即提交写入。结果按entries顺序返回，
+    且每个数据集写入各自的文件，因此输出与执行顺序无关
+    
+    未指定目录时写入新快照：其余数据集的文件从当前版本带入，全部写完后才发布，
+    调用方需持有ingest_lock
+    
+    Args:
+        entries (list): 数据集记录列表
+        cleaned_path (str): 清洗后数据目录，为None时发布为cleaned目录的新快照
+        max_workers (int): 并行进程/线程数，为None时使用配置INGEST_WORKERS，
+            为1时按顺序执行
+        
+    Returns:
+        dict: 数据集标识到清洗后数据的映射
+    """
+    if cleaned_path is None:
+        with get_snapshot_store().writer(exclude=_dataset_files(entries)) as staging:
+            return _ingest_into(entries, staging, max_workers)
     
     # 确保目录存在
     os.makedirs(cleaned_path, exist_ok=True)
+    return _ingest_into(entries, cleaned_path, max_workers)
+
+
+def _ingest_into(entries, cleaned_path, max_workers=None):
+    """
+    加载、清洗一组数据集并写入给定目录（见ingest_datasets）
+    """
+    max_workers = max_workers or INGEST_WORKERS or os.cpu_count() or 1
+    
+    # 单进程模式：按顺序执行，避免进程池开销
+    if max_workers <= 1 or len(entries) <= 1:
+        cleaned = {}
+        for entry in entries:
+            df_clean, report = _clean_cast_and_validate(load_dataset(entry), entry)
+            _save_cleaned(df_clean, report, entry, cleaned_path)
+            cleaned[entry['symbol']] = df_clean
+        return cleaned
+    
+    cleaned = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as io_pool, \
+            ProcessPoolExecutor(max_workers=max_workers) as cpu_pool:
+        # 读取原始文件
+        read_futures = {io_pool.submit(load_dataset, entry): entry for entry in entries}
+        
+        # 读完一个即提交清洗
+        clean_futures = {}
+        for future in as_completed(read_futures):
+            entry = read_futures[future]
+            clean_futures[cpu_pool.submit(_clean_cast_and_validate, future.result(), entry)] = entry
+        
+        # 洗完一个即提交写入
+        write_futures = []
+        for future in as_completed(clean_futures):
+            entry = clean_futures[future]
+            cleaned[entry['symbol']], report = future.result()
+            write_futures.append(io_pool.submit(_save_cleaned, cleaned[entry['symbol']], report, entry, cleaned_path))
+        
+        for future in write_futures:
+            future.result()
+    
+    # 按目录顺序返回，保证结果确定
+    return {entry['symbol']: cleaned[entry['symbol']] for entry in entries}
+
+
+def process_and_save_all_data(max_workers=None):
+    """
+    处理目录中登记的所有数据，并作为新快照发布到cleaned目录
+    
+    Args:
+        max_workers (int): 并行进程/线程数，为None时使用配置INGEST_WORKERS
+        
+    Returns:
+        dict: 数据集标识到清洗后数据的映射
+    """
+    with ingest_lock():
+        return ingest_datasets(get_catalog(), max_workers=max_workers)
+
+
+# 已加载的面板数据，按快照版本号缓存（只保留当前版本；内存不足被淘汰时重新读取快照）
+_store_cache = cache_manager.cache('panel_store')
+
+
+def _read_snapshot(snapshot_path):
+    """
+    读取快照目录中的全部数据集
+    
+    Args:
+        snapshot_path (str): 快照目录
+        
+    Returns:
+        dict: 数据集标识到清洗后数据的映射
+    """
+    tables = {}
+    for entry in get_catalog():
+        df = pd.read_csv(get_cleaned_file(entry, snapshot_path))
+        # 转换日期列并应用紧凑类型
+        tables[entry['symbol']] = from_disk_frame(df, SCHEMAS[entry['kind']])
+    return tables
+
+
+def load_panel_store():
+    """
+    加载当前发布的快照的面板存储，版本未变化时直接复用内存中的结果
     
-    # 保存清洗后的数据
-    sh_index_clean.to_csv(os.path.join(cleaned_path, 'sh_index_clean.csv'), 
-                          index=False, encoding='utf-8')
-    sz_index_clean.to_csv(os.path.join(cleaned_path, 'sz_index_clean.csv'), 
-                          index=False, encoding='utf-8')
-    sh_margin_clean.to_csv(os.path.join(cleaned_path, 'sh_margin_clean.csv'), 
-                           index=False, encoding='utf-8')
-    sz_margin_clean.to_csv(os.path.join(cleaned_path, 'sz_margin_clean.csv'), 
-                           index=False, encoding='utf-8')
+    读取时只读一次指针文件，之后固定读取该版本的快照目录，与写入方并发也无需加锁
     
-    return {
-        'sh_index': sh_index_clean,
-        'sz_index': sz_index_clean,
-        'sh_margin': sh_margin_clean,
-        'sz_margin': sz_margin_clean
-    }
+    Returns:
+        PanelStore: 面板数据存储（version属性为快照版本号）
+    """
+    snapshots = get_snapshot_store()
+    version = snapshots.current()
+    
+    # 尚未发布任何快照时先处理并保存
+    if version is None:
+        process_and_save_all_data()
+        version = snapshots.current()
+    
+    store = _store_cache.get(version)
+    if store is None:
+        start = time.perf_counter()
+        try:
+            tables = _read_snapshot(snapshots.path(version))
+        except FileNotFoundError:
+            # 读取期间该版本已被清理，或目录中新增了快照里没有的数据集：
+            # 指针未变时全量处理一次，再读取最新版本
+            if snapshots.current() == version:
+                process_and_save_all_data()
+            version = snapshots.current()
+            tables = _read_snapshot(snapshots.path(version))
+        store = PanelStore(tables, version=version)
+        _store_cache.clear()
+        _store_cache.put(version, store, cost=time.perf_counter() - start)
+    
+    return store
+
+
+def get_dataset_version():
+    """
+    获取当前清洗后数据的版本号（由快照内容计算，内容任一变化都会产生新版本）
+    
+    Returns:
+        str: 数据集版本号
+    """
+    return load_panel_store().version
 
 
 def load_cleaned_data():
@@ -195,32 +468,191 @@ def load_cleaned_data():
     从cleaned目录加载已清洗的数据
     
     Returns:
-        dict: 包含所有清洗后数据的字典
+        dict: 数据集标识到清洗后数据的映射
     """
-    # 获取cleaned数据目录路径
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(os.path.dirname(current_dir))
-    cleaned_path = os.path.join(project_root, 'data', 'cleaned')
-    
-    # 检查文件是否存在，如果不存在则处理并保存
-    if not os.path.exists(os.path.join(cleaned_path, 'sh_index_clean.csv')):
-        return process_and_save_all_data()
-    
-    # 加载清洗后的数据
-    sh_index = pd.read_csv(os.path.join(cleaned_path, 'sh_index_clean.csv'))
-    sz_index = pd.read_csv(os.path.join(cleaned_path, 'sz_index_clean.csv'))
-    sh_margin = pd.read_csv(os.path.join(cleaned_path, 'sh_margin_clean.csv'))
-    sz_margin = pd.read_csv(os.path.join(cleaned_path, 'sz_margin_clean.csv'))
-    
-    # 转换日期列
-    sh_index['date'] = pd.to_datetime(sh_index['date'])
-    sz_index['date'] = pd.to_datetime(sz_index['date'])
-    sh_margin['date'] = pd.to_datetime(sh_margin['date'])
-    sz_margin['date'] = pd.to_datetime(sz_margin['date'])
-    
-    return {
-        'sh_index': sh_index,
-        'sz_index': sz_index,
-        'sh_margin': sh_margin,
-        'sz_margin': sz_margin
-    }
+    return load_panel_store().to_dict()
+
+
+# 增量追加时带入的已清洗行数（覆盖最长均线窗口，以及涨跌幅所需的前一行）
+APPEND_CONTEXT_ROWS = max(MA_WINDOWS)
+
+# 等待写锁的最长时间（秒）；锁文件尚未写入PID时，超过该时间也视为持有者已退出
+INGEST_LOCK_TIMEOUT = 60
+
+
+def _pid_alive(pid):
+    """
+    判断本机上的进程是否仍在运行
+    
+    Args:
+        pid (int): 进程ID
+    
+    Returns:
+        bool: 进程存在时为True
+    """
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == 'nt':
+        # Windows上os.kill会终止目标进程，无法用于检测，保守地视为仍在运行
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _lock_owner(lock_path):
+    """
+    读取锁文件中持有者的PID
+    
+    Returns:
+        int: PID；锁文件不存在时为None，尚未写入PID时为0
+    """
+    try:
+        with open(lock_path, 'rb') as f:
+            content = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return int(content) if content.isdigit() else 0
+
+
+def _lock_stale(lock_path, owner, timeout):
+    """
+    锁是否可以打破：记录的持有者进程已退出，
+    或创建后超过timeout仍未写入PID（持有者在写入前退出）
+    """
+    if owner:
+        return owner != os.getpid() and not _pid_alive(owner)
+    try:
+        return time.time() - os.path.getmtime(lock_path) > timeout
+    except FileNotFoundError:
+        return False
+
+
+@contextmanager
+def ingest_lock(timeout=INGEST_LOCK_TIMEOUT):
+    """
+    跨进程的cleaned目录写锁（以独占创建锁文件实现，不依赖平台相关的文件锁）
+    
+    只在写入方之间互斥：多个进程（如多个服务进程）同时监测原始数据时，
+    保证同一批新增行只被追加一次。读取方固定读取已发布的快照，不需要此锁。
+    锁文件中记录持有者的PID，只有该进程已退出时才打破锁，
+    持有者仍在运行时无论持有多久都继续等待
+    
+    Args:
+        timeout (float): 等待锁的最长时间（秒）
+    
+    Raises:
+        TimeoutError: 超时仍未获得锁
+    """
+    lock_path = os.path.join(get_cleaned_data_path(), '.ingest.lock')
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    pid = os.getpid()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            owner = _lock_owner(lock_path)
+            if owner is None:
+                continue
+            # 删除前再次确认持有者未变，避免删掉其他等待者刚打破旧锁后创建的新锁
+            if _lock_stale(lock_path, owner, timeout) and _lock_owner(lock_path) == owner:
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for {lock_path} (held by pid {owner or 'unknown'})")
+            time.sleep(0.05)
+    try:
+        os.write(fd, str(pid).encode('ascii'))
+        os.close(fd)
+        yield
+    finally:
+        # 只删除自己持有的锁
+        if _lock_owner(lock_path) == pid:
+            os.remove(lock_path)
+
+
+def _raw_context(df_clean, columns, rows=APPEND_CONTEXT_ROWS):
+    """
+    将已清洗数据的末尾若干行还原为原始文件格式，作为增量清洗的上下文
+    
+    Args:
+        df_clean (pd.DataFrame): 已清洗数据
+        columns (list): 原始文件的列
+        rows (int): 行数
+        
+    Returns:
+        pd.DataFrame: 原始格式的数据
+    """
+    context = df_clean.iloc[-rows:][list(columns)].copy()
+    context['date'] = context['date'].dt.strftime('%Y%m%d').astype('int64')
+    return context
+
+
+def append_datasets(new_rows):
+    """
+    将原始数据的新增行增量清洗后追加到清洗后数据，并直接更新内存中的面板存储
+    
+    新增行与已清洗数据末尾的APPEND_CONTEXT_ROWS行一起清洗，涨跌幅、均线等
+    与全量清洗结果一致（上下文中的价格为无损的float64）；日期不晚于已有数据的行被忽略，重复追加不会产生重复数据。
+    追加结果发布为新快照，数据集版本随之更新
+    
+    Args:
+        new_rows (dict): 数据集标识到原始格式新增行的映射
+        
+    Returns:
+        dict: 数据集标识到实际追加的清洗后数据的映射（无新数据的数据集不包含在内）
+    """
+    with ingest_lock():
+        start = time.perf_counter()
+        # 在锁内读取，其他进程已追加的数据也包含在内
+        store = load_panel_store()
+        tables = store.to_dict()
+        appended = {}
+        reports = {}
+        
+        for symbol, raw in new_rows.items():
+            entry = get_dataset(symbol)
+            current = tables[symbol]
+            raw_dates = pd.to_datetime(raw['date'].astype(str), format='%Y%m%d')
+            raw = raw[(raw_dates > current['date'].iloc[-1]).to_numpy()]
+            if raw.empty:
+                continue
+            
+            context = _raw_context(current, raw.columns)
+            cleaned = _clean_and_cast(pd.concat([context, raw], ignore_index=True), entry)
+            rows = cleaned.iloc[len(context):].reset_index(drop=True)
+            # 只校验新增行，上下文行用于相邻比较
+            reports[symbol] = validate_dataset(cleaned, entry['kind'], start=len(context))
+            tables[symbol] = pd.concat([current, rows[current.columns]], ignore_index=True)
+            appended[symbol] = rows
+        
+        if appended:
+            # 已发布的快照不可修改：变化的数据集复制到新快照后再追加，其余文件直接带入
+            snapshots = get_snapshot_store()
+            base_path = snapshots.path(store.version)
+            entries = [get_dataset(symbol) for symbol in appended]
+            with snapshots.writer(base=store.version, exclude=_dataset_files(entries)) as staging:
+                for entry in entries:
+                    symbol = entry['symbol']
+                    cleaned_file = get_cleaned_file(entry, staging)
+                    shutil.copyfile(get_cleaned_file(entry, base_path), cleaned_file)
+                    to_disk_frame(appended[symbol]).to_csv(
+                        cleaned_file, mode='a', header=False, index=False, encoding='utf-8'
+                    )
+                    report = merge_reports(load_validation_report(entry, base_path), reports[symbol])
+                    _save_validation_report(report, entry, staging)
+            version = snapshots.current()
+            store = PanelStore(tables, version=version)
+            _store_cache.clear()
+            _store_cache.put(version, store, cost=time.perf_counter() - start)
+    
+    return appended
@@ -0,0 +1,311 @@
+"""
+相关性计算引擎
+将k个序列一次性对齐为二维NumPy数组（行为日期，列为序列），
+并用批量矩阵运算计算全样本、滚动、指数加权和领先/滞后相关系数矩阵。
+缺失值按成对完整（pairwise-complete）处理：每一对序列只使用两者都有数据的日期
+"""
+
+import numpy as np
+import pandas as pd
+from . import kernels
+
+
+def align_series(series, column='close', how='outer'):
+    """
+    将多个序列按日期对齐为二维数组
+
+    Args:
+        series (dict | list): 序列名称到DataFrame（含date列）的映射，或(名称, DataFrame)列表；
+            列表中名称可以重复（如同一序列与自身比较），按位置各占一列
+        column (str): 取值列，如'close'或'change_pct'
+        how (str): 'outer'保留任一序列有数据的日期，'inner'只保留所有序列都有数据的日期
+
+    Returns:
+        tuple: (日期数组, 序列名称列表, 形状为(日期数, 序列数)的float64数组，缺失为NaN)
+    """
+    pairs = list(series.items()) if isinstance(series, dict) else list(series)
+    names = [name for name, _ in pairs]
+    date_arrays = [df['date'].to_numpy(dtype='datetime64[ns]') for _, df in pairs]
+    dates = np.unique(np.concatenate(date_arrays))
+
+    values = np.full((len(dates), len(names)), np.nan)
+    for j, (_, df) in enumerate(pairs):
+        positions = np.searchsorted(dates, date_arrays[j])
+        values[positions, j] = df[column].to_numpy(dtype='float64')
+
+    if how == 'inner':
+        keep = ~np.isnan(values).any(axis=1)
+        dates, values = dates[keep], values[keep]
+
+    return dates, names, values
+
+
+def _masked(values):
+    """
+    拆分为有效值掩码和缺失置零的数值（均为float64）
+    """
+    mask = ~np.isnan(values)
+    return mask.astype('float64'), np.where(mask, values, 0.0)
+
+
+def corr_matrix(a, b=None, weights=None, min_periods=2):
+    """
+    成对完整的相关系数矩阵，可选样本权重
+
+    result[i, j]为a的第i列与b的第j列在两者都有数据的日期上的皮尔逊相关系数
+
+    Args:
+        a (np.ndarray): 形状为(T, k)的数组
+        b (np.ndarray): 形状为(T, m)的数组，为None时取a
+        weights (np.ndarray): 长度为T的样本权重，为None时等权
+        min_periods (int): 最少共同样本数，不足时结果为NaN
+
+    Returns:
+        np.ndarray: 形状为(k, m)的相关系数矩阵
+    """
+    if b is None:
+        b = a
+    # 先按列去均值，减小价格水平较高时的数值误差（相关系数不受平移影响）
+    a = a - np.nanmean(a, axis=0)
+    b = b - np.nanmean(b, axis=0)
+
+    mask_a, za = _masked(a)
+    mask_b, zb = _masked(b)
+    counts = mask_a.T @ mask_b
+
+    w = np.ones(len(a)) if weights is None else np.asarray(weights, dtype='float64')
+    wa_mask, wa = mask_a * w[:, None], za * w[:, None]
+
+    n = wa_mask.T @ mask_b
+    sum_a = wa.T @ mask_b
+    sum_b = wa_mask.T @ zb
+    sum_aa = (wa * za).T @ mask_b
+    sum_bb = wa_mask.T @ (zb * zb)
+    sum_ab = wa.T @ zb
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_a = sum_a / n
+        mean_b = sum_b / n
+        cov = sum_ab / n - mean_a * mean_b
+        var_a = sum_aa / n - mean_a ** 2
+        var_b = sum_bb / n - mean_b ** 2
+        result = cov / np.sqrt(var_a * var_b)
+
+    result[counts < min_periods] = np.nan
+    return np.clip(result, -1.0, 1.0)
+
+
+def lagged_corr_matrices(values, lags, min_periods=2):
+    """
+    领先/滞后相关系数矩阵
+
+    result[l, i, j]为序列i在t日与序列j在t+lags[l]日的相关系数，
+    即正滞后表示序列i领先序列j
+
+    Args:
+        values (np.ndarray): 形状为(T, k)的对齐数组
+        lags (list): 滞后天数列表（可为负数）
+        min_periods (int): 最少共同样本数
+
+    Returns:
+        np.ndarray: 形状为(len(lags), k, k)的数组
+    """
+    k = values.shape[1]
+    result = np.full((len(lags), k, k), np.nan)
+    for idx, lag in enumerate(lags):
+        if abs(lag) >= len(values):
+            continue
+        if lag >= 0:
+            leading, lagging = values[:len(values) - lag], values[lag:]
+        else:
+            leading, lagging = values[-lag:], values[:len(values) + lag]
+        result[idx] = corr_matrix(leading, lagging, min_periods=min_periods)
+    return result
+
+
+def _fft_length(n):
+    """
+    不小于n的2的幂，作为FFT长度
+    """
+    return 1 << max(int(n) - 1, 0).bit_length()
+
+
+def cross_correlation(x, y, max_lag, min_periods=2):
+    """
+    基于FFT的领先/滞后相关系数
+
+    result[l]为x在t日与y在t+lags[l]日的相关系数（正滞后表示x领先y），与lagged_corr_matrices
+    的逐滞后计算结果一致。缺失值按成对完整处理：每个滞后的样本数、和、平方和、乘积和
+    都写成掩码与取值序列的互相关，用一次FFT对所有滞后同时求出，整体为O(T·log T)
+
+    Args:
+        x (np.ndarray): 长度为T的序列（缺失为NaN）
+        y (np.ndarray): 长度为T的序列，与x按日期对齐
+        max_lag (int): 最大滞后天数，计算-max_lag到max_lag的全部滞后
+        min_periods (int): 最少共同样本数，不足时结果为NaN
+
+    Returns:
+        tuple: (滞后数组, 相关系数数组, 共同样本数数组)
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    n = len(x)
+    max_lag = int(min(max_lag, max(n - 1, 0)))
+    lags = np.arange(-max_lag, max_lag + 1)
+    if n == 0:
+        return lags, np.full(len(lags), np.nan), np.zeros(len(lags), dtype='int64')
+
+    # 先去均值，减小数值误差（相关系数不受平移影响）
+    mask_x, zx = _masked(x - np.nanmean(x))
+    mask_y, zy = _masked(y - np.nanmean(y))
+
+    # c[k] = sum_t a[t] * b[t + k]，补零到足够长度避免循环卷积的回绕
+    length = _fft_length(n + max_lag)
+    fx = np.fft.rfft(np.stack([mask_x, zx, zx * zx]), length)
+    fy = np.fft.rfft(np.stack([mask_y, zy, zy * zy]), length)
+    pairs = np.stack([
+        np.conj(fx[0]) * fy[0],  # 样本数
+        np.conj(fx[1]) * fy[0],  # x之和
+        np.conj(fx[0]) * fy[1],  # y之和
+        np.conj(fx[2]) * fy[0],  # x平方和
+        np.conj(fx[0]) * fy[2],  # y平方和
+        np.conj(fx[1]) * fy[1],  # 乘积和
+    ])
+    full = np.fft.irfft(pairs, length)
+    sums = full[:, lags % length]
+    counts = np.rint(sums[0])
+    sx, sy, sxx, syy, sxy = sums[1:]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / counts
+        var_x = sxx - sx * sx / counts
+        var_y = syy - sy * sy / counts
+        result = cov / np.sqrt(var_x * var_y)
+
+    result[counts < min_periods] = np.nan
+    return lags, np.clip(result, -1.0, 1.0), counts.astype('int64')
+
+
+def rolling_lagged_corr(x, y, lag, window, min_periods=None):
+    """
+    指定滞后下的滚动相关系数：x在t-lag日与y在t日的相关系数，按y的日期对齐
+
+    Args:
+        x (np.ndarray): 长度为T的序列
+        y (np.ndarray): 长度为T的序列，与x按日期对齐
+        lag (int): 滞后天数，正数表示x领先y
+        window (int): 滚动窗口大小（行数）
+        min_periods (int): 窗口内最少共同样本数，为None时等于window
+
+    Returns:
+        np.ndarray: 长度为T的滚动相关系数，无法配对或样本不足的位置为NaN
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    shifted = np.full(len(x), np.nan)
+    if lag >= 0:
+        shifted[lag:] = x[:len(x) - lag]
+    else:
+        shifted[:lag] = x[-lag:]
+    return rolling_corr(np.column_stack([shifted, y]), window, min_periods=min_periods)[:, 0]
+
+
+def _pair_indices(k, pairs):
+    """
+    将序列对转换为两个下标数组，pairs为None时取全部上三角序列对
+    """
+    if pairs is None:
+        return np.triu_indices(k, 1)
+    pairs = np.asarray(pairs, dtype=int).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _pair_moments(values, pairs):
+    """
+    计算各序列对的成对掩码、去均值数值及其乘积，形状均为(T, P)
+    """
+    i, j = _pair_indices(values.shape[1], pairs)
+    centered = values - np.nanmean(values, axis=0)
+    mask, z = _masked(centered)
+    both = mask[:, i] * mask[:, j]
+    x = z[:, i] * both
+    y = z[:, j] * both
+    return both, x, y, x * x, y * y, x * y
+
+
+def rolling_corr(values, window, pairs=None, min_periods=None):
+    """
+    滚动相关系数（所有序列对一次性计算）
+
+    每个窗口内的成对统计量由kernels.rolling_corr滑动更新，整体为O(T·P)
+
+    Args:
+        values (np.ndarray): 形状为(T, k)的对齐数组
+        window (int): 滚动窗口大小（行数）
+        pairs (list): 序列对列表[(i, j), ...]，为None时取全部上三角序列对
+        min_periods (int): 窗口内最少共同样本数，为None时等于window
+
+    Returns:
+        np.ndarray: 形状为(T, P)的滚动相关系数，不足min_periods的位置为NaN
+    """
+    min_periods = window if min_periods is None else min_periods
+    i, j = _pair_indices(values.shape[1], pairs)
+    centered = values - np.nanmean(values, axis=0)
+    return kernels.rolling_corr(centered, i, j, window, min_periods)
+
+
+def ewm_corr(values, span, pairs=None, min_periods=2):
+    """
+    指数加权相关系数（所有序列对一次性计算）
+
+    Args:
+        values (np.ndarray): 形状为(T, k)的对齐数组
+        span (int): 指数加权跨度
+        pairs (list): 序列对列表，为None时取全部上三角序列对
+        min_periods (int): 最少共同样本数
+
+    Returns:
+        np.ndarray: 形状为(T, P)的指数加权相关系数
+    """
+    both, x, y, xx, yy, xy = _pair_moments(values, pairs)
+    p = both.shape[1]
+
+    # 缺失位置置为NaN后在一张宽表上统一做指数加权平均
+    stacked = np.concatenate([x, y, xx, yy, xy], axis=1)
+    stacked[np.tile(both, 5) == 0] = np.nan
+    averaged = pd.DataFrame(stacked).ewm(span=span, ignore_na=True).mean().to_numpy()
+    mx, my, mxx, myy, mxy = (averaged[:, s * p:(s + 1) * p] for s in range(5))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = (mxy - mx * my) / np.sqrt((mxx - mx * mx) * (myy - my * my))
+
+    result[np.cumsum(both, axis=0) < min_periods] = np.nan
+    return np.clip(result, -1.0, 1.0)
+
+
+def correlation_matrix(values, method='full', window=60, lag=0, min_periods=2):
+    """
+    按指定方法计算截至最新日期的相关系数矩阵
+
+    Args:
+        values (np.ndarray): 形状为(T, k)的对齐数组
+        method (str): 'full'全样本，'rolling'最近window行，'ewm'跨度为window的指数加权
+        window (int): 滚动窗口大小或指数加权跨度
+        lag (int): 滞后天数，正数表示行序列领先列序列
+        min_periods (int): 最少共同样本数
+
+    Returns:
+        np.ndarray: 形状为(k, k)的相关系数矩阵
+    """
+    if lag:
+        leading, lagging = (values[:-lag], values[lag:]) if lag > 0 else (values[-lag:], values[:lag])
+    else:
+        leading, lagging = values, values
+
+    if method == 'rolling':
+        return corr_matrix(leading[-window:], lagging[-window:], min_periods=min_periods)
+    if method == 'ewm':
+        alpha = 2.0 / (window + 1.0)
+        weights = (1.0 - alpha) ** np.arange(len(leading) - 1, -1, -1)
+        return corr_matrix(leading, lagging, weights=weights, min_periods=min_periods)
+    return corr_matrix(leading, lagging, min_periods=min_periods)
@@ -0,0 +1,230 @@
+"""
+融资融券多维汇总模块（OLAP立方体）
+维度为 市场 × 年 × 季度 × 月 × 周，度量为各余额/金额列的 mean/sum/last/min/max。
+
+立方体在每个数据集版本上只构建一次：先把逐日数据按(市场, 月, 周)切成最细粒度的基础单元，
+每个单元用reduceat一次性求出各列的和、行数、最小值、最大值和最后值；
+年/季/月/周的汇总再由基础单元逐级合并。热力图等分组统计只需对立方体切片，不再扫描逐日数据
+"""
+
+import numpy as np
+import pandas as pd
+from .cache_manager import cache_manager
+
+
+# 汇总粒度（由粗到细）
+GRAINS = ('year', 'quarter', 'month', 'week')
+
+# 支持的统计量
+STATISTICS = ('mean', 'sum', 'last', 'min', 'max')
+
+# 参与汇总的余额/金额列（余额变化率为比率，不参与加总）
+CUBE_COLUMNS = (
+    'margin_balance',
+    'financing_balance',
+    'financing_purchase',
+    'financing_redeem',
+    'securities_lending_balance',
+    'securities_lending_sell',
+    'securities_lending_shares',
+)
+
+# 各粒度在一年内的最大周期数（周以周一开始，跨年的周按年份拆开，一年最多54个周片段）
+PERIODS_PER_YEAR = {'quarter': 4, 'month': 12, 'week': 54}
+
+
+def _run_starts(*keys):
+    """
+    各键数组组成的复合键在相邻行之间发生变化的位置（第一行总是起点）
+    """
+    n = len(keys[0])
+    change = np.zeros(n, dtype=bool)
+    if n:
+        change[0] = True
+        for key in keys:
+            change[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(change)
+
+
+# 各粒度的汇总单元：(版本, 粒度) -> 与cells结构相同的字典
+_rollups = cache_manager.cache('cube_rollups')
+
+
+class MarginCube:
+    """
+    融资融券数据的预聚合立方体
+
+    基础单元按市场、日期排序；cells中保存每个单元的维度编码（symbol为市场序号，
+    year/quarter/month/week为年份和年内序号）、最后交易日和各度量的分量
+    """
+
+    def __init__(self, store):
+        """
+        Args:
+            store (PanelStore): 面板数据存储
+        """
+        self.version = store.version
+        self.symbols = store.symbols('margin')
+        panel = store.panels.get('margin')
+        self.columns = [column for column in CUBE_COLUMNS if panel is not None and column in panel.columns]
+
+        ranges = [store.offsets[symbol] for symbol in self.symbols]
+        rows = np.concatenate([np.arange(start, stop) for start, stop in ranges]) if ranges else np.empty(0, dtype='int64')
+        symbol_codes = np.repeat(np.arange(len(ranges), dtype='int32'), [stop - start for start, stop in ranges])
+        if panel is not None:
+            dates = panel['date'].to_numpy()[rows].astype('datetime64[D]')
+            values = panel[self.columns].to_numpy(dtype='float64')[rows]
+        else:
+            dates = np.empty(0, dtype='datetime64[D]')
+            values = np.empty((0, 0))
+
+        days = dates.astype('int64')
+        months = dates.astype('datetime64[M]').astype('int64')
+        # 1970-01-01为周四，偏移3天后整除7得到以周一开始的周序号
+        weeks = (days + 3) // 7
+        years = months // 12 + 1970
+        year_first_week = (dates.astype('datetime64[Y]').astype('datetime64[D]').astype('int64') + 3) // 7
+
+        starts = _run_starts(symbol_codes, months, weeks)
+        ends = np.append(starts[1:], len(days)) - 1
+        month_of_year = months[starts] % 12 + 1
+        self.cells = {
+            'symbol': symbol_codes[starts],
+            'year': years[starts],
+            'quarter': (month_of_year - 1) // 3 + 1,
+            'month': month_of_year,
+            'week': weeks[starts] - year_first_week[starts] + 1,
+            'date': dates[ends],
+            'count': np.diff(np.append(starts, len(days))),
+        }
+        if len(starts):
+            self.cells['sum'] = np.add.reduceat(values, starts, axis=0)
+            self.cells['min'] = np.minimum.reduceat(values, starts, axis=0)
+            self.cells['max'] = np.maximum.reduceat(values, starts, axis=0)
+        else:
+            self.cells['sum'] = self.cells['min'] = self.cells['max'] = np.empty((0, len(self.columns)))
+        self.cells['last'] = values[ends]
+
+    def __len__(self):
+        return len(self.cells['count'])
+
+    def _group_codes(self, grain):
+        """
+        基础单元在给定粒度下的分组编码（同一市场内随时间单调不减）
+        """
+        cells = self.cells
+        if grain == 'year':
+            return cells['year']
+        if grain == 'quarter':
+            return cells['year'] * 4 + cells['quarter']
+        if grain == 'month':
+            return cells['year'] * 12 + cells['month']
+        if grain == 'week':
+            return cells['year'] * (PERIODS_PER_YEAR['week'] + 1) + cells['week']
+        raise ValueError(f"Unknown grain: {grain}")
+
+    def rollup(self, grain):
+        """
+        把基础单元合并到给定粒度
+
+        Args:
+            grain (str): 'year'、'quarter'、'month'或'week'
+
+        Returns:
+            dict: 与cells结构相同的汇总单元
+        """
+        def roll():
+            cells = self.cells
+            starts = _run_starts(cells['symbol'], self._group_codes(grain))
+            ends = np.append(starts[1:], len(self)) - 1
+            rolled = {name: cells[name][starts] for name in ('symbol', 'year', 'quarter', 'month', 'week')}
+            rolled['date'] = cells['date'][ends]
+            rolled['last'] = cells['last'][ends]
+            if len(starts):
+                rolled['count'] = np.add.reduceat(cells['count'], starts)
+                rolled['sum'] = np.add.reduceat(cells['sum'], starts, axis=0)
+                rolled['min'] = np.minimum.reduceat(cells['min'], starts, axis=0)
+                rolled['max'] = np.maximum.reduceat(cells['max'], starts, axis=0)
+            else:
+                rolled['count'] = cells['count'][:0]
+                rolled['sum'], rolled['min'], rolled['max'] = cells['sum'], cells['min'], cells['max']
+            return rolled
+
+        # 汇总结果按(版本, 粒度)缓存，内存不足被淘汰时重新合并
+        _rollups.retain(lambda key: key[0] == self.version)
+        return _rollups.get_or_compute((self.version, grain), roll)
+
+    def _statistic(self, rolled, statistic):
+        """
+        汇总单元上的统计量矩阵，形状为(单元数, 列数)
+        """
+        if statistic == 'mean':
+            return rolled['sum'] / rolled['count'][:, None]
+        if statistic in ('sum', 'last', 'min', 'max'):
+            return rolled[statistic]
+        raise ValueError(f"Unknown statistic: {statistic}")
+
+    def aggregate(self, grain, statistic='mean', columns=None, symbols=None):
+        """
+        按粒度汇总的统计表
+
+        Args:
+            grain (str): 'year'、'quarter'、'month'或'week'
+            statistic (str): 'mean'、'sum'、'last'、'min'或'max'
+            columns (list): 度量列，为None时全部
+            symbols (list): 市场标识，为None时全部
+
+        Returns:
+            pd.DataFrame: 包含symbol、year、period（年内序号，年粒度无此列）、date（周期内最后交易日）和各度量列
+        """
+        rolled = self.rollup(grain)
+        columns = self.columns if columns is None else list(columns)
+        matrix = self._statistic(rolled, statistic)[:, [self.columns.index(column) for column in columns]]
+
+        mask = np.ones(len(rolled['symbol']), dtype=bool)
+        if symbols is not None:
+            mask = np.isin(rolled['symbol'], [self.symbols.index(symbol) for symbol in symbols])
+
+        result = {
+            'symbol': pd.Categorical.from_codes(rolled['symbol'][mask], self.symbols),
+            'year': rolled['year'][mask],
+        }
+        if grain != 'year':
+            result['period'] = rolled[grain][mask]
+        result['date'] = rolled['date'][mask].astype('datetime64[ns]')
+        for j, column in enumerate(columns):
+            result[column] = matrix[mask, j]
+        return pd.DataFrame(result)
+
+    def pivot(self, symbol, column='margin_balance', statistic='mean', grain='month'):
+        """
+        单个市场的 年内周期 × 年份 透视表
+
+        Args:
+            symbol (str): 市场标识
+            column (str): 度量列
+            statistic (str): 统计量
+            grain (str): 'quarter'、'month'或'week'
+
+        Returns:
+            pd.DataFrame: 行为年内周期（名称为grain）、列为年份的透视表，无数据处为NaN
+        """
+        if grain not in PERIODS_PER_YEAR:
+            raise ValueError(f"Cannot pivot by grain: {grain}")
+        rolled = self.rollup(grain)
+        mask = rolled['symbol'] == self.symbols.index(symbol)
+        years = rolled['year'][mask]
+        periods = rolled[grain][mask]
+        values = self._statistic(rolled, statistic)[mask, self.columns.index(column)]
+        if len(years) == 0:
+            return pd.DataFrame(index=pd.Index([], name=grain), columns=pd.Index([], name='year'), dtype='float64')
+
+        first_year = int(years.min())
+        n_periods = PERIODS_PER_YEAR[grain] if grain != 'week' else int(periods.max())
+        matrix = np.full((n_periods, int(years.max()) - first_year + 1), np.nan)
+        matrix[periods - 1, years - first_year] = values
+        return pd.DataFrame(
+            matrix,
+            index=pd.Index(np.arange(1, n_periods + 1), name=grain),
+            columns=pd.Index(np.arange(first_year, first_year + matrix.shape[1]), name='year'),
+        )
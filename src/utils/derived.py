@@ -0,0 +1,195 @@
+"""
+派生分析数据模块
+页面展示所需的派生数据（重采样K线、滚动相关系数、月度热力图透视表、标准化对比序列、领先/滞后相关），
+既可由后台预计算任务写入产物存储，也可在回调中按需计算
+"""
+
+import numpy as np
+import pandas as pd
+from . import kernels
+from .clean_data import resample_to_weekly, resample_to_monthly
+from .correlation import align_series, rolling_corr, cross_correlation
+from .tiles import OHLC
+
+
+def resample_bars(df, period, groups=None):
+    """
+    按周期获取K线数据
+
+    Args:
+        df (pd.DataFrame): 日线数据
+        period (str): 'daily'、'weekly'或'monthly'
+        groups (tuple): 交易日历给出的分组（TradingCalendar.period_groups的结果），
+            提供时按行号分段聚合，否则使用pandas重采样
+
+    Returns:
+        pd.DataFrame: 对应周期的K线数据
+    """
+    if period == 'daily':
+        return df
+    if groups is not None:
+        return aggregate_bars(df, *groups)
+    if period == 'weekly':
+        return resample_to_weekly(df)
+    return resample_to_monthly(df)
+
+
+def aggregate_bars(df, starts, labels):
+    """
+    按分组首行位置聚合K线（与resample_to_weekly/resample_to_monthly的结果一致）
+
+    Args:
+        df (pd.DataFrame): 日线数据
+        starts (np.ndarray): 每组首行的行号
+        labels (np.ndarray): 每组的标签日期
+
+    Returns:
+        pd.DataFrame: 聚合后的K线数据
+    """
+    if len(starts) == 0:
+        # 无数据时返回与pandas重采样结构相同的空表
+        return resample_to_weekly(df.iloc[:0])
+    names = list(OHLC)
+    reduced = kernels.segment_reduce(df[names].to_numpy(dtype='float64'), starts, list(OHLC.values()))
+    columns = {'date': labels}
+    for k, name in enumerate(names):
+        # 保持日线各列的类型
+        columns[name] = reduced[:, k].astype(df[name].dtype)
+
+    bars = pd.DataFrame(columns).dropna().reset_index(drop=True)
+    bars['change_pct'] = bars['close'].pct_change() * 100
+    return bars
+
+
+def pair_rolling_correlation(df1, df2, window):
+    """
+    计算两个指数收盘价的滚动相关系数（按共同交易日对齐）
+
+    Args:
+        df1 (pd.DataFrame): 第一个指数数据
+        df2 (pd.DataFrame): 第二个指数数据
+        window (int): 滚动窗口大小
+
+    Returns:
+        pd.DataFrame: 包含date和rolling_corr列的数据
+    """
+    dates, _, values = align_series({'a': df1, 'b': df2}, 'close', how='inner')
+    return aligned_rolling_correlation(dates, values, window)
+
+
+def aligned_rolling_correlation(dates, values, window):
+    """
+    计算已对齐的两列取值的滚动相关系数
+
+    Args:
+        dates (np.ndarray): 共同交易日
+        values (np.ndarray): 形状为(交易日数, 2)的数组
+        window (int): 滚动窗口大小
+
+    Returns:
+        pd.DataFrame: 包含date和rolling_corr列的数据
+    """
+    return pd.DataFrame({'date': dates, 'rolling_corr': rolling_corr(values, window)[:, 0]})
+
+
+# 领先/滞后分析可用的融资融券指标
+MARGIN_MEASURES = {
+    'margin_balance_change': 'Margin Balance Change (%)',
+    'financing_purchase': 'Financing Purchase Change (%)',
+}
+
+
+def margin_measure(df, measure):
+    """
+    计算融资融券指标的日序列
+
+    Args:
+        df (pd.DataFrame): 融资融券数据
+        measure (str): MARGIN_MEASURES中的指标；financing_purchase取日变化率，使其与收益率同为平稳序列
+
+    Returns:
+        np.ndarray: 与df逐行对应的float64数组
+    """
+    if measure == 'financing_purchase':
+        values = df['financing_purchase'].to_numpy(dtype='float64')
+        change = np.full(len(values), np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            change[1:] = (values[1:] / values[:-1] - 1) * 100
+        change[~np.isfinite(change)] = np.nan
+        return change
+    return df[measure].to_numpy(dtype='float64')
+
+
+def lead_lag_scan(values, max_lag, window=None):
+    """
+    两个已对齐序列在-max_lag到max_lag的全部滞后下的相关系数
+
+    Args:
+        values (np.ndarray): 形状为(交易日数, 2)的数组，第一列为领先候选（如融资融券指标），第二列为指数收益率
+        max_lag (int): 最大滞后天数
+        window (int): 只使用最近window个交易日，为None时使用全部历史
+
+    Returns:
+        pd.DataFrame: 包含lag、corr、count列的数据，正滞后表示第一列领先
+    """
+    if window is not None:
+        values = values[-window:]
+    lags, corr, counts = cross_correlation(values[:, 0], values[:, 1], max_lag)
+    return pd.DataFrame({'lag': lags, 'corr': corr, 'count': counts})
+
+
+def margin_monthly_pivot(df, column='margin_balance'):
+    """
+    计算融资融券月度平均余额透视表（单位：亿元）
+
+    Args:
+        df (pd.DataFrame): 融资融券数据
+        column (str): 聚合的余额列
+
+    Returns:
+        pd.DataFrame: 行为月份、列为年份的透视表
+    """
+    monthly = pd.DataFrame({
+        'year': df['date'].dt.year,
+        'month': df['date'].dt.month,
+        'value': df[column] / 100000000  # 转为亿元
+    })
+    pivot_data = monthly.groupby(['year', 'month'])['value'].mean().reset_index()
+    return pivot_data.pivot(index='month', columns='year', values='value')
+
+
+def normalized_close(df):
+    """
+    以首日收盘价为基准（=100）的标准化序列
+
+    Args:
+        df (pd.DataFrame): 指数数据
+
+    Returns:
+        pd.DataFrame: 包含date和normalized列的数据
+    """
+    close = df['close'].astype('float64')
+    return pd.DataFrame({'date': df['date'].to_numpy(), 'normalized': close / close.iloc[0] * 100})
+
+
+def rebase_normalized(normalized, start_date=None, end_date=None):
+    """
+    截取标准化序列的日期区间，并以区间首日重新设为100
+
+    Args:
+        normalized (pd.DataFrame): normalized_close()的结果
+        start_date: 起始日期（含）
+        end_date: 结束日期（含）
+
+    Returns:
+        pd.DataFrame: 重新定基后的序列
+    """
+    mask = pd.Series(True, index=normalized.index)
+    if start_date is not None:
+        mask &= normalized['date'] >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= normalized['date'] <= pd.Timestamp(end_date)
+    window = normalized[mask]
+    if len(window) == 0:
+        return window
+    return window.assign(normalized=window['normalized'] / window['normalized'].iloc[0] * 100)
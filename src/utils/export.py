@@ -0,0 +1,167 @@
+"""
+数据导出模块
+页面的下载按钮指向Flask路由，路由返回流式响应：
+CSV逐块（各部分逐块横向拼接）编码后直接发送，不在内存中拼出完整文件；
+Excel（xlsx为zip格式，无法边写边发）先写入临时文件，再按块读出发送
+"""
+
+import tempfile
+import importlib.util
+from urllib.parse import urlencode
+import pandas as pd
+from flask import Response
+
+
+# 每次写出的行数
+EXPORT_CHUNK_ROWS = 5000
+
+# 可用的Excel写出引擎（均为可选依赖）
+EXCEL_ENGINE = next(
+    (engine for engine in ('xlsxwriter', 'openpyxl') if importlib.util.find_spec(engine) is not None),
+    None
+)
+
+# 从临时文件读出Excel时每块的字节数
+EXPORT_BLOCK_BYTES = 1 << 16
+
+EXPORT_FORMATS = {
+    'csv': {'label': 'CSV', 'extension': 'csv', 'mimetype': 'text/csv'},
+    'xlsx': {
+        'label': 'Excel', 'extension': 'xlsx',
+        'mimetype': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    },
+}
+
+
+def get_export_format_options():
+    """
+    获取导出格式的下拉选项（未安装Excel引擎时禁用Excel）
+
+    Returns:
+        list: 选项列表
+    """
+    return [
+        {'label': spec['label'], 'value': fmt, 'disabled': fmt == 'xlsx' and EXCEL_ENGINE is None}
+        for fmt, spec in EXPORT_FORMATS.items()
+    ]
+
+
+def export_filename(name, fmt):
+    """
+    生成导出文件名
+
+    Args:
+        name (str): 文件名主体
+        fmt (str): 导出格式
+
+    Returns:
+        str: 文件名
+    """
+    return f"{name}.{EXPORT_FORMATS[fmt]['extension']}"
+
+
+def _iter_chunks(parts, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    按行分块，并把同一块中的各部分横向拼接
+
+    Args:
+        parts (list): 逐行对齐的DataFrame列表（后面部分与前面重名的列被忽略）
+    """
+    rows = len(parts[0])
+    for start in range(0, rows, chunk_rows):
+        chunks = []
+        seen = set()
+        for part in parts:
+            columns = [column for column in part.columns if column not in seen]
+            seen.update(columns)
+            chunk = part.iloc[start:start + chunk_rows][columns]
+            chunk.index = pd.RangeIndex(len(chunk))
+            chunks.append(chunk)
+        yield pd.concat(chunks, axis=1) if len(chunks) > 1 else chunks[0]
+
+
+def iter_csv(tables):
+    """
+    分块生成CSV字节；多个表时按表依次写出，并在首列标注表名
+
+    Args:
+        tables (dict): 表名到部分列表（见_iter_chunks）的映射
+
+    Yields:
+        bytes: CSV片段
+    """
+    # utf-8-sig（带BOM）便于Excel正确识别中文
+    yield '\ufeff'.encode('utf-8')
+    header = True
+    for name, parts in tables.items():
+        for chunk in _iter_chunks(parts):
+            if len(tables) > 1:
+                chunk.insert(0, 'table', name)
+            yield chunk.to_csv(header=header, index=False).encode('utf-8')
+            header = False
+
+
+def iter_excel(tables):
+    """
+    分块写出Excel（每个表一个工作表）到临时文件，再按块读出
+
+    Args:
+        tables (dict): 表名到部分列表（见_iter_chunks）的映射
+
+    Yields:
+        bytes: xlsx文件片段
+    """
+    if EXCEL_ENGINE is None:
+        raise RuntimeError("Excel export requires xlsxwriter or openpyxl")
+
+    with tempfile.TemporaryFile() as file:
+        with pd.ExcelWriter(file, engine=EXCEL_ENGINE, datetime_format='yyyy-mm-dd') as writer:
+            for name, parts in tables.items():
+                row = 0
+                for chunk in _iter_chunks(parts):
+                    chunk.to_excel(writer, sheet_name=name[:31], startrow=row, header=row == 0, index=False)
+                    row += len(chunk) + (1 if row == 0 else 0)
+        file.seek(0)
+        while True:
+            block = file.read(EXPORT_BLOCK_BYTES)
+            if not block:
+                break
+            yield block
+
+
+def export_response(tables, fmt, name):
+    """
+    生成导出文件的流式下载响应
+
+    Args:
+        tables (dict): 表名到部分列表的映射
+        fmt (str): 'csv'或'xlsx'
+        name (str): 文件名主体
+
+    Returns:
+        flask.Response: 以附件形式下载的流式响应
+    """
+    chunks = iter_excel(tables) if fmt == 'xlsx' else iter_csv(tables)
+    return Response(
+        chunks,
+        mimetype=EXPORT_FORMATS[fmt]['mimetype'],
+        headers={
+            'Content-Disposition': f'attachment; filename="{export_filename(name, fmt)}"',
+            'Cache-Control': 'no-store',
+        }
+    )
+
+
+def export_url(path, **params):
+    """
+    生成下载按钮指向的导出路由地址（值为None的参数省略，列表参数重复出现）
+
+    Args:
+        path (str): 路由路径
+        **params: 查询参数
+
+    Returns:
+        str: 带查询参数的地址
+    """
+    params = {key: value for key, value in params.items() if value is not None}
+    return f"{path}?{urlencode(params, doseq=True)}"
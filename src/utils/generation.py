@@ -0,0 +1,81 @@
+"""
+请求代次跟踪模块
+同一会话对同一回调的每个新请求都会使代次加一。计算过程中在各阶段检查代次，
+已有更新的请求到达时放弃当前计算，只有每个会话的最新状态会被计算到底
+
+代次在后台回调可用时保存在其diskcache中，由服务进程和后台任务进程共享；否则保存在进程内存中
+"""
+
+import threading
+from collections import OrderedDict
+from dash.exceptions import PreventUpdate
+from .background import get_background_manager
+
+
+# 共享存储中代次记录的过期时间（秒）
+GENERATION_EXPIRE = 3600
+
+# 进程内存中最多记录的(会话, 回调)数，超过后丢弃最久未使用的
+MAX_LOCAL_GENERATIONS = 10000
+
+
+class RequestGenerations:
+    """
+    按(会话, 回调名)记录最新请求的代次
+    """
+
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _next(self, key):
+        manager = get_background_manager()
+        if manager is not None:
+            cache = manager.handle
+            with cache.transact():
+                generation = cache.get(key, 0) + 1
+                cache.set(key, generation, expire=GENERATION_EXPIRE)
+            return generation
+        with self._lock:
+            generation = self._local.pop(key, 0) + 1
+            self._local[key] = generation
+            while len(self._local) > MAX_LOCAL_GENERATIONS:
+                self._local.popitem(last=False)
+        return generation
+
+    def _current(self, key):
+        manager = get_background_manager()
+        if manager is not None:
+            return manager.handle.get(key, 0)
+        with self._lock:
+            return self._local.get(key, 0)
+
+    def begin(self, session_id, name, set_progress=None):
+        """
+        登记一个新请求，返回阶段检查函数
+
+        返回的函数在每个计算阶段开始时调用：若同一会话已有更新的请求，抛出PreventUpdate放弃本次计算；
+        否则把参数转交给set_progress（后台回调的进度输出）。会话标识为空时不做检查
+
+        Args:
+            session_id (str): 浏览器会话标识
+            name (str): 回调名称
+            set_progress (callable): 进度回调，为None时不报告进度
+
+        Returns:
+            callable: step(progress=None)
+        """
+        key = ('request-generation', session_id, name)
+        generation = self._next(key) if session_id else None
+
+        def step(progress=None):
+            if generation is not None and self._current(key) != generation:
+                raise PreventUpdate
+            if set_progress is not None and progress is not None:
+                set_progress(progress)
+
+        return step
+
+
+# 进程内唯一的代次记录
+request_generations = RequestGenerations()
@@ -1,6 +1,6 @@
 """
 数据获取模块
-从data/raw目录加载原始数据
+从data/raw目录加载原始数据，数据集由config.DATASET_CATALOG登记
 
 数据来源：阿里云天池公开数据集
 数据集链接：https://tianchi.aliyun.com/
@@ -8,6 +8,7 @@
 
 import pandas as pd
 import os
+from .catalog import get_catalog, get_dataset
 
 
 def get_raw_data_path():
@@ -23,21 +24,33 @@ def get_raw_data_path():
     return os.path.join(project_root, 'data', 'raw')
 
 
-def load_sh_index():
+def load_dataset(entry):
     """
-    加载沪市指数数据
+    按目录记录加载一个原始数据集
     
+    Args:
+        entry (dict): 数据集记录（含file和encoding）
+        
     Returns:
-        pd.DataFrame: 沪市指数数据
+        pd.DataFrame: 原始数据
     """
-    raw_data_path = get_raw_data_path()
-    file_path = os.path.join(raw_data_path, 'sh_index.csv')
+    file_path = os.path.join(get_raw_data_path(), entry['file'])
     
     # 读取CSV文件
-    df = pd.read_csv(file_path, encoding='gb2312')
+    df = pd.read_csv(file_path, encoding=entry.get('encoding', 'utf-8'))
     return df
 
 
+def load_sh_index():
+    """
+    加载沪市指数数据
+    
+    Returns:
+        pd.DataFrame: 沪市指数数据
+    """
+    return load_dataset(get_dataset('sh_index'))
+
+
 def load_sz_index():
     """
     加载深证成指数据
@@ -45,12 +58,7 @@ def load_sz_index():
     Returns:
         pd.DataFrame: 深证成指数据
     """
-    raw_data_path = get_raw_data_path()
-    file_path = os.path.join(raw_data_path, 'sz_index.csv')
-    
-    # 读取CSV文件
-    df = pd.read_csv(file_path, encoding='gb2312')
-    return df
+    return load_dataset(get_dataset('sz_index'))
 
 
 def load_sh_margin_trade():
@@ -60,12 +68,7 @@ def load_sh_margin_trade():
     Returns:
         pd.DataFrame: 沪市两融数据
     """
-    raw_data_path = get_raw_data_path()
-    file_path = os.path.join(raw_data_path, 'sh_margin_trade.csv')
-    
-    # 读取CSV文件
-    df = pd.read_csv(file_path, encoding='utf-8')
-    return df
+    return load_dataset(get_dataset('sh_margin'))
 
 
 def load_sz_margin_trade():
@@ -75,24 +78,14 @@ def load_sz_margin_trade():
     Returns:
         pd.DataFrame: 深市两融数据
     """
-    raw_data_path = get_raw_data_path()
-    file_path = os.path.join(raw_data_path, 'sz_margin_trade.csv')
-    
-    # 读取CSV文件
-    df = pd.read_csv(file_path, encoding='utf-8')
-    return df
+    return load_dataset(get_dataset('sz_margin'))
 
 
 def load_all_data():
     """
-    加载所有数据
+    加载目录中登记的所有数据
     
     Returns:
-        dict: 包含所有数据的字典
+        dict: 数据集标识到原始数据的映射
     """
-    return {
-        'sh_index': load_sh_index(),
-        'sz_index': load_sz_index(),
-        'sh_margin': load_sh_margin_trade(),
-        'sz_margin': load_sz_margin_trade()
-    }
+    return {entry['symbol']: load_dataset(entry) for entry in get_catalog()}
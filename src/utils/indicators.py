@@ -0,0 +1,209 @@
+"""
+技术指标计算引擎
+一次调用计算多个指标：同一批次内共享中间结果（同一序列、同一跨度的EMA只算一次，
+同一序列、同一窗口的滚动均值只算一次），结果按(版本, 标识, 周期, 指标)缓存在统一缓存管理器中
+
+指标规格为字符串，形如'sma20'、'ema12'、'boll20'、'macd'、'rsi14'、'atr14'、'obv'、'vma5'，
+省略参数时使用INDICATORS中的默认参数
+"""
+
+import re
+import time
+import numpy as np
+import pandas as pd
+from . import kernels
+from .cache_manager import cache_manager
+
+
+# 指标定义：默认参数、显示位置（price主图叠加 / volume成交量叠加 / panel独立子图）
+INDICATORS = {
+    'sma': {'params': (20,), 'placement': 'price', 'label': 'MA'},
+    'ema': {'params': (12,), 'placement': 'price', 'label': 'EMA'},
+    'boll': {'params': (20, 2), 'placement': 'price', 'label': 'BOLL'},
+    'vma': {'params': (5,), 'placement': 'volume', 'label': 'VMA'},
+    'macd': {'params': (12, 26, 9), 'placement': 'panel', 'label': 'MACD'},
+    'rsi': {'params': (14,), 'placement': 'panel', 'label': 'RSI'},
+    'atr': {'params': (14,), 'placement': 'panel', 'label': 'ATR'},
+    'obv': {'params': (), 'placement': 'panel', 'label': 'OBV'},
+}
+
+_SPEC_PATTERN = re.compile(r'^([a-z]+?)(\d+(?:_\d+)*)?$')
+
+
+def parse_spec(spec):
+    """
+    解析指标规格字符串
+
+    Args:
+        spec (str): 如'sma20'、'boll20_2'、'macd'
+
+    Returns:
+        tuple: (指标名称, 参数元组)
+    """
+    match = _SPEC_PATTERN.match(spec)
+    if not match or match.group(1) not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {spec}")
+    name = match.group(1)
+    defaults = INDICATORS[name]['params']
+    given = tuple(int(p) for p in match.group(2).split('_')) if match.group(2) else ()
+    return name, given + defaults[len(given):]
+
+
+class _Context:
+    """
+    单次批量计算的共享中间结果
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.close = df['close'].to_numpy(dtype='float64')
+        self._arrays = {}
+        self._emas = {}
+        self._means = {}
+
+    def array(self, column):
+        if column not in self._arrays:
+            self._arrays[column] = self.df[column].to_numpy(dtype='float64')
+        return self._arrays[column]
+
+    def ema(self, source, span, values=None):
+        """
+        同一来源、同一跨度的EMA只计算一次
+        """
+        key = (source, span)
+        if key not in self._emas:
+            values = self.array(source) if values is None else values
+            self._emas[key] = kernels.ewm_mean(values, span)
+        return self._emas[key]
+
+    def rolling_mean(self, source, window, power=1):
+        """
+        同一来源、同一窗口的滚动均值只计算一次（power=2时为平方的滚动均值）
+        """
+        key = (source, window, power)
+        if key not in self._means:
+            self._means[key] = kernels.rolling_mean(self.array(source) ** power, window)
+        return self._means[key]
+
+
+def _sma(ctx, window):
+    return {f'sma{window}': ctx.rolling_mean('close', window)}
+
+
+def _ema(ctx, span):
+    return {f'ema{span}': ctx.ema('close', span)}
+
+
+def _boll(ctx, window, width):
+    mean = ctx.rolling_mean('close', window)
+    # 总体标准差，与常见行情软件一致
+    std = np.sqrt(np.maximum(ctx.rolling_mean('close', window, power=2) - mean ** 2, 0.0))
+    name = f'boll{window}_{width}'
+    return {f'{name}_upper': mean + width * std, f'{name}_mid': mean, f'{name}_lower': mean - width * std}
+
+
+def _vma(ctx, window):
+    return {f'vma{window}': ctx.rolling_mean('vol', window)}
+
+
+def _macd(ctx, fast, slow, signal):
+    dif = ctx.ema('close', fast) - ctx.ema('close', slow)
+    name = f'macd{fast}_{slow}_{signal}'
+    dea = ctx.ema(name, signal, values=dif)
+    return {f'{name}_dif': dif, f'{name}_dea': dea, f'{name}_hist': (dif - dea) * 2}
+
+
+def _rsi(ctx, window):
+    # Wilder平滑：alpha = 1 / window，对应span = 2 * window - 1
+    diff = np.diff(ctx.close, prepend=np.nan)
+    gain = np.where(diff > 0, diff, 0.0)
+    loss = np.where(diff < 0, -diff, 0.0)
+    gain[0] = loss[0] = np.nan
+    avg_gain = ctx.ema('gain', 2 * window - 1, values=gain)
+    avg_loss = ctx.ema('loss', 2 * window - 1, values=loss)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi[:window] = np.nan
+    return {f'rsi{window}': rsi}
+
+
+def _atr(ctx, window):
+    high, low = ctx.array('high'), ctx.array('low')
+    prev_close = np.concatenate([[np.nan], ctx.close[:-1]])
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    atr = ctx.ema('true_range', 2 * window - 1, values=true_range)
+    atr[:window - 1] = np.nan
+    return {f'atr{window}': atr}
+
+
+def _obv(ctx):
+    direction = np.sign(np.diff(ctx.close, prepend=ctx.close[:1]))
+    return {'obv': np.cumsum(direction * ctx.array('vol'))}
+
+
+_CALCULATORS = {
+    'sma': _sma,
+    'ema': _ema,
+    'boll': _boll,
+    'vma': _vma,
+    'macd': _macd,
+    'rsi': _rsi,
+    'atr': _atr,
+    'obv': _obv,
+}
+
+
+def compute_indicators(df, specs):
+    """
+    批量计算技术指标
+
+    Args:
+        df (pd.DataFrame): 按日期升序的K线数据（含close/high/low/vol列）
+        specs (list): 指标规格字符串列表
+
+    Returns:
+        dict: 指标规格到{列名: 数组}的映射，数组与df逐行对齐
+    """
+    ctx = _Context(df)
+    results = {}
+    for spec in specs:
+        name, params = parse_spec(spec)
+        results[spec] = _CALCULATORS[name](ctx, *params)
+    return results
+
+
+# 指标结果缓存：(版本, 标识, 周期, 规格) -> {列名: 数组}
+_cache = cache_manager.cache('indicators')
+
+
+def get_indicators(store, symbol, period, bars, specs):
+    """
+    获取某序列某周期的技术指标，已缓存的指标不再重复计算
+
+    Args:
+        store (PanelStore): 面板数据存储（提供版本号）
+        symbol (str): 数据集标识
+        period (str): 'daily'、'weekly'或'monthly'
+        bars (pd.DataFrame): 该周期的全历史K线数据
+        specs (list): 指标规格字符串列表
+
+    Returns:
+        pd.DataFrame: 含date列及所有请求指标列的数据，与bars逐行对齐
+    """
+    found = {spec: _cache.get((store.version, symbol, period, spec)) for spec in specs}
+
+    missing = [spec for spec in specs if found[spec] is None]
+    if missing:
+        start = time.perf_counter()
+        computed = compute_indicators(bars, missing)
+        cost = (time.perf_counter() - start) / len(missing)
+        found.update(computed)
+        # 数据版本变化后旧版本的结果不再有效
+        _cache.retain(lambda key: key[0] == store.version)
+        for spec, columns in computed.items():
+            _cache.put((store.version, symbol, period, spec), columns, cost=cost)
+
+    columns = {'date': bars['date'].to_numpy()}
+    for spec in specs:
+        columns.update(found[spec])
+    return pd.DataFrame(columns)
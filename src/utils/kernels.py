@@ -0,0 +1,500 @@
+"""
+数值内核模块
+滚动均值、指数加权平均、滚动相关、分段聚合等按时间顺序推进的热点循环集中在这里。
+每个内核有一个不依赖pandas的NumPy参考实现（向量化的累计和/reduceat；滚动相关分块去均值后取累计和之差；
+EWM递推无法向量化，按列在Python浮点数上逐行递推）；安装numba时自动改用编译后的逐元素循环实现：一次遍历、
+不生成(T, P)的中间数组，并释放GIL。两种实现的缺失值处理与pandas一致，可用配置KERNEL_BACKEND或set_backend()指定
+
+运行方式（校验各实现与pandas及彼此一致，不一致时以非零状态退出）:
+    python -m src.utils.kernels
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from config import KERNEL_BACKEND
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# 分段聚合支持的聚合方式及其在编译实现中的编号
+SEGMENT_OPS = ('first', 'last', 'min', 'max', 'sum')
+
+# NumPy滚动相关分块去均值的块行数
+_CORR_BLOCK_ROWS = 1024
+
+
+def _as_columns(values):
+    """
+    转为(T, k)的float64连续数组，并返回原数组是否为一维
+    """
+    values = np.asarray(values, dtype='float64')
+    flat = values.ndim == 1
+    return np.ascontiguousarray(values.reshape(len(values), -1)), flat
+
+
+def _segment_ends(starts, length):
+    return np.append(starts[1:], length) - 1
+
+
+# ---------------------------------------------------------------------------
+# NumPy参考实现
+# ---------------------------------------------------------------------------
+
+def _rolling_mean_numpy(values, window):
+    missing = np.isnan(values)
+    cumulative = np.cumsum(np.where(missing, 0.0, values), axis=0)
+    counts = np.cumsum(missing, axis=0)
+    result = np.full(values.shape, np.nan)
+    if window <= len(values):
+        sums = cumulative[window - 1:].copy()
+        sums[1:] -= cumulative[:-window]
+        gaps = counts[window - 1:].copy()
+        gaps[1:] -= counts[:-window]
+        result[window - 1:] = np.where(gaps == 0, sums / window, np.nan)
+    return result
+
+
+def _ewm_mean_numpy(values, span):
+    # 与pandas的ewm(adjust=False, ignore_na=False)相同：缺失值处照常衰减旧权重
+    alpha = 2.0 / (span + 1.0)
+    result = np.empty(values.shape)
+    for c in range(values.shape[1]):
+        column = values[:, c].tolist()
+        out = [np.nan] * len(column)
+        weighted = np.nan
+        old_weight = 1.0
+        for t, value in enumerate(column):
+            if weighted == weighted:
+                old_weight *= 1.0 - alpha
+                if value == value:
+                    if weighted != value:
+                        weighted = (old_weight * weighted + alpha * value) / (old_weight + alpha)
+                    old_weight = 1.0
+            elif value == value:
+                weighted = value
+            out[t] = weighted
+        result[:, c] = out
+    return result
+
+
+def _windowed_corr(span, i, j, window, min_periods):
+    # span中每个完整窗口的相关系数（行数len(span) - window + 1），窗口内的和取累计和之差
+    mask = ~np.isnan(span)
+    z = np.where(mask, span, 0.0)
+    both = (mask[:, i] & mask[:, j]).astype('float64')
+    x = z[:, i] * both
+    y = z[:, j] * both
+
+    sums = []
+    for moment in (both, x, y, x * x, y * y, x * y):
+        cumulative = np.cumsum(moment, axis=0)
+        windowed = cumulative[window - 1:].copy()
+        windowed[1:] -= cumulative[:-window]
+        sums.append(windowed)
+    n, sx, sy, sxx, syy, sxy = sums
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        result = cov / np.sqrt(var_x * var_y)
+
+    result[n < min_periods] = np.nan
+    return result
+
+
+def _rolling_corr_numpy(centered, i, j, window, min_periods):
+    # 按行分块，每块先减去块内均值再求累计和：相减抵消的量级只取决于块长而与序列长度无关，
+    # 随机游走远离全局均值时也不损失精度（相关系数不受平移影响）
+    rows = len(centered)
+    padded = np.vstack([np.full((window - 1, centered.shape[1]), np.nan), centered])
+    result = np.empty((rows, len(i)))
+    block = max(_CORR_BLOCK_ROWS, window)
+    for start in range(0, rows, block):
+        stop = min(start + block, rows)
+        span = padded[start:stop + window - 1]
+        counts = (~np.isnan(span)).sum(axis=0)
+        shift = np.where(counts > 0, np.nansum(span, axis=0) / np.maximum(counts, 1), 0.0)
+        result[start:stop] = _windowed_corr(span - shift, i, j, window, min_periods)
+    return np.clip(result, -1.0, 1.0)
+
+
+def _segment_reduce_numpy(values, starts, ops):
+    result = np.empty((len(starts), values.shape[1]))
+    ends = _segment_ends(starts, len(values))
+    reducers = {'min': np.minimum, 'max': np.maximum, 'sum': np.add}
+    for op in SEGMENT_OPS:
+        columns = [c for c, name in enumerate(ops) if name == op]
+        if not columns:
+            continue
+        if op == 'first':
+            result[:, columns] = values[starts][:, columns]
+        elif op == 'last':
+            result[:, columns] = values[ends][:, columns]
+        else:
+            result[:, columns] = reducers[op].reduceat(values[:, columns], starts, axis=0)
+    return result
+
+
+_NUMPY_KERNELS = {
+    'rolling_mean': _rolling_mean_numpy,
+    'ewm_mean': _ewm_mean_numpy,
+    'rolling_corr': _rolling_corr_numpy,
+    'segment_reduce': _segment_reduce_numpy,
+}
+
+
+# ---------------------------------------------------------------------------
+# numba编译实现（首次调用时编译，结果缓存在__pycache__中）
+# ---------------------------------------------------------------------------
+
+def _numba_kernels():
+    jit = numba.njit(cache=True, nogil=True, error_model='numpy')
+
+    @jit
+    def rolling_mean(values, window):
+        rows, cols = values.shape
+        result = np.full((rows, cols), np.nan)
+        for c in range(cols):
+            total = 0.0
+            gaps = 0
+            for t in range(rows):
+                value = values[t, c]
+                if np.isnan(value):
+                    gaps += 1
+                else:
+                    total += value
+                if t >= window:
+                    old = values[t - window, c]
+                    if np.isnan(old):
+                        gaps -= 1
+                    else:
+                        total -= old
+                if t >= window - 1 and gaps == 0:
+                    result[t, c] = total / window
+        return result
+
+    @jit
+    def ewm_mean(values, span):
+        # 与pandas的ewm(adjust=False, ignore_na=False)相同：缺失值处照常衰减旧权重
+        rows, cols = values.shape
+        alpha = 2.0 / (span + 1.0)
+        result = np.empty((rows, cols))
+        for c in range(cols):
+            weighted = np.nan
+            old_weight = 1.0
+            for t in range(rows):
+                value = values[t, c]
+                if weighted == weighted:
+                    old_weight *= 1.0 - alpha
+                    if value == value:
+                        if weighted != value:
+                            weighted = (old_weight * weighted + alpha * value) / (old_weight + alpha)
+                        old_weight = 1.0
+                elif value == value:
+                    weighted = value
+                result[t, c] = weighted
+        return result
+
+    @jit
+    def rolling_corr(centered, i, j, window, min_periods):
+        # 滑动更新窗口均值与协方差和（Welford式增删），长序列上比原始和之差的舍入误差小
+        rows = centered.shape[0]
+        result = np.empty((rows, len(i)))
+        for p in range(len(i)):
+            a = i[p]
+            b = j[p]
+            n = mx = my = cxx = cyy = cxy = 0.0
+            for t in range(rows):
+                x = centered[t, a]
+                y = centered[t, b]
+                if x == x and y == y:
+                    n += 1.0
+                    dx = x - mx
+                    dy = y - my
+                    mx += dx / n
+                    my += dy / n
+                    cxx += dx * (x - mx)
+                    cyy += dy * (y - my)
+                    cxy += dx * (y - my)
+                if t >= window:
+                    x = centered[t - window, a]
+                    y = centered[t - window, b]
+                    if x == x and y == y:
+                        n -= 1.0
+                        if n == 0.0:
+                            mx = my = cxx = cyy = cxy = 0.0
+                        else:
+                            old_mx = mx - (x - mx) / n
+                            old_my = my - (y - my) / n
+                            cxx -= (x - old_mx) * (x - mx)
+                            cyy -= (y - old_my) * (y - my)
+                            cxy -= (x - old_mx) * (y - my)
+                            mx = old_mx
+                            my = old_my
+                if n < min_periods:
+                    result[t, p] = np.nan
+                    continue
+                r = cxy / np.sqrt(cxx * cyy)
+                if r > 1.0:
+                    r = 1.0
+                elif r < -1.0:
+                    r = -1.0
+                result[t, p] = r
+        return result
+
+    @jit
+    def segment_reduce(values, starts, codes):
+        # codes与SEGMENT_OPS的顺序对应；min/max遇到缺失值即为缺失，与np.minimum.reduceat一致
+        rows, cols = values.shape
+        segments = len(starts)
+        result = np.empty((segments, cols))
+        for s in range(segments):
+            begin = starts[s]
+            end = starts[s + 1] if s + 1 < segments else rows
+            for c in range(cols):
+                code = codes[c]
+                if code == 0:
+                    result[s, c] = values[begin, c]
+                elif code == 1:
+                    result[s, c] = values[end - 1, c]
+                else:
+                    acc = values[begin, c]
+                    for t in range(begin + 1, end):
+                        value = values[t, c]
+                        if code == 4:
+                            acc += value
+                        elif np.isnan(value):
+                            acc = value
+                        elif code == 2 and value < acc:
+                            acc = value
+                        elif code == 3 and value > acc:
+                            acc = value
+                    result[s, c] = acc
+        return result
+
+    return {
+        'rolling_mean': rolling_mean,
+        'ewm_mean': lambda values, span: ewm_mean(values, float(span)),
+        'rolling_corr': lambda centered, i, j, window, min_periods: rolling_corr(
+            centered, np.ascontiguousarray(i, dtype='int64'), np.ascontiguousarray(j, dtype='int64'),
+            int(window), float(min_periods)),
+        'segment_reduce': lambda values, starts, ops: segment_reduce(
+            values, np.ascontiguousarray(starts, dtype='int64'),
+            np.array([SEGMENT_OPS.index(op) for op in ops], dtype='int64')),
+    }
+
+
+_BACKENDS = {'numpy': _NUMPY_KERNELS}
+if numba is not None:
+    _BACKENDS['numba'] = _numba_kernels()
+
+_active = {'name': None}
+
+
+def available_backends():
+    """
+    当前环境可用的内核实现
+
+    Returns:
+        list: 实现名称，'numpy'始终可用，安装numba时还有'numba'
+    """
+    return list(_BACKENDS)
+
+
+def set_backend(name=None):
+    """
+    选择内核实现
+
+    Args:
+        name (str): 'numpy'或'numba'；为None或所选实现不可用时，有numba则用numba，否则用numpy
+
+    Returns:
+        str: 实际使用的实现名称
+    """
+    if name not in _BACKENDS:
+        name = 'numba' if 'numba' in _BACKENDS else 'numpy'
+    _active['name'] = name
+    return name
+
+
+def get_backend():
+    """
+    当前使用的内核实现名称
+    """
+    return _active['name']
+
+
+def _kernel(name):
+    return _BACKENDS[_active['name']][name]
+
+
+set_backend(KERNEL_BACKEND)
+
+
+def rolling_mean(values, window):
+    """
+    滚动均值，与pandas的rolling(window).mean()一致（窗口内有缺失值时为NaN）
+
+    Args:
+        values (np.ndarray): 长度T的序列或形状为(T, k)的数组
+        window (int): 窗口大小（行数）
+
+    Returns:
+        np.ndarray: 与输入形状相同的float64数组，前window - 1行为NaN
+    """
+    columns, flat = _as_columns(values)
+    result = _kernel('rolling_mean')(columns, int(window))
+    return result[:, 0] if flat else result
+
+
+def ewm_mean(values, span):
+    """
+    指数加权平均，与pandas的ewm(span=span, adjust=False).mean()一致
+
+    Args:
+        values (np.ndarray): 长度T的序列或形状为(T, k)的数组
+        span (float): 跨度，alpha = 2 / (span + 1)
+
+    Returns:
+        np.ndarray: 与输入形状相同的float64数组，首个有效值之前为NaN
+    """
+    columns, flat = _as_columns(values)
+    result = _kernel('ewm_mean')(columns, span)
+    return result[:, 0] if flat else result
+
+
+def rolling_corr(centered, i, j, window, min_periods):
+    """
+    各序列对的滚动相关系数（成对完整样本）
+
+    Args:
+        centered (np.ndarray): 形状为(T, k)的已去均值数组，缺失值为NaN
+        i (np.ndarray): 各序列对的第一列序号
+        j (np.ndarray): 各序列对的第二列序号
+        window (int): 窗口大小（行数），前window行按已有的行计算
+        min_periods (int): 窗口内最少共同样本数
+
+    Returns:
+        np.ndarray: 形状为(T, P)的滚动相关系数，截断到[-1, 1]，不足min_periods的位置为NaN
+    """
+    columns, _ = _as_columns(centered)
+    return _kernel('rolling_corr')(columns, np.asarray(i), np.asarray(j), window, min_periods)
+
+
+def segment_reduce(values, starts, ops):
+    """
+    按分段首行位置逐列聚合（各段非空，starts严格递增）
+
+    Args:
+        values (np.ndarray): 长度T的序列或形状为(T, k)的数组
+        starts (np.ndarray): 各段首行的行号，starts[0]为0
+        ops (list): 各列的聚合方式，取自SEGMENT_OPS
+
+    Returns:
+        np.ndarray: 形状为(段数, k)的float64数组（一维输入时为长度为段数的序列）
+    """
+    columns, flat = _as_columns(values)
+    result = _kernel('segment_reduce')(columns, np.asarray(starts), list(ops))
+    return result[:, 0] if flat else result
+
+
+# 校验用的参数和允许误差（相对于数据量级）。行数与实际数据相当（每个指数约7700行）：
+# pandas与numba的滚动相关按窗口增删在线更新，误差随长度增长（8000行约2e-10，7.7万行约5e-9），
+# NumPy实现分块去均值，误差不随长度增长
+CHECK_ROWS = 8000
+CHECK_WINDOW = 20
+CHECK_SPAN = 12
+CHECK_MIN_PERIODS = 10
+CHECK_TOLERANCE = 1e-9
+
+
+def _max_diff(result, expected):
+    """
+    相对于期望结果量级的最大误差；缺失位置不一致时为无穷大
+    """
+    result = np.asarray(result, dtype='float64')
+    expected = np.asarray(expected, dtype='float64')
+    if result.shape != expected.shape or (np.isnan(result) != np.isnan(expected)).any():
+        return np.inf
+    scale = max(np.nanmax(np.abs(expected), initial=0.0), 1.0)
+    return float(np.nanmax(np.abs(result - expected), initial=0.0)) / scale
+
+
+def check_backends(rows=CHECK_ROWS, columns=len(SEGMENT_OPS), seed=0):
+    """
+    在含缺失值的随机游走数据上，校验每种可用实现与pandas一致、各实现彼此一致
+
+    Args:
+        rows (int): 行数
+        columns (int): 列数，不少于len(SEGMENT_OPS)，分段聚合的每种方式至少对照一列
+        seed (int): 随机数种子
+
+    Returns:
+        dict: (内核名称, 实现名称, 对照)到最大相对误差的映射
+
+    Raises:
+        AssertionError: 任一误差超过CHECK_TOLERANCE
+    """
+    if columns < len(SEGMENT_OPS):
+        raise ValueError(f"columns must be at least {len(SEGMENT_OPS)} to cover every segment op")
+    rng = np.random.default_rng(seed)
+    values = 1000 + np.cumsum(rng.normal(size=(rows, columns)), axis=0)
+    values[rng.random(values.shape) < 0.02] = np.nan
+    values[:5, 0] = np.nan
+    centered = values - np.nanmean(values, axis=0)
+    i, j = np.triu_indices(columns, 1)
+    starts = np.flatnonzero(np.r_[True, rng.random(rows - 1) < 0.2])
+    ops = list(SEGMENT_OPS) + [SEGMENT_OPS[c % len(SEGMENT_OPS)] for c in range(len(SEGMENT_OPS), columns)]
+    frame = pd.DataFrame(values)
+    groups = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, rows)))
+
+    pandas_results = {
+        'rolling_mean': frame.rolling(CHECK_WINDOW).mean().to_numpy(),
+        'ewm_mean': frame.ewm(span=CHECK_SPAN, adjust=False).mean().to_numpy(),
+        'rolling_corr': np.column_stack([
+            pd.Series(centered[:, a]).rolling(CHECK_WINDOW, min_periods=CHECK_MIN_PERIODS)
+            .corr(pd.Series(centered[:, b]))
+            for a, b in zip(i, j)
+        ]),
+        # pandas的groupby跳过缺失值，与reduceat不同，分段聚合只在无缺失值的数据上与pandas对照
+        'segment_reduce': pd.DataFrame(np.nan_to_num(values)).groupby(groups)
+        .agg({c: op for c, op in enumerate(ops)}).to_numpy(),
+    }
+    calls = {
+        'rolling_mean': lambda kernels: kernels['rolling_mean'](values, CHECK_WINDOW),
+        'ewm_mean': lambda kernels: kernels['ewm_mean'](values, CHECK_SPAN),
+        'rolling_corr': lambda kernels: kernels['rolling_corr'](centered, i, j, CHECK_WINDOW, CHECK_MIN_PERIODS),
+        'segment_reduce': lambda kernels: kernels['segment_reduce'](values, starts, ops),
+    }
+
+    diffs = {}
+    for name, call in calls.items():
+        reference = call(_NUMPY_KERNELS)
+        for backend, kernels in _BACKENDS.items():
+            result = call(kernels)
+            if backend != 'numpy':
+                diffs[(name, backend, 'numpy')] = _max_diff(result, reference)
+            if name == 'segment_reduce':
+                result = kernels['segment_reduce'](np.nan_to_num(values), starts, ops)
+            diffs[(name, backend, 'pandas')] = _max_diff(result, pandas_results[name])
+
+    failed = {key: diff for key, diff in diffs.items() if not diff <= CHECK_TOLERANCE}
+    if failed:
+        raise AssertionError(f"Kernel results differ: {failed}")
+    return diffs
+
+
+if __name__ == '__main__':
+    try:
+        for (name, backend, against), diff in check_backends().items():
+            print(f"{name:<16}{backend:<8}vs {against:<8}{diff:.1e}")
+    except AssertionError as e:
+        print(e)
+        sys.exit(1)
+    print(f"OK: {', '.join(available_backends())}")
+
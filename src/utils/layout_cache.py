@@ -0,0 +1,74 @@
+"""
+页面布局缓存模块
+每个页面的布局（包括按默认输入预先生成的图表）在每个数据集版本上只构建一次，
+并以序列化后的JSON结构缓存在统一缓存管理器中（内存不足时可被淘汰，下次访问时重新构建）。
+切换页面时路由回调直接返回缓存的结构，
+页面上的图表回调设置为prevent_initial_call，不再在页面加载后逐个触发
+"""
+
+import json
+import threading
+import time
+from dash import no_update
+from plotly.io.json import to_json_plotly
+from .cache_manager import cache_manager
+
+
+def prepopulate(layout, targets, values):
+    """
+    把回调的输出值写入布局中对应组件的属性
+
+    Args:
+        layout: 页面布局组件
+        targets (list): 与回调Output顺序一致的(组件id, 属性)列表
+        values (tuple): 回调的输出值，no_update的属性保持不变
+    """
+    for (component_id, prop), value in zip(targets, values):
+        if value is not no_update:
+            setattr(layout[component_id], prop, value)
+
+
+class LayoutCache:
+    """
+    按路径缓存当前数据集版本的页面布局
+
+    缓存键为(版本, 路径)，版本变化时清空旧版本的布局；同一页面同时有多个请求未命中时只构建一次
+    """
+
+    def __init__(self):
+        self._layouts = cache_manager.cache('layouts')
+        self._lock = threading.Lock()
+        self._build_locks = {}
+
+    def get(self, pathname, version, build):
+        """
+        读取页面布局，未缓存时构建并序列化
+
+        Args:
+            pathname (str): 页面路径
+            version (str): 数据集版本
+            build (callable): 无参数的布局构建函数
+
+        Returns:
+            dict: 序列化后的布局（可直接作为回调输出）
+        """
+        key = (version, pathname)
+        layout = self._layouts.get(key)
+        if layout is not None:
+            return layout
+        with self._lock:
+            build_lock = self._build_locks.setdefault(pathname, threading.Lock())
+
+        with build_lock:
+            layout = self._layouts.get(key)
+            if layout is not None:
+                return layout
+            start = time.perf_counter()
+            layout = json.loads(to_json_plotly(build()))
+            self._layouts.retain(lambda k: k[0] == version)
+            self._layouts.put(key, layout, cost=time.perf_counter() - start)
+            return layout
+
+
+# 进程内唯一的布局缓存
+layout_cache = LayoutCache()
@@ -0,0 +1,174 @@
+"""
+实时数据导入模块
+后台线程监测data/raw下的原始文件：文件末尾追加的新行被增量清洗并追加到清洗后数据，
+文件被整体替换时重新导入该数据集。数据更新后数据集版本随之变化，
+预计算调度器立即为新版本生成派生数据，页面通过版本号轮询得知更新并追加图表数据
+"""
+
+import io
+import os
+import threading
+import time
+import pandas as pd
+from config import LIVE_POLL_SECONDS
+from .catalog import get_catalog
+from .get_data import get_raw_data_path
+from .clean_data import append_datasets, ingest_datasets, ingest_lock, get_cleaned_file, load_panel_store
+from .precompute import scheduler as precompute_scheduler
+
+
+class RawFileWatcher:
+    """
+    原始数据文件监测器
+
+    记录每个原始文件已读取到的字节位置，只读取其后新增的完整行；
+    文件变小或被替换（inode变化）时重新导入整个数据集
+    """
+
+    def __init__(self, poll_interval=LIVE_POLL_SECONDS):
+        """
+        Args:
+            poll_interval (float): 文件检查间隔（秒）
+        """
+        self.poll_interval = poll_interval
+        self.version = None
+        self.appended_rows = 0
+        self.reloaded = 0
+        self.last_update = None
+        self._positions = {}
+        self._columns = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        启动后台线程（守护线程，随进程退出）
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='raw-file-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        请求后台线程停止
+        """
+        self._stop.set()
+
+    def status(self):
+        """
+        获取监测器状态
+
+        Returns:
+            dict: 当前版本、累计追加行数、整体重新导入次数和最近一次更新时间
+        """
+        return {
+            'version': self.version,
+            'appended_rows': self.appended_rows,
+            'reloaded': self.reloaded,
+            'last_update': self.last_update,
+        }
+
+    def _read_new_rows(self, entry, path, offset, size):
+        """
+        读取文件offset之后新增的完整行
+
+        Returns:
+            tuple: (原始格式的新增行DataFrame或None, 新的读取位置)
+        """
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+
+        # 最后一行可能尚未写完，只读取到最后一个换行符
+        end = data.rfind(b'\n') + 1
+        if end == 0 or not data[:end].strip():
+            return None, offset + end
+        rows = pd.read_csv(
+            io.BytesIO(data[:end]), header=None, names=self._columns[entry['symbol']],
+            encoding=entry.get('encoding', 'utf-8')
+        )
+        return rows, offset + end
+
+    def _track(self, entry, path, stat):
+        """
+        从文件当前末尾开始跟踪
+        """
+        self._columns[entry['symbol']] = list(
+            pd.read_csv(path, nrows=0, encoding=entry.get('encoding', 'utf-8')).columns
+        )
+        self._positions[entry['symbol']] = (stat.st_ino, stat.st_size)
+
+    def run_once(self):
+        """
+        检查所有原始文件并导入变化（在调用线程中同步执行）
+
+        Returns:
+            dict: 数据集标识到追加的清洗后数据的映射
+        """
+        raw_path = get_raw_data_path()
+        new_rows = {}
+        reload_entries = []
+
+        for entry in get_catalog():
+            symbol = entry['symbol']
+            path = os.path.join(raw_path, entry['file'])
+            if not os.path.exists(path):
+                continue
+            stat = os.stat(path)
+
+            if symbol not in self._positions:
+                # 首次检查：原始文件比清洗后文件新时说明有未导入的数据
+                cleaned_file = get_cleaned_file(entry)
+                if os.path.exists(cleaned_file) and stat.st_mtime > os.path.getmtime(cleaned_file):
+                    reload_entries.append(entry)
+                self._track(entry, path, stat)
+                continue
+
+            inode, offset = self._positions[symbol]
+            if stat.st_ino != inode or stat.st_size < offset:
+                # 文件被替换或截断
+                reload_entries.append(entry)
+                self._track(entry, path, stat)
+            elif stat.st_size > offset:
+                rows, position = self._read_new_rows(entry, path, offset, stat.st_size)
+                self._positions[symbol] = (inode, position)
+                if rows is not None:
+                    new_rows[symbol] = rows
+
+        if reload_entries:
+            with ingest_lock():
+                ingest_datasets(reload_entries, max_workers=1)
+            self.reloaded += len(reload_entries)
+        appended = append_datasets(new_rows) if new_rows else {}
+
+        if reload_entries or appended:
+            self.appended_rows += sum(len(rows) for rows in appended.values())
+            self.last_update = time.time()
+            # 新版本的派生数据立即开始预计算
+            precompute_scheduler.notify()
+
+        self.version = load_panel_store().version
+        return appended
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Raw file watcher error: {e}")
+            self._stop.wait(self.poll_interval)
+
+
+# 进程内唯一的监测器
+watcher = RawFileWatcher()
+
+
+def start_raw_file_watcher():
+    """
+    启动进程内的原始数据文件监测器
+
+    Returns:
+        RawFileWatcher: 监测器实例
+    """
+    watcher.start()
+    return watcher
@@ -0,0 +1,359 @@
+"""
+派生数据预计算模块
+后台线程监测数据集版本，版本变化时按优先级预计算页面所需的派生数据并写入产物存储；
+回调通过get_*函数读取产物，尚未就绪的产物在回调中按需计算，并按(版本, 键)缓存在内存中
+"""
+
+import heapq
+import threading
+import time
+from functools import partial
+from config import PRECOMPUTE_POLL_SECONDS, LEAD_LAG_MAX_LAG
+from .artifacts import ArtifactStore
+from .cache_manager import cache_manager
+from .clean_data import load_panel_store
+from .catalog import get_dataset, get_market_dataset
+from .derived import (
+    resample_bars, aligned_rolling_correlation, normalized_close,
+    margin_measure, lead_lag_scan
+)
+from .cube import MarginCube
+from .tiles import SeriesTiles
+from .sketches import ReturnDistribution
+from .backtest import SWEEP_GRIDS, DEFAULT_COST_BPS, sweep_ma_crossover
+
+
+# 进程内共享的产物存储
+artifact_store = ArtifactStore()
+
+# 回调按需计算、未写入产物存储的结果：(版本, 产物键) -> 产物内容
+_on_demand = cache_manager.cache('on_demand')
+
+# 滚动相关性滑块的取值范围（与相关性页面一致）
+ROLLING_WINDOWS = range(20, 251, 10)
+DEFAULT_ROLLING_WINDOW = 60
+
+
+def get_or_compute(store, key, compute, persist=False):
+    """
+    读取当前版本的产物，未就绪时按需计算
+
+    不写入产物存储的结果保存在进程内存中（统一缓存管理器，重算耗时为实际计算耗时），
+    同一版本再次请求时直接返回；产物存储中已有的结果优先
+
+    Args:
+        store (PanelStore): 面板数据存储（提供版本号）
+        key (str): 产物键
+        compute (callable): 无参数的计算函数
+        persist (bool): 按需计算后是否写入产物存储
+
+    Returns:
+        object: 产物内容
+    """
+    value = artifact_store.get(store.version, key)
+    if value is not None:
+        return value
+    value = _on_demand.get((store.version, key))
+    if value is not None:
+        if persist:
+            artifact_store.put(store.version, key, value)
+            _on_demand.pop((store.version, key))
+        return value
+
+    start = time.perf_counter()
+    value = compute()
+    if persist:
+        artifact_store.put(store.version, key, value)
+    else:
+        # 只保留当前版本的结果
+        _on_demand.retain(lambda k: k[0] == store.version)
+        _on_demand.put((store.version, key), value, cost=time.perf_counter() - start)
+    return value
+
+
+def get_resampled(store, symbol, period, persist=False):
+    """
+    获取重采样后的K线数据（日线直接返回原数据）
+    """
+    if period == 'daily':
+        return store.get(symbol)
+    return get_or_compute(
+        store, f'resample/{symbol}/{period}',
+        lambda: resample_bars(store.get(symbol), period, store.calendar.period_groups(symbol, period)), persist
+    )
+
+
+def get_rolling_correlation(store, symbol_a, symbol_b, window, persist=False):
+    """
+    获取两个指数的滚动相关系数序列
+    """
+    return get_or_compute(
+        store, f'rolling_corr/{symbol_a}/{symbol_b}/{window}',
+        lambda: aligned_rolling_correlation(*store.align([symbol_a, symbol_b], 'close', how='inner'), window), persist
+    )
+
+
+def get_margin_cube(store, persist=True):
+    """
+    获取融资融券预聚合立方体
+
+    每个数据集版本只构建一次：调度器尚未完成或未启用（PRECOMPUTE_ENABLED=False）时，
+    首次按需构建的结果同样写入产物存储，供其他服务进程和后台任务进程复用
+    """
+    return get_or_compute(store, 'margin_cube', lambda: MarginCube(store), persist)
+
+
+def get_margin_pivot(store, symbol, column='margin_balance', statistic='mean', grain='month'):
+    """
+    获取融资融券 年内周期 × 年份 透视表（单位：亿元/亿股），由立方体切片得到
+    """
+    return get_margin_cube(store).pivot(symbol, column, statistic, grain) / 100000000
+
+
+def get_series_tiles(store, symbol, persist=True):
+    """
+    获取序列的多分辨率瓦片
+
+    缩放、平移回调每次都会读取瓦片，调度器尚未生成时首次按需构建的结果也写入产物存储，
+    每个数据集版本只构建一次
+    """
+    return get_or_compute(store, f'tiles/{symbol}', lambda: SeriesTiles(store, symbol), persist)
+
+
+def get_return_distribution(store, symbol, period, persist=True):
+    """
+    获取某周期涨跌幅按自然月、自然年分桶的分位数草图
+
+    每次修改日期区间都会读取草图，调度器尚未生成时首次按需构建的结果也写入产物存储，
+    每个数据集版本只构建一次
+    """
+    def compute():
+        bars = get_resampled(store, symbol, period)
+        return ReturnDistribution(bars['date'].to_numpy(), bars['change_pct'].to_numpy())
+    return get_or_compute(store, f'distribution/{symbol}/{period}', compute, persist)
+
+
+def get_normalized(store, symbol, period, persist=False):
+    """
+    获取全历史标准化收盘价序列（按区间使用时需重新定基）
+    """
+    return get_or_compute(
+        store, f'normalized/{symbol}/{period}',
+        lambda: normalized_close(get_resampled(store, symbol, period)), persist
+    )
+
+
+def get_margin_index_aligned(store, margin_symbol, index_symbol, measure):
+    """
+    融资融券指标与指数日涨跌幅按共同交易日对齐
+
+    Returns:
+        tuple: (日期数组, 形状为(交易日数, 2)的数组：融资融券指标、指数涨跌幅)
+    """
+    keep, values = store.calendar.align({
+        margin_symbol: margin_measure(store.get(margin_symbol), measure),
+        index_symbol: store.column(index_symbol, 'change_pct'),
+    }, how='inner')
+    return store.calendar.dates[keep], values
+
+
+def get_lead_lag(store, margin_symbol, index_symbol, measure, window=None, persist=False):
+    """
+    获取融资融券指标与指数收益率在±LEAD_LAG_MAX_LAG内的领先/滞后相关系数
+    """
+    return get_or_compute(
+        store, f"lead_lag/{margin_symbol}/{index_symbol}/{measure}/{window or 'full'}",
+        lambda: lead_lag_scan(
+            get_margin_index_aligned(store, margin_symbol, index_symbol, measure)[1], LEAD_LAG_MAX_LAG, window
+        ), persist
+    )
+
+
+def get_ma_sweep(store, symbol, grid, cost_bps, persist=False):
+    """
+    获取均线窗口组合的参数扫描结果（grid为SWEEP_GRIDS中的网格名称）
+    """
+    return get_or_compute(
+        store, f'ma_sweep/{symbol}/{grid}/{cost_bps:g}',
+        lambda: sweep_ma_crossover(
+            store.get(symbol, columns=['close'])['close'].to_numpy(dtype='float64'), SWEEP_GRIDS[grid], cost_bps
+        ), persist
+    )
+
+
+def build_jobs(store):
+    """
+    生成预计算任务列表，优先级数值越小越先执行
+
+    Args:
+        store (PanelStore): 面板数据存储
+
+    Returns:
+        list: (优先级, 名称, 任务函数)列表
+    """
+    index_symbols = store.symbols('index')
+    margin_symbols = store.symbols('margin')
+    jobs = []
+
+    # 优先级0：各页面默认视图所需的数据
+    for symbol in index_symbols:
+        for period in ('weekly', 'monthly'):
+            jobs.append((0, f'resample/{symbol}/{period}',
+                         partial(get_resampled, store, symbol, period, True)))
+    if margin_symbols:
+        jobs.append((0, 'margin_cube', partial(get_margin_cube, store, True)))
+    for symbol in index_symbols + margin_symbols:
+        jobs.append((0, f'tiles/{symbol}', partial(get_series_tiles, store, symbol, True)))
+    if len(index_symbols) >= 2:
+        pair = index_symbols[0], index_symbols[1]
+        jobs.append((0, f'rolling_corr/{pair[0]}/{pair[1]}/{DEFAULT_ROLLING_WINDOW}',
+                     partial(get_rolling_correlation, store, *pair, DEFAULT_ROLLING_WINDOW, True)))
+
+    # 优先级1：标准化对比序列
+    for symbol in index_symbols:
+        for period in ('daily', 'weekly', 'monthly'):
+            jobs.append((1, f'normalized/{symbol}/{period}',
+                         partial(get_normalized, store, symbol, period, True)))
+
+    # 优先级1：涨跌幅分布草图
+    for symbol in index_symbols:
+        for period in ('daily', 'weekly', 'monthly'):
+            jobs.append((1, f'distribution/{symbol}/{period}',
+                         partial(get_return_distribution, store, symbol, period, True)))
+
+    # 优先级1：各融资融券数据与同市场指数的全历史领先/滞后相关
+    for symbol in margin_symbols:
+        index_symbol = get_market_dataset('index', get_dataset(symbol)['market'])
+        if index_symbol in index_symbols:
+            jobs.append((1, f'lead_lag/{symbol}/{index_symbol}/margin_balance_change/full',
+                         partial(get_lead_lag, store, symbol, index_symbol, 'margin_balance_change', None, True)))
+
+    # 优先级2：回测页面默认网格和成本下的参数扫描
+    for symbol in index_symbols:
+        jobs.append((2, f'ma_sweep/{symbol}/coarse/{DEFAULT_COST_BPS:g}',
+                     partial(get_ma_sweep, store, symbol, 'coarse', DEFAULT_COST_BPS, True)))
+
+    # 优先级2：默认指数对在滑块其他取值下的滚动相关系数
+    if len(index_symbols) >= 2:
+        for window in ROLLING_WINDOWS:
+            if window != DEFAULT_ROLLING_WINDOW:
+                jobs.append((2, f'rolling_corr/{pair[0]}/{pair[1]}/{window}',
+                             partial(get_rolling_correlation, store, *pair, window, True)))
+
+    return jobs
+
+
+class PrecomputeScheduler:
+    """
+    后台预计算调度器
+
+    每隔poll_interval秒检查一次数据集版本；版本变化时清理旧版本产物，
+    并按优先级依次执行新版本的预计算任务。任务执行期间若版本再次变化，
+    剩余任务作废并针对新版本重新排队
+    """
+
+    def __init__(self, poll_interval=PRECOMPUTE_POLL_SECONDS):
+        """
+        Args:
+            poll_interval (float): 版本检查间隔（秒）
+        """
+        self.poll_interval = poll_interval
+        self.version = None
+        self.completed = 0
+        self.pending = 0
+        self.failed = 0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        启动后台线程（守护线程，随进程退出）
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='precompute', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        请求后台线程停止
+        """
+        self._stop.set()
+        self._wake.set()
+
+    def notify(self):
+        """
+        数据已更新，立即开始下一轮检查而不等待轮询间隔
+        """
+        self._wake.set()
+
+    def status(self):
+        """
+        获取调度器状态
+
+        Returns:
+            dict: 当前版本、本版本已完成、待执行和失败的任务数
+        """
+        return {
+            'version': self.version,
+            'completed': self.completed,
+            'pending': self.pending,
+            'failed': self.failed,
+        }
+
+    def run_once(self):
+        """
+        检查版本并执行当前版本尚未完成的全部任务（在调用线程中同步执行）
+        """
+        store = load_panel_store()
+        if store.version != self.version:
+            self.version = store.version
+            self.completed = self.failed = 0
+            artifact_store.prune(store.version)
+
+        # 任务名称即产物键，已就绪的产物无需重复计算
+        queue = [
+            (priority, seq, name, job)
+            for seq, (priority, name, job) in enumerate(build_jobs(store))
+            if not artifact_store.has(store.version, name)
+        ]
+        heapq.heapify(queue)
+        self.pending = len(queue)
+
+        while queue and not self._stop.is_set():
+            _, _, name, job = heapq.heappop(queue)
+            try:
+                job()
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Precompute job {name} failed: {e}")
+            self.pending = len(queue)
+
+            # 数据已更新则放弃剩余任务，下一轮针对新版本重新排队
+            if load_panel_store().version != store.version:
+                break
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Precompute scheduler error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+
+# 进程内唯一的调度器
+scheduler = PrecomputeScheduler()
+
+
+def start_precompute_scheduler():
+    """
+    启动进程内的后台预计算调度器
+
+    Returns:
+        PrecomputeScheduler: 调度器实例
+    """
+    scheduler.start()
+    return scheduler
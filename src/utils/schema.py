@@ -0,0 +1,188 @@
+"""
+数据类型模式模块
+为清洗后的指数数据和融资融券数据声明紧凑的列类型，
+在写入磁盘和加载到内存时统一应用，并提供内存占用对比报告
+
+运行方式:
+    python -m src.utils.schema
+"""
+
+import numpy as np
+import pandas as pd
+from . import kernels
+from .catalog import get_markets
+
+
+# 市场代码：磁盘上以小整数存储，内存中为分类类型（按数据集目录中的出现顺序编号）
+MARKET_CODES = {market: code for code, market in enumerate(get_markets())}
+
+# 指数数据列类型：原始价格有4位小数，float32（约7位有效数字）无法精确表示上千点的价格，
+# 价格与成交量/成交额保留float64；涨跌幅和均线是由收盘价计算的展示值，使用float32
+INDEX_SCHEMA = {
+    'close': 'float64',
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'vol': 'float64',
+    'amount': 'float64',
+    'change_pct': 'float32',
+    'ma5': 'float32',
+    'ma10': 'float32',
+    'ma20': 'float32',
+    'ma60': 'float32',
+}
+
+# 融资融券数据列类型（余额与金额均为整数元）
+MARGIN_SCHEMA = {
+    'financing_balance': 'int64',
+    'financing_purchase': 'int64',
+    'financing_redeem': 'int64',
+    'securities_lending_balance': 'int64',
+    'securities_lending_sell': 'int64',
+    'securities_lending_shares': 'int64',
+    'margin_balance': 'int64',
+    'margin_balance_change': 'float32',
+}
+
+# 各数据类型对应的模式
+SCHEMAS = {
+    'index': INDEX_SCHEMA,
+    'margin': MARGIN_SCHEMA,
+}
+
+# 移动平均线窗口，对应的ma列可由收盘价重新计算，不写入磁盘
+MA_WINDOWS = (5, 10, 20, 60)
+INDEX_DERIVED_COLUMNS = [f'ma{window}' for window in MA_WINDOWS]
+
+
+def add_moving_averages(df):
+    """
+    根据收盘价计算移动平均线列（原地添加）
+
+    Args:
+        df (pd.DataFrame): 按日期升序排列的指数数据
+
+    Returns:
+        pd.DataFrame: 添加了ma列的数据
+    """
+    close = df['close'].to_numpy(dtype='float64')
+    for window in MA_WINDOWS:
+        df[f'ma{window}'] = kernels.rolling_mean(close, window).astype('float32')
+    return df
+
+
+def apply_schema(df, schema):
+    """
+    将数据转换为模式声明的紧凑类型
+
+    Args:
+        df (pd.DataFrame): 清洗后的数据
+        schema (dict): 列名到类型的映射
+
+    Returns:
+        pd.DataFrame: 类型转换后的数据
+    """
+    dtypes = {col: dtype for col, dtype in schema.items() if col in df.columns}
+    df = df.astype(dtypes, copy=False)
+
+    if 'market' in df.columns:
+        unknown = set(df['market'].dropna().unique()) - set(MARKET_CODES)
+        if unknown:
+            raise ValueError(f"Markets not in DATASET_CATALOG: {sorted(unknown)}")
+        df['market'] = pd.Categorical(df['market'], categories=list(MARKET_CODES))
+
+    return df
+
+
+def to_disk_frame(df):
+    """
+    转换为磁盘存储格式：去掉可重算的ma列，市场名称编码为小整数
+
+    Args:
+        df (pd.DataFrame): 已应用模式的数据
+
+    Returns:
+        pd.DataFrame: 用于写入磁盘的数据
+    """
+    df_disk = df.drop(columns=[col for col in INDEX_DERIVED_COLUMNS if col in df.columns])
+
+    if 'market' in df_disk.columns:
+        df_disk['market'] = df_disk['market'].map(MARKET_CODES).astype('int8')
+
+    return df_disk
+
+
+def from_disk_frame(df, schema):
+    """
+    将磁盘读取的数据还原为内存格式
+
+    Args:
+        df (pd.DataFrame): 从cleaned目录读取的数据
+        schema (dict): 列名到类型的映射
+
+    Returns:
+        pd.DataFrame: 应用模式后的数据
+    """
+    df['date'] = pd.to_datetime(df['date'])
+
+    # 兼容旧格式：market列可能仍是市场名称字符串
+    if 'market' in df.columns and pd.api.types.is_numeric_dtype(df['market']):
+        labels = np.array(list(MARKET_CODES), dtype=object)
+        df['market'] = labels[df['market'].to_numpy()]
+
+    if schema is INDEX_SCHEMA and 'ma5' not in df.columns:
+        add_moving_averages(df)
+
+    return apply_schema(df, schema)
+
+
+def memory_report(before, after):
+    """
+    生成各数据表类型转换前后的内存占用报告
+
+    Args:
+        before (dict): 表名到转换前DataFrame的映射
+        after (dict): 表名到转换后DataFrame的映射
+
+    Returns:
+        pd.DataFrame: 每张表转换前后的字节数及节省比例
+    """
+    rows = []
+    for name in before:
+        bytes_before = int(before[name].memory_usage(deep=True).sum())
+        bytes_after = int(after[name].memory_usage(deep=True).sum())
+        rows.append({
+            'table': name,
+            'rows': len(after[name]),
+            'bytes_before': bytes_before,
+            'bytes_after': bytes_after,
+            'saving_pct': (1 - bytes_after / bytes_before) * 100
+        })
+
+    report = pd.DataFrame(rows)
+    total = {
+        'table': 'total',
+        'rows': report['rows'].sum(),
+        'bytes_before': report['bytes_before'].sum(),
+        'bytes_after': report['bytes_after'].sum(),
+    }
+    total['saving_pct'] = (1 - total['bytes_after'] / total['bytes_before']) * 100
+
+    return pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+
+
+if __name__ == '__main__':
+    from .catalog import get_catalog
+    from .get_data import load_all_data
+    from .clean_data import clean_dataset
+
+    raw_data = load_all_data()
+    before = {
+        entry['symbol']: clean_dataset(raw_data[entry['symbol']], entry)
+        for entry in get_catalog()
+    }
+    after = {
+        entry['symbol']: apply_schema(before[entry['symbol']].copy(), SCHEMAS[entry['kind']])
+        for entry in get_catalog()
+    }
+    print(memory_report(before, after).to_string(index=False))
@@ -0,0 +1,95 @@
+"""
+服务端会话存储模块
+回调的中间结果（当前显示的数据切片、计算好的指标等）按(会话标识, 名称)保存在服务端，
+浏览器只保存一个很小的会话标识（session-id）。后续回调凭会话标识直接取用这些中间结果，
+大块数据不必序列化为JSON经浏览器往返
+
+安装diskcache时保存在本地磁盘缓存中，由服务进程和后台任务进程共享，总容量有上限；
+否则保存在进程内存中（统一缓存管理器中的命名缓存），条目数有上限，内存不足时优先淘汰。
+磁盘缓存保留最近写入的数据，内存中保留最近读写的数据
+"""
+
+import os
+from config import SESSION_STORE_PATH, SESSION_STORE_SIZE_LIMIT, SESSION_STORE_MAX_ENTRIES, SESSION_STORE_EXPIRE
+from .cache_manager import cache_manager
+
+
+class SessionStore:
+    """
+    按会话保存中间结果
+
+    每个条目可附带一个标签（如生成该结果的输入参数和数据版本），读取时标签不一致视为不存在，
+    避免取到与当前输入不对应的旧结果
+    """
+
+    def __init__(self):
+        self._cache = None
+        self._cache_created = False
+        # 中间结果可由回调重新生成，重算耗时记为0，内存不足时最先淘汰
+        self._local = cache_manager.cache('sessions', max_entries=SESSION_STORE_MAX_ENTRIES)
+
+    def _disk_cache(self):
+        """
+        获取磁盘缓存，未安装diskcache时为None
+        """
+        if not self._cache_created:
+            self._cache_created = True
+            try:
+                import diskcache
+                current_dir = os.path.dirname(os.path.abspath(__file__))
+                project_root = os.path.dirname(os.path.dirname(current_dir))
+                self._cache = diskcache.Cache(
+                    os.path.join(project_root, SESSION_STORE_PATH),
+                    size_limit=SESSION_STORE_SIZE_LIMIT,
+                    eviction_policy='least-recently-stored'
+                )
+            except ImportError:
+                self._cache = None
+        return self._cache
+
+    def put(self, session_id, name, value, tag=None):
+        """
+        保存中间结果（会话标识为空时不保存）
+
+        Args:
+            session_id (str): 浏览器会话标识
+            name (str): 结果名称
+            value: 结果（需可pickle）
+            tag: 结果的标签，读取时需一致
+        """
+        if not session_id:
+            return
+        key = ('session', session_id, name)
+        cache = self._disk_cache()
+        if cache is not None:
+            cache.set(key, (tag, value), expire=SESSION_STORE_EXPIRE)
+            return
+        self._local.put(key, (tag, value))
+
+    def get(self, session_id, name, tag=None):
+        """
+        读取中间结果
+
+        Args:
+            session_id (str): 浏览器会话标识
+            name (str): 结果名称
+            tag: 期望的标签
+
+        Returns:
+            object: 结果，不存在、已被淘汰或标签不一致时为None
+        """
+        if not session_id:
+            return None
+        key = ('session', session_id, name)
+        cache = self._disk_cache()
+        if cache is not None:
+            entry = cache.get(key)
+        else:
+            entry = self._local.get(key)
+        if entry is None or entry[0] != tag:
+            return None
+        return entry[1]
+
+
+# 进程内唯一的会话存储
+session_store = SessionStore()
@@ -0,0 +1,268 @@
+"""
+可合并的分位数草图模块（t-digest）
+草图用按均值排序的质心（均值、权重）近似一组数值的分布：分布两端的质心很小（尾部分位数精确），
+中间的质心较大，质心数约为compression / 2，与样本数无关。两个草图合并即把质心放在一起重新压缩，
+因此预先按自然月、自然年为每个序列生成草图后，任意日期区间的分布只需合并区间内的少量草图，
+再加上区间两端不足整月的原始收益率，不必对区间内的原始数据重新排序
+"""
+
+import numpy as np
+import pandas as pd
+from config import SKETCH_COMPRESSION
+
+
+class QuantileSketch:
+    """
+    t-digest分位数草图
+
+    除质心外另存最小值、最大值以及数值和、平方和，均值和标准差是精确的
+    """
+
+    def __init__(self, means=None, weights=None, minimum=np.nan, maximum=np.nan, total=0.0, total_sq=0.0,
+                 compression=SKETCH_COMPRESSION):
+        """
+        Args:
+            means (np.ndarray): 按升序排列的质心均值
+            weights (np.ndarray): 质心权重（样本数）
+            compression (int): 压缩参数，越大质心越多、分位数越精确
+        """
+        self.means = np.empty(0) if means is None else np.asarray(means, dtype='float64')
+        self.weights = np.empty(0) if weights is None else np.asarray(weights, dtype='float64')
+        self.minimum = minimum
+        self.maximum = maximum
+        self.total = total
+        self.total_sq = total_sq
+        self.compression = compression
+
+    @classmethod
+    def from_values(cls, values, compression=SKETCH_COMPRESSION):
+        """
+        由原始数值生成草图（忽略缺失值）
+
+        Args:
+            values (np.ndarray): 数值序列
+            compression (int): 压缩参数
+
+        Returns:
+            QuantileSketch: 草图
+        """
+        values = np.sort(np.asarray(values, dtype='float64'))
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return cls(compression=compression)
+        means, weights = _compress(values, np.ones(len(values)), compression)
+        return cls(means, weights, values[0], values[-1], values.sum(), (values * values).sum(), compression)
+
+    @classmethod
+    def merge(cls, sketches, values=None, compression=SKETCH_COMPRESSION):
+        """
+        合并多个草图（以及可选的原始数值）
+
+        Args:
+            sketches (list): 草图列表
+            values (np.ndarray): 一并加入的原始数值
+            compression (int): 压缩参数
+
+        Returns:
+            QuantileSketch: 合并后的草图
+        """
+        parts = [sketch for sketch in sketches if sketch.count]
+        if values is not None and len(values):
+            parts.append(cls.from_values(values, compression))
+        if not parts:
+            return cls(compression=compression)
+        if len(parts) == 1:
+            return parts[0]
+
+        means = np.concatenate([sketch.means for sketch in parts])
+        weights = np.concatenate([sketch.weights for sketch in parts])
+        order = np.argsort(means, kind='stable')
+        means, weights = _compress(means[order], weights[order], compression)
+        return cls(
+            means, weights,
+            min(sketch.minimum for sketch in parts), max(sketch.maximum for sketch in parts),
+            sum(sketch.total for sketch in parts), sum(sketch.total_sq for sketch in parts), compression
+        )
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    def std(self):
+        """
+        样本标准差
+        """
+        n = self.count
+        if n < 2:
+            return np.nan
+        return float(np.sqrt(max(self.total_sq - self.total * self.total / n, 0.0) / (n - 1)))
+
+    def _knots(self):
+        """
+        分段线性插值的节点：(排名, 数值)。质心中心的排名为其覆盖样本排名（0到count - 1）的平均，
+        两端为最小值和最大值；全部为单样本质心时与np.quantile的线性插值一致
+        """
+        centers = np.cumsum(self.weights) - self.weights / 2 - 0.5
+        ranks = np.concatenate([[0.0], centers, [self.count - 1]])
+        values = np.concatenate([[self.minimum], self.means, [self.maximum]])
+        return ranks, values
+
+    def quantile(self, q):
+        """
+        分位数
+
+        Args:
+            q (float | np.ndarray): 0到1之间的分位点
+
+        Returns:
+            float | np.ndarray: 对应的分位数，草图为空时为NaN
+        """
+        if not self.count:
+            return np.full(np.shape(q), np.nan)[()]
+        ranks, values = self._knots()
+        return np.interp(np.asarray(q, dtype='float64') * (self.count - 1), ranks, values)
+
+    def cdf(self, x):
+        """
+        累计分布函数：不超过x的样本比例（最小值以下为0，最大值以上为1）
+        """
+        if not self.count:
+            return np.full(np.shape(x), np.nan)[()]
+        ranks, values = self._knots()
+        return (np.interp(x, values, ranks, left=-0.5, right=self.count - 0.5) + 0.5) / self.count
+
+    def histogram(self, edges):
+        """
+        各区间的样本数（近似）
+
+        Args:
+            edges (np.ndarray): 升序的区间边界
+
+        Returns:
+            np.ndarray: 长度为len(edges) - 1的样本数
+        """
+        return np.diff(self.cdf(np.asarray(edges, dtype='float64'))) * self.count
+
+    def tail_mean(self, q):
+        """
+        最低q比例样本的均值（按质心近似，穿过分位点的质心按比例计入）
+        """
+        if not self.count or q <= 0:
+            return np.nan
+        target = q * self.count
+        before = np.cumsum(self.weights) - self.weights
+        taken = np.clip(target - before, 0.0, self.weights)
+        return float((taken * self.means).sum() / taken.sum())
+
+    def value_at_risk(self, level):
+        """
+        历史模拟法的在险价值与预期损失（以正数表示损失）
+
+        Args:
+            level (float): 置信水平，如0.95
+
+        Returns:
+            tuple: (VaR, 预期损失ES)
+        """
+        return -float(self.quantile(1 - level)), -self.tail_mean(1 - level)
+
+
+def _compress(means, weights, compression):
+    """
+    把按均值排序的质心压缩为t-digest质心：按k1刻度函数
+    k(q) = compression / (2π) · arcsin(2q - 1)，把左端累计比例q落在同一个单位k区间内的相邻质心合并
+    """
+    total = weights.sum()
+    left = (np.cumsum(weights) - weights) / total
+    scale = np.floor(compression / (2 * np.pi) * np.arcsin(2 * left - 1))
+    starts = np.flatnonzero(np.r_[True, scale[1:] != scale[:-1]])
+    merged = np.add.reduceat(weights, starts)
+    return np.add.reduceat(means * weights, starts) / merged, merged
+
+
+class ReturnDistribution:
+    """
+    单个序列某一周期涨跌幅的分桶草图
+
+    每个自然月（按K线日期）一个草图，每个自然年一个由其各月草图合并的草图；
+    查询日期区间时取区间内的完整年、不在完整年内的完整月，以及两端不足整月的原始涨跌幅
+    """
+
+    def __init__(self, dates, returns, compression=SKETCH_COMPRESSION):
+        """
+        Args:
+            dates (np.ndarray): 升序的K线日期
+            returns (np.ndarray): 对应的涨跌幅（%），缺失值忽略
+            compression (int): 压缩参数
+        """
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        returns = np.asarray(returns, dtype='float64')
+        keep = ~np.isnan(returns)
+        self.dates, self.returns = dates[keep], returns[keep]
+        self.compression = compression
+
+        # 各月首行行号（末尾追加总行数作为最后一个月的结束）和各年首月序号
+        months = self.dates.astype('datetime64[M]')
+        self.month_bounds = np.append(np.flatnonzero(np.r_[True, months[1:] != months[:-1]]), len(months))
+        years = months[self.month_bounds[:-1]].astype('datetime64[Y]')
+        self.year_bounds = np.append(np.flatnonzero(np.r_[True, years[1:] != years[:-1]]), len(years))
+
+        self.month_sketches = [
+            QuantileSketch.from_values(self.returns[a:b], compression)
+            for a, b in zip(self.month_bounds[:-1], self.month_bounds[1:])
+        ]
+        self.year_sketches = [
+            QuantileSketch.merge(self.month_sketches[a:b], compression=compression)
+            for a, b in zip(self.year_bounds[:-1], self.year_bounds[1:])
+        ]
+
+    def _row_range(self, start_date=None, end_date=None):
+        start = 0 if start_date is None else int(np.searchsorted(self.dates, pd.Timestamp(start_date).to_datetime64(), 'left'))
+        stop = len(self.dates) if end_date is None else int(np.searchsorted(self.dates, pd.Timestamp(end_date).to_datetime64(), 'right'))
+        return start, max(start, stop)
+
+    def cover(self, start_date=None, end_date=None):
+        """
+        区间对应的草图和原始涨跌幅
+
+        Returns:
+            tuple: (草图列表, 原始涨跌幅数组)
+        """
+        lo, hi = self._row_range(start_date, end_date)
+        # 完全落在区间内的月份[m_first, m_last)
+        m_first = int(np.searchsorted(self.month_bounds, lo, 'left'))
+        m_last = int(np.searchsorted(self.month_bounds, hi, 'right')) - 1
+        if m_first >= m_last:
+            return [], self.returns[lo:hi]
+
+        # 完全落在这些月份内的年份[y_first, y_last)
+        y_first = int(np.searchsorted(self.year_bounds, m_first, 'left'))
+        y_last = int(np.searchsorted(self.year_bounds, m_last, 'right')) - 1
+        if y_first >= y_last:
+            sketches = self.month_sketches[m_first:m_last]
+        else:
+            sketches = (self.month_sketches[m_first:self.year_bounds[y_first]]
+                        + self.year_sketches[y_first:y_last]
+                        + self.month_sketches[self.year_bounds[y_last]:m_last])
+        edges = np.concatenate([
+            self.returns[lo:self.month_bounds[m_first]],
+            self.returns[self.month_bounds[m_last]:hi],
+        ])
+        return sketches, edges
+
+    def sketch(self, start_date=None, end_date=None):
+        """
+        区间内涨跌幅的草图
+
+        Args:
+            start_date: 起始日期，为None时不限
+            end_date: 结束日期，为None时不限
+
+        Returns:
+            QuantileSketch: 合并后的草图
+        """
+        sketches, edges = self.cover(start_date, end_date)
+        return QuantileSketch.merge(sketches, edges, self.compression)
@@ -0,0 +1,155 @@
+"""
+清洗后数据的版本化快照模块
+每次写入（全量清洗、重新导入、增量追加）都生成一个新的快照目录：
+    <cleaned目录>/snapshots/<version>/<symbol>_clean.csv、<symbol>_validation.json
+快照先写在暂存目录中，写完后重命名为以内容哈希命名的版本目录，此后不再修改；
+再以临时文件 + 原子替换更新指针文件CURRENT完成发布。
+读者读一次CURRENT即固定到该版本，无需加锁，不会读到写了一半的文件或新旧混合的数据
+"""
+
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from config import SNAPSHOT_KEEP
+
+
+# 快照子目录、指针文件和暂存目录前缀
+SNAPSHOT_DIR = 'snapshots'
+POINTER_FILE = 'CURRENT'
+STAGING_PREFIX = '.staging-'
+
+
+def _link_or_copy(src, dst):
+    """
+    把未变化的文件带入新快照：优先硬链接（不占额外空间），文件系统不支持时复制
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class SnapshotStore:
+    """
+    cleaned目录下的快照集合
+
+    写入方需持有cleaned目录写锁（见clean_data.ingest_lock），读取方不需要任何锁。
+    旧快照保留最近keep个，供仍在读取旧版本的进程完成读取
+    """
+
+    def __init__(self, root, keep=SNAPSHOT_KEEP):
+        """
+        Args:
+            root (str): cleaned目录
+            keep (int): 当前版本之外保留的旧快照数
+        """
+        self.root = root
+        self.keep = keep
+        self.snapshot_root = os.path.join(root, SNAPSHOT_DIR)
+
+    def current(self):
+        """
+        读取当前发布的版本号
+
+        Returns:
+            str: 版本号，尚未发布任何快照时为None
+        """
+        try:
+            with open(os.path.join(self.root, POINTER_FILE), encoding='ascii') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def path(self, version=None):
+        """
+        快照目录路径
+
+        Args:
+            version (str): 版本号，为None时使用当前发布的版本
+
+        Returns:
+            str: 快照目录的绝对路径，尚未发布任何快照时为None
+        """
+        version = version or self.current()
+        return os.path.join(self.snapshot_root, version) if version else None
+
+    @contextmanager
+    def writer(self, base=None, exclude=()):
+        """
+        在暂存目录中写入新快照，正常退出时发布，出错时丢弃
+
+        Args:
+            base (str): 基础版本号，其中除exclude外的文件带入新快照；为None时使用当前版本
+            exclude (iterable): 由调用方重新写入、不从基础版本带入的文件名
+
+        Yields:
+            str: 暂存目录路径
+        """
+        staging = os.path.join(self.snapshot_root, f'{STAGING_PREFIX}{uuid.uuid4().hex}')
+        os.makedirs(staging)
+        try:
+            base_path = self.path(base)
+            if base_path and os.path.isdir(base_path):
+                exclude = set(exclude)
+                for name in os.listdir(base_path):
+                    if name not in exclude:
+                        _link_or_copy(os.path.join(base_path, name), os.path.join(staging, name))
+            yield staging
+            self._publish(staging)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _content_version(self, staging):
+        """
+        由目录内各文件的名称和内容计算12位十六进制版本号，内容相同的快照版本号相同
+        """
+        digest = hashlib.sha1()
+        for name in sorted(os.listdir(staging)):
+            digest.update(name.encode('utf-8') + b'\0')
+            with open(os.path.join(staging, name), 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        return digest.hexdigest()[:12]
+
+    def _publish(self, staging):
+        """
+        把暂存目录固定为版本目录，并原子地切换指针
+        """
+        version = self._content_version(staging)
+        target = self.path(version)
+        if not os.path.isdir(target):
+            os.rename(staging, target)
+        # 目录修改时间记录最近一次发布，清理旧快照时按此排序
+        os.utime(target)
+
+        pointer = os.path.join(self.root, POINTER_FILE)
+        tmp_path = f'{pointer}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='ascii') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, pointer)
+        self.prune(version)
+        return version
+
+    def prune(self, keep_version):
+        """
+        删除较早的快照，以及写入方中途退出留下的暂存目录（需持有写锁）
+
+        Args:
+            keep_version (str): 当前版本号
+        """
+        versions = []
+        for name in os.listdir(self.snapshot_root):
+            path = os.path.join(self.snapshot_root, name)
+            if name.startswith(STAGING_PREFIX):
+                # 本进程正在写入的暂存目录修改时间很近，只清理一小时前的
+                if time.time() - os.path.getmtime(path) > 3600:
+                    shutil.rmtree(path, ignore_errors=True)
+            elif name != keep_version:
+                versions.append((os.path.getmtime(path), path))
+        for _, path in sorted(versions, reverse=True)[self.keep:]:
+            shutil.rmtree(path, ignore_errors=True)
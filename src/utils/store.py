@@ -0,0 +1,130 @@
+"""
+面板数据存储模块
+将同一类型的所有数据序列按(symbol, date)排序拼接为长格式面板，
+并记录每个序列的行区间，使单序列查询只需切片而无需过滤整表；
+所有序列共享一个交易日历，日期区间查找和跨序列对齐通过整数位置映射完成
+"""
+
+import numpy as np
+import pandas as pd
+from .catalog import get_catalog
+from .trading_calendar import TradingCalendar
+
+
+class PanelStore:
+    """
+    长格式面板数据存储
+
+    每种数据类型（index/margin）一张面板，行按symbol、date排序；
+    offsets记录每个序列在面板中的[start, stop)行区间，calendar为所有序列共享的交易日历
+    """
+
+    def __init__(self, tables, version=None):
+        """
+        Args:
+            tables (dict): 数据集标识到清洗后DataFrame的映射
+            version (str): 数据集版本号
+        """
+        self.version = version
+        self.panels = {}
+        self.offsets = {}
+        self.kinds = {}
+
+        for kind in dict.fromkeys(entry['kind'] for entry in get_catalog()):
+            symbols = [entry['symbol'] for entry in get_catalog(kind) if entry['symbol'] in tables]
+            if not symbols:
+                continue
+
+            frames = []
+            start = 0
+            for symbol in symbols:
+                df = tables[symbol]
+                frames.append(df)
+                self.offsets[symbol] = (start, start + len(df))
+                self.kinds[symbol] = kind
+                start += len(df)
+
+            panel = pd.concat(frames, ignore_index=True)
+            panel.insert(0, 'symbol', pd.Categorical(
+                np.repeat(symbols, [len(tables[s]) for s in symbols]), categories=symbols
+            ))
+            self.panels[kind] = panel
+
+        self.calendar = TradingCalendar({
+            symbol: self.panels[kind]['date'].to_numpy()[slice(*self.offsets[symbol])]
+            for symbol, kind in self.kinds.items()
+        })
+
+    def symbols(self, kind=None):
+        """
+        获取已加载的数据集标识
+
+        Args:
+            kind (str): 数据类型，为None时返回全部
+
+        Returns:
+            list: 数据集标识列表
+        """
+        return [symbol for symbol, k in self.kinds.items() if kind is None or k == kind]
+
+    def get(self, symbol, start_date=None, end_date=None, columns=None):
+        """
+        查询单个序列，可按日期区间和列筛选
+
+        Args:
+            symbol (str): 数据集标识
+            start_date: 起始日期（含），为None时不限
+            end_date: 结束日期（含），为None时不限
+            columns (list): 需要的列，为None时返回全部（不含symbol列）
+
+        Returns:
+            pd.DataFrame: 查询结果，索引从0开始
+        """
+        kind = self.kinds[symbol]
+        start, stop = self.offsets[symbol]
+
+        # 通过交易日历的位置映射定位区间
+        if start_date is not None or end_date is not None:
+            row_start, row_stop = self.calendar.row_range(symbol, start_date, end_date)
+            start, stop = start + row_start, start + row_stop
+
+        panel = self.panels[kind]
+        if columns is None:
+            columns = panel.columns[1:]
+        df = panel.iloc[start:stop][list(columns)]
+        df.index = pd.RangeIndex(len(df))
+        return df
+
+    def column(self, symbol, column):
+        """
+        获取单个序列一列的取值
+
+        Returns:
+            np.ndarray: 取值数组
+        """
+        start, stop = self.offsets[symbol]
+        return self.panels[self.kinds[symbol]][column].to_numpy()[start:stop]
+
+    def align(self, symbols, column, how='outer'):
+        """
+        把多个序列的一列按交易日对齐为二维数组
+
+        Args:
+            symbols (list): 序列标识列表，可以重复（按位置各占一列）
+            column (str): 取值列，如'close'或'change_pct'
+            how (str): 'outer'保留任一序列有数据的交易日，'inner'只保留所有序列都有数据的交易日
+
+        Returns:
+            tuple: (日期数组datetime64[ns], 形状为(交易日数, 序列数)的float64数组，缺失为NaN)
+        """
+        keep, values = self.calendar.align([(symbol, self.column(symbol, column)) for symbol in symbols], how)
+        return self.calendar.dates[keep], values
+
+    def to_dict(self):
+        """
+        按数据集标识拆分为独立的DataFrame
+
+        Returns:
+            dict: 数据集标识到DataFrame的映射
+        """
+        return {symbol: self.get(symbol) for symbol in self.kinds}
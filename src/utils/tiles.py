@@ -0,0 +1,203 @@
+"""
+时间序列多分辨率瓦片模块（仿地图瓦片）
+以共享交易日历的位置为横轴：第z级每个时间桶覆盖2**z个交易日，每TILE_SIZE个桶组成一个瓦片，
+瓦片(z, t)覆盖日历位置[t * TILE_SIZE * 2**z, (t + 1) * TILE_SIZE * 2**z)。
+每个桶保存各列的首值、末值、最小值、最大值（即OHLC）和合计，以及桶内最后一行的行号，
+其他逐行数据（如技术指标）可按该行号取桶末的值。
+
+各级瓦片在数据集版本变化时由后台预计算生成并写入产物存储。图表按可见范围选择
+桶数不超过LOD_MAX_POINTS的最细一级，只取覆盖可见范围的瓦片；第0级即逐日数据
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from config import TILE_SIZE, LOD_MAX_POINTS
+from . import kernels
+
+
+# 各数据类型生成瓦片的列
+TILE_COLUMNS = {
+    'index': ('open', 'high', 'low', 'close', 'vol', 'amount'),
+    'margin': ('margin_balance', 'financing_balance', 'financing_purchase', 'financing_redeem'),
+}
+
+# 每个桶保存的聚合
+AGGREGATES = ('first', 'last', 'min', 'max', 'sum')
+
+# K线的聚合方式
+OHLC = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'vol': 'sum', 'amount': 'sum'}
+
+# 瓦片内桶序号的位数（TILE_SIZE为2的幂）
+TILE_BITS = int(TILE_SIZE).bit_length() - 1
+
+# relayoutData中的横轴范围键，如'xaxis.range[0]'、'xaxis2.range'、'xaxis.autorange'
+_RANGE_KEY = re.compile(r'^xaxis\d*\.(range(\[[01]\])?|autorange)$')
+
+
+def parse_x_range(relayout_data):
+    """
+    从图表的relayoutData中取出横轴的可见范围
+
+    Args:
+        relayout_data (dict): dcc.Graph的relayoutData
+
+    Returns:
+        tuple: (起始日期, 结束日期)，恢复自动范围时为(None, None)；横轴范围未变化时返回None
+    """
+    for key, value in (relayout_data or {}).items():
+        match = _RANGE_KEY.match(key)
+        if match is None:
+            continue
+        if match.group(1) == 'autorange':
+            return (None, None) if value else None
+        if match.group(2) is None:
+            return value[0], value[1]
+        axis = key.split('.')[0]
+        if f'{axis}.range[0]' in relayout_data and f'{axis}.range[1]' in relayout_data:
+            return relayout_data[f'{axis}.range[0]'], relayout_data[f'{axis}.range[1]']
+    return None
+
+
+def covers(shown, key):
+    """
+    已显示的瓦片是否覆盖所需的瓦片（级别相同且瓦片序号范围包含）
+
+    Args:
+        shown (list): 已显示的SeriesTiles.locate()结果
+        key (tuple): 所需的SeriesTiles.locate()结果
+
+    Returns:
+        bool: 覆盖时为True，此时不需要重新取数据
+    """
+    if not shown or not key:
+        return not key
+    return shown[0] == key[0] and shown[1] <= key[1] and key[2] <= shown[2]
+
+
+def _level_starts(keys):
+    """
+    有序键数组中每组的起始位置
+    """
+    change = np.ones(len(keys), dtype=bool)
+    change[1:] = keys[1:] != keys[:-1]
+    return np.flatnonzero(change)
+
+
+class SeriesTiles:
+    """
+    单个序列的瓦片金字塔
+
+    levels[z]包含'bucket'（桶在第z级的序号）、'row'（桶内最后一行的行号）
+    以及各聚合的(桶数, 列数)数组；逐级向上合并，直到桶数不超过TILE_SIZE
+    """
+
+    def __init__(self, store, symbol, columns=None):
+        """
+        Args:
+            store (PanelStore): 面板数据存储
+            symbol (str): 序列标识
+            columns (list): 生成瓦片的列，为None时按数据类型取TILE_COLUMNS
+        """
+        self.symbol = symbol
+        self.columns = list(columns or TILE_COLUMNS[store.kinds[symbol]])
+        self.dates = store.column(symbol, 'date').astype('datetime64[ns]')
+        positions = store.calendar.positions[symbol].astype('int64')
+        values = np.column_stack([store.column(symbol, column).astype('float64') for column in self.columns])
+
+        level = {name: values for name in AGGREGATES}
+        level['bucket'] = positions
+        level['row'] = np.arange(len(positions))
+        self.levels = [level]
+        while len(level['bucket']) > TILE_SIZE:
+            level = self._merge(level)
+            self.levels.append(level)
+
+    @staticmethod
+    def _merge(level):
+        """
+        把相邻两个桶合并为上一级的一个桶
+        """
+        keys = level['bucket'] >> 1
+        starts = _level_starts(keys)
+        ends = np.append(starts[1:], len(keys)) - 1
+        # 各聚合的列横向拼接后一次分段聚合：首值取首、末值取末、最小取最小……
+        width = level['first'].shape[1]
+        merged = kernels.segment_reduce(np.hstack([level[name] for name in AGGREGATES]), starts,
+                                        [name for name in AGGREGATES for _ in range(width)])
+        result = {'bucket': keys[starts], 'row': level['row'][ends]}
+        for k, name in enumerate(AGGREGATES):
+            result[name] = merged[:, k * width:(k + 1) * width]
+        return result
+
+    def _position_range(self, start_date=None, end_date=None):
+        """
+        日期区间内第一行和最后一行的日历位置，区间内没有数据时为None
+        """
+        bottom = self.levels[0]['bucket']
+        start = 0 if start_date is None else int(np.searchsorted(self.dates, pd.Timestamp(start_date).to_datetime64(), 'left'))
+        stop = len(bottom) if end_date is None else int(np.searchsorted(self.dates, pd.Timestamp(end_date).to_datetime64(), 'right'))
+        if start >= stop:
+            return None
+        return int(bottom[start]), int(bottom[stop - 1])
+
+    def locate(self, start_date=None, end_date=None, max_points=LOD_MAX_POINTS, level=None):
+        """
+        可见范围对应的瓦片：桶数不超过max_points的最细一级，及覆盖范围的首末瓦片序号
+
+        Args:
+            level (int): 指定级别（如多个序列需按同一级别对齐时），为None时按max_points选择
+
+        Returns:
+            tuple: (级别, 首瓦片序号, 末瓦片序号)，范围内没有数据时为None
+        """
+        bounds = self._position_range(start_date, end_date)
+        if bounds is None:
+            return None
+        lo, hi = bounds
+        if level is None:
+            level = 0
+            while level < len(self.levels) - 1 and (hi >> level) - (lo >> level) + 1 > max_points:
+                level += 1
+        level = min(level, len(self.levels) - 1)
+        return level, lo >> (level + TILE_BITS), hi >> (level + TILE_BITS)
+
+    def query(self, start_date=None, end_date=None, max_points=LOD_MAX_POINTS, how=None, domain=None, level=None):
+        """
+        取覆盖可见范围的瓦片数据
+
+        Args:
+            start_date: 可见范围起始日期，为None时不限
+            end_date: 可见范围结束日期，为None时不限
+            max_points (int): 返回的最多桶数（超过时取更粗的一级）
+            how (dict): 列名到聚合（'first'、'last'、'min'、'max'、'sum'）的映射，为None时各列取末值
+            domain (tuple): 图表的(起始日期, 结束日期)；给定时返回覆盖可见范围的完整瓦片
+                （平移时不必重新请求），但不超出domain；为None时只返回可见范围内的桶
+            level (int): 指定级别，为None时按max_points选择
+
+        Returns:
+            tuple: (locate()的结果, 含date、bucket、row和how中各列的DataFrame；date为桶内最后交易日)
+        """
+        how = how or {column: 'last' for column in self.columns}
+        key = self.locate(start_date, end_date, max_points, level)
+        if key is None:
+            empty = np.empty(0, dtype='int64')
+            return None, pd.DataFrame({'date': self.dates[:0], 'bucket': empty, 'row': empty,
+                                       **{column: np.empty(0) for column in how}})
+
+        level, first_tile, last_tile = key
+        lo, hi = self._position_range(start_date, end_date)
+        if domain is not None:
+            domain_lo, domain_hi = self._position_range(*domain) or (lo, hi)
+            shift = level + TILE_BITS
+            lo = max(domain_lo, first_tile << shift)
+            hi = min(domain_hi, ((last_tile + 1) << shift) - 1)
+
+        tiles = self.levels[level]
+        start = int(np.searchsorted(tiles['bucket'], lo >> level, 'left'))
+        stop = int(np.searchsorted(tiles['bucket'], hi >> level, 'right'))
+        rows = tiles['row'][start:stop]
+        frame = {'date': self.dates[rows], 'bucket': tiles['bucket'][start:stop], 'row': rows}
+        for column, aggregate in how.items():
+            frame[column] = tiles[aggregate][start:stop, self.columns.index(column)]
+        return key, pd.DataFrame(frame)
@@ -0,0 +1,177 @@
+"""
+交易日历模块
+所有数据集交易日的并集，以升序的int32日序数（距1970-01-01的天数）保存，
+并为每个序列预先计算行号与日历位置之间的双向映射。
+跨序列对齐、日期区间查找和按周/月分组都转换为整数数组索引，无需按日期列合并
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def to_ordinal(date):
+    """
+    将日期转换为日序数
+
+    Args:
+        date: 日期（字符串、Timestamp或datetime64）
+
+    Returns:
+        int: 距1970-01-01的天数
+    """
+    return int(np.datetime64(pd.Timestamp(date), 'D').astype('int64'))
+
+
+class TradingCalendar:
+    """
+    多个序列共享的交易日历
+
+    days为所有序列交易日的并集；positions[symbol]为序列每一行在日历中的位置，
+    _first_row[symbol][p]为序列中第一个日历位置不小于p的行号（长度为日历长度+1）
+    """
+
+    def __init__(self, date_arrays):
+        """
+        Args:
+            date_arrays (dict): 序列标识到升序日期数组（datetime64）的映射
+        """
+        ordinals = {
+            symbol: np.asarray(dates).astype('datetime64[D]').astype('int32')
+            for symbol, dates in date_arrays.items()
+        }
+        self.days = np.unique(np.concatenate(list(ordinals.values()))) if ordinals else np.empty(0, dtype='int32')
+        self.positions = {}
+        self._first_row = {}
+        self._period_keys = {}
+
+        calendar_positions = np.arange(len(self.days) + 1, dtype='int32')
+        for symbol, values in ordinals.items():
+            positions = np.searchsorted(self.days, values).astype('int32')
+            self.positions[symbol] = positions
+            self._first_row[symbol] = np.searchsorted(positions, calendar_positions).astype('int32')
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def dates(self):
+        """
+        日历中的全部交易日
+
+        Returns:
+            np.ndarray: datetime64[ns]数组
+        """
+        return self.days.astype('datetime64[D]').astype('datetime64[ns]')
+
+    def locate(self, date, side='left'):
+        """
+        日期在日历中的位置
+
+        Args:
+            date: 日期
+            side (str): 'left'返回第一个不早于date的交易日位置，'right'返回第一个晚于date的交易日位置
+
+        Returns:
+            int: 日历位置（0到len(self)）
+        """
+        return int(np.searchsorted(self.days, to_ordinal(date), side=side))
+
+    def row_range(self, symbol, start_date=None, end_date=None):
+        """
+        序列中落在日期区间内的行区间
+
+        Args:
+            symbol (str): 序列标识
+            start_date: 起始日期（含），为None时不限
+            end_date: 结束日期（含），为None时不限
+
+        Returns:
+            tuple: 序列内的[start, stop)行号
+        """
+        first_row = self._first_row[symbol]
+        start = 0 if start_date is None else int(first_row[self.locate(start_date, 'left')])
+        stop = len(self.positions[symbol]) if end_date is None else int(first_row[self.locate(end_date, 'right')])
+        return start, max(start, stop)
+
+    def lookup(self, symbol):
+        """
+        日历位置到序列行号的映射
+
+        Args:
+            symbol (str): 序列标识
+
+        Returns:
+            np.ndarray: 长度为日历长度的int32数组，序列在该日无数据时为-1
+        """
+        rows = np.full(len(self.days), -1, dtype='int32')
+        rows[self.positions[symbol]] = np.arange(len(self.positions[symbol]), dtype='int32')
+        return rows
+
+    def map_rows(self, symbol, other):
+        """
+        序列symbol的每一行在序列other中同一交易日的行号
+
+        Returns:
+            np.ndarray: 长度为symbol行数的int32数组，other在该日无数据时为-1
+        """
+        return self.lookup(other)[self.positions[symbol]]
+
+    def align(self, values, how='outer'):
+        """
+        把多个序列的取值按交易日对齐为二维数组
+
+        Args:
+            values (dict | list): 序列标识到逐行取值数组的映射，或(序列标识, 取值数组)列表；
+                列表中标识可以重复（如同一序列与自身比较），按位置各占一列
+            how (str): 'outer'保留任一序列有数据的交易日，'inner'只保留所有序列都有数据的交易日
+
+        Returns:
+            tuple: (日历位置数组, 形状为(交易日数, 序列数)的float64数组，缺失为NaN)
+        """
+        pairs = list(values.items()) if isinstance(values, dict) else list(values)
+        counts = np.zeros(len(self.days), dtype='int32')
+        for symbol, _ in pairs:
+            counts[self.positions[symbol]] += 1
+        keep = np.flatnonzero(counts == len(pairs) if how == 'inner' else counts > 0)
+
+        matrix = np.full((len(self.days), len(pairs)), np.nan)
+        for j, (symbol, column) in enumerate(pairs):
+            matrix[self.positions[symbol], j] = np.asarray(column, dtype='float64')
+        return keep, matrix[keep]
+
+    def _keys(self, period):
+        """
+        每个交易日所属周期的整数键（周以周一开始，月为自1970年1月起的月数）
+        """
+        if period not in self._period_keys:
+            if period == 'weekly':
+                # 1970-01-01为周四，偏移3天后整除7得到以周一开始的周序号
+                keys = (self.days + 3) // 7
+            elif period == 'monthly':
+                keys = self.days.astype('datetime64[D]').astype('datetime64[M]').astype('int32')
+            else:
+                raise ValueError(f"Unknown period: {period}")
+            self._period_keys[period] = keys.astype('int32')
+        return self._period_keys[period]
+
+    def period_groups(self, symbol, period):
+        """
+        将序列按周或月分组
+
+        Args:
+            symbol (str): 序列标识
+            period (str): 'weekly'或'monthly'
+
+        Returns:
+            tuple: (每组首行的行号, 每组的标签日期datetime64[ns]：周为周日，月为月末)
+        """
+        keys = self._keys(period)[self.positions[symbol]]
+        if len(keys) == 0:
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='datetime64[ns]')
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        group_keys = keys[starts].astype('int64')
+        if period == 'weekly':
+            labels = (group_keys * 7 + 3).astype('datetime64[D]')
+        else:
+            labels = (group_keys + 1).astype('datetime64[M]').astype('datetime64[D]') - np.timedelta64(1, 'D')
+        return starts, labels.astype('datetime64[ns]')
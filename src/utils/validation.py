@@ -0,0 +1,224 @@
+"""
+数据校验模块
+清洗后对整列执行向量化检查（OHLC顺序、非负成交量、交易日间隔、异常收益率、零分母变化率等），
+把违规记录汇总为紧凑的报告：每项检查只保存违规行数和前几个违规日期
+
+所有检查都是对整列的一次或几次线性扫描，耗时与行数成正比，只占清洗耗时的一小部分
+
+运行方式:
+    python -m src.utils.validation
+"""
+
+import numpy as np
+
+
+# 报告中每项检查保存的违规日期个数
+MAX_EXAMPLES = 5
+
+# 相邻两个交易日之间允许的最大工作日数（早年春节休市可达三周）
+MAX_GAP_WEEKDAYS = 15
+
+# 异常收益率阈值：相对中位数的稳健z分数（以中位数绝对偏差估计标准差）
+OUTLIER_Z = 15.0
+
+# 融资融券余额与融资余额+融券余额的允许相对误差
+BALANCE_TOLERANCE = 1e-3
+
+
+def _values(df, column):
+    return df[column].to_numpy(dtype='float64')
+
+
+def check_ohlc_order(df):
+    """最低价不高于开盘/收盘价，最高价不低于开盘/收盘价"""
+    open_, high, low, close = (_values(df, column) for column in ('open', 'high', 'low', 'close'))
+    return (low > np.minimum(open_, close)) | (high < np.maximum(open_, close)) | (low > high)
+
+
+def check_non_positive_price(df):
+    """价格必须为正"""
+    mask = np.zeros(len(df), dtype=bool)
+    for column in ('open', 'high', 'low', 'close'):
+        mask |= ~(_values(df, column) > 0)
+    return mask
+
+
+def check_negative_volume(df):
+    """成交量、成交额不能为负"""
+    return (_values(df, 'vol') < 0) | (_values(df, 'amount') < 0)
+
+
+def check_negative_balance(df):
+    """融资融券各项余额和金额不能为负"""
+    mask = np.zeros(len(df), dtype=bool)
+    for column in df.columns:
+        if column != 'date' and column != 'margin_balance_change' and df[column].dtype.kind in 'if':
+            mask |= _values(df, column) < 0
+    return mask
+
+
+def check_balance_sum(df):
+    """融资融券余额应等于融资余额与融券余额之和"""
+    total = _values(df, 'financing_balance') + _values(df, 'securities_lending_balance')
+    balance = _values(df, 'margin_balance')
+    return np.abs(total - balance) > BALANCE_TOLERANCE * np.abs(balance)
+
+
+def check_duplicate_date(df):
+    """日期不能重复（数据已按日期排序，只需比较相邻行）"""
+    dates = df['date'].to_numpy()
+    mask = np.zeros(len(df), dtype=bool)
+    mask[1:] = dates[1:] <= dates[:-1]
+    return mask
+
+
+def check_calendar_gap(df):
+    """与上一个交易日之间的工作日数超过MAX_GAP_WEEKDAYS"""
+    dates = df['date'].to_numpy().astype('datetime64[D]')
+    mask = np.zeros(len(df), dtype=bool)
+    if len(dates) > 1:
+        mask[1:] = np.busday_count(dates[:-1], dates[1:]) > MAX_GAP_WEEKDAYS
+    return mask
+
+
+def _check_outlier(df, column):
+    values = _values(df, column)
+    finite = np.isfinite(values)
+    mask = np.zeros(len(df), dtype=bool)
+    if finite.sum() < 3:
+        return mask
+    median = np.median(values[finite])
+    scale = 1.4826 * np.median(np.abs(values[finite] - median))
+    if scale > 0:
+        mask[finite] = np.abs(values[finite] - median) > OUTLIER_Z * scale
+    return mask
+
+
+def check_outlier_return(df):
+    """日涨跌幅相对中位数的稳健z分数超过OUTLIER_Z"""
+    return _check_outlier(df, 'change_pct')
+
+
+def check_outlier_balance_change(df):
+    """融资融券余额变化率相对中位数的稳健z分数超过OUTLIER_Z"""
+    return _check_outlier(df, 'margin_balance_change')
+
+
+def _check_zero_denominator(df, column):
+    values = _values(df, column)
+    mask = np.zeros(len(df), dtype=bool)
+    mask[1:] = values[:-1] == 0
+    return mask
+
+
+def check_zero_close(df):
+    """前一日收盘价为0，涨跌幅无意义"""
+    return _check_zero_denominator(df, 'close')
+
+
+def check_zero_balance(df):
+    """前一日融资融券余额为0（如缺失值被填充为0），变化率无意义"""
+    return _check_zero_denominator(df, 'margin_balance')
+
+
+# 各数据类型的检查：(名称, 严重程度, 检查函数)，检查函数返回逐行的违规掩码
+CHECKS = {
+    'index': [
+        ('ohlc_order', 'error', check_ohlc_order),
+        ('non_positive_price', 'error', check_non_positive_price),
+        ('negative_volume', 'error', check_negative_volume),
+        ('duplicate_date', 'error', check_duplicate_date),
+        ('zero_denominator', 'error', check_zero_close),
+        ('calendar_gap', 'warning', check_calendar_gap),
+        ('outlier_return', 'warning', check_outlier_return),
+    ],
+    'margin': [
+        ('negative_balance', 'error', check_negative_balance),
+        ('duplicate_date', 'error', check_duplicate_date),
+        ('zero_denominator', 'error', check_zero_balance),
+        ('balance_sum', 'warning', check_balance_sum),
+        ('calendar_gap', 'warning', check_calendar_gap),
+        ('outlier_change', 'warning', check_outlier_balance_change),
+    ],
+}
+
+
+def validate_dataset(df, kind, start=0):
+    """
+    对清洗后的数据执行该类型的全部检查
+
+    Args:
+        df (pd.DataFrame): 清洗后的数据（按日期升序）
+        kind (str): 数据类型，'index'或'margin'
+        start (int): 从该行开始统计违规，之前的行只作为相邻比较的上下文（增量追加时使用）
+
+    Returns:
+        dict: 校验报告，checks中只包含有违规的检查
+    """
+    dates = df['date'].to_numpy().astype('datetime64[D]')
+    checks = {}
+    for name, severity, check in CHECKS[kind]:
+        rows = np.flatnonzero(check(df)[start:]) + start
+        if len(rows):
+            checks[name] = {
+                'severity': severity,
+                'count': int(len(rows)),
+                'examples': [str(date) for date in dates[rows[:MAX_EXAMPLES]]],
+            }
+    return {'kind': kind, 'rows': int(len(df) - start), 'checks': checks}
+
+
+def merge_reports(report, other):
+    """
+    合并两份报告（如已有报告与增量追加行的报告）
+
+    Args:
+        report (dict): 已有报告，可为None
+        other (dict): 新报告
+
+    Returns:
+        dict: 合并后的报告
+    """
+    if report is None:
+        return other
+    checks = {name: dict(result, examples=list(result['examples'])) for name, result in report['checks'].items()}
+    for name, result in other['checks'].items():
+        if name in checks:
+            checks[name]['count'] += result['count']
+            checks[name]['examples'] = (checks[name]['examples'] + result['examples'])[:MAX_EXAMPLES]
+        else:
+            checks[name] = result
+    return {'kind': report['kind'], 'rows': report['rows'] + other['rows'], 'checks': checks}
+
+
+def summarize_report(report):
+    """
+    生成单行摘要
+
+    Args:
+        report (dict): 校验报告
+
+    Returns:
+        str: 如"7694 rows, 2 errors, 8 warnings (calendar_gap x1, outlier_return x7)"
+    """
+    checks = report['checks']
+    errors = sum(result['count'] for result in checks.values() if result['severity'] == 'error')
+    warnings = sum(result['count'] for result in checks.values() if result['severity'] == 'warning')
+    summary = f"{report['rows']} rows, {errors} errors, {warnings} warnings"
+    if checks:
+        summary += ' (' + ', '.join(f"{name} x{result['count']}" for name, result in checks.items()) + ')'
+    return summary
+
+
+if __name__ == '__main__':
+    from .catalog import get_catalog
+    from .clean_data import load_validation_report
+
+    for entry in get_catalog():
+        report = load_validation_report(entry)
+        if report is None:
+            print(f"{entry['symbol']}: no report (run data processing first)")
+            continue
+        print(f"{entry['symbol']}: {summarize_report(report)}")
+        for name, result in report['checks'].items():
+            print(f"  [{result['severity']}] {name}: {result['count']} rows, e.g. {', '.join(result['examples'])}")
@@ -19,7 +19,7 @@ if %errorlevel% neq 0 (
 )
 
 echo [1/3] Checking dependencies...
-python -c "import dash, dash_bootstrap_components, plotly, pandas" >nul 2>&1
+python -c "import dash, dash_bootstrap_components, plotly, pandas, diskcache, multiprocess, psutil" >nul 2>&1
 if %errorlevel% neq 0 (
     echo [Info] Installing dependencies...
     python -m pip install -r requirements.txt